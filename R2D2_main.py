@@ -15,22 +15,40 @@ Make HC06 work: https://dev.to/ivanmoreno/how-to-connect-raspberry-pi-with-hc-05
 #TODO: Clean up imports
 #TODO: Look into consolidating error handling
 #TODO: Clean up constants and global vars.
-#TODO: Look into using a config file for constants
-#TODO: Look into displaying diagnostic information on the LCD
-#TODO: Diagnose/Fix full forward motor cutout
-#TODO: Look into retreiving battery voltage and displaying it on the LCD
 
-import asyncio
-import pygame
 import time
+# Taken before the other imports so the startup report covers them too
+PROCESS_STARTED_AT = time.monotonic()
+
+import asyncio
+import math
 # Communicate with serial ports on Raspberry Pi.
 import serial
 import random
 # Motor controllers for the feet and head, respectively.
 import lib.MD49 as MD49
-from pysabertooth import Sabertooth
 # Stuff for the LCD display.
-from lib.i2c_lcd import I2cLcd
+from lib.lcd_framebuffer import LcdFramebuffer
+from lib.lcd_service import LcdService
+from lib.control_scheduler import ControlScheduler
+from lib.gamepad_input import GamepadReader
+from lib.control_state import ControlState, DriveOutput
+from lib.drive_mixer import DriveMixer, NEUTRAL_SPEED, shape_axis
+from lib.straight_line import StraightLineController
+from lib.motion_profile import MotionProfile
+from lib.odometry import Odometry
+from lib.telemetry import TelemetryRecorder
+from lib.async_logging import setup_logging
+from lib.metrics import MetricsRegistry, MetricsServer, RateMeter
+from lib.lcd_diagnostics import DiagnosticsPage
+from lib.config import ConfigError, ConfigWatcher, Setting, load_config
+from lib.startup import Startup, seconds_since_boot
+from lib.motor_process import MotorProcess
+from lib.serial_reactor import SerialReactor
+from lib.supervisor import Backoff, Supervisor, reconnect
+from lib.dome_link import (DomeLink, OP_SYNC, OP_TOGGLE_FLAP_1, OP_TOGGLE_FLAP_2,
+                           OP_TOGGLE_FLAP_3, OP_WAVE, OP_STARTLED, OP_CLOSE_FLAPS)
+import os
 import sys
 import time
 import logging
@@ -43,30 +61,109 @@ I2C_ADDR = 0x27
 I2C_NUM_ROWS = 2
 I2C_NUM_COLS = 16
 
-lcd = I2cLcd(1, I2C_ADDR, I2C_NUM_ROWS, I2C_NUM_COLS)
-
+# Device paths and serial settings
+GAMEPAD_PATH = '/dev/input/event6'
+MD49_PORT = '/dev/ttyS0'
+SABER_PORT = '/dev/ttyAMA3'
+SABER_BAUD = 9600
+ARDUINO_PORT = '/dev/ttyUSB0'
+ARDUINO_BAUD = 9600
+
+LOG_FILE = '/home/pi/Desktop/r2d2-2025.log'
+TELEMETRY_DIR = '/home/pi/Desktop/r2d2-telemetry'
+
+# Optional settings file overriding the constants in this script (see
+# r2d2_config.example.json). Tuning changes apply while running.
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'r2d2_config.json')
+CONFIG_POLL_INTERVAL = 1.0  # seconds between checks of the config file
+config = None
+config_schema = None
+
+# Metrics endpoint for Prometheus or `curl localhost:9108/metrics`
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9108
+
+# The LCD service task is the only thing that touches the display. It is
+# created in main() so importing this module does not touch the I2C bus.
+lcd_service = None
+
+# Device openers, kept as module functions so the simulator (sim/) can swap
+# in simulated hardware.
+def open_lcd():
+    # Imported here so machines without smbus can still import this module
+    from lib.i2c_lcd import I2cLcd
+    return I2cLcd(1, I2C_ADDR, I2C_NUM_ROWS, I2C_NUM_COLS)
+
+def open_gamepad(path):
+    return InputDevice(path)
+
+# Motor controllers, set by main() once they are connected
 motors = None
 saber = None
 
-# Global joystick state
-global_forward_value = 128
-global_turn_value = 0
-global_head_value = 0
-
 INVERT_FORWARD_AXIS = False
 
-last_left_speed = 128
-last_right_speed = 128
-last_motor_update_time = 0
-last_refresh_time = 0
-update_interval = 0.05  # 50 ms normal update rate
-refresh_interval = 1.0  # 1.0 s to refresh MD49 to prevent timeout
+# Drive tuning, baked into the drive mixer's lookup table
+STICK_DEADZONE = 5 / 128.0  # normalized distance from centre that reads as zero
+STICK_CURVE = 2.0  # response curve exponent for forward and turn
+OUTPUT_CURVE = 1.0  # response curve applied to the mixed motor values
+DRIFT_STRENGTH = 0.0  # open-loop drift bias; only needed if the encoders are not used
+
+# Dome rotation speed at full stick (Sabertooth range is -127 to 127)
+SABER_SCALE = 80
+
+# Straight-line PI controller, driven by the MD49 encoders
+STRAIGHT_KP = 30.0  # speed units per unit of normalized wheel imbalance
+STRAIGHT_KI = 200.0  # speed units per unit of imbalance per second
+STRAIGHT_MAX_CORRECTION = 40.0  # largest correction per side, in speed units
+
+# Wheel geometry for odometry (EMG49 motors: 980 encoder counts per wheel turn)
+WHEEL_COUNTS_PER_REV = 980
+WHEEL_DIAMETER = 0.125  # metres
+WHEEL_TRACK = 0.40  # metres between the wheel contact points
+
+# Startup: devices come up in parallel, each given this long before it is left out
+LCD_STARTUP_TIMEOUT = 2.0
+MD49_STARTUP_TIMEOUT = 3.0
+SABER_STARTUP_TIMEOUT = 3.0
+ARDUINO_STARTUP_TIMEOUT = 5.0
+AUDIO_STARTUP_TIMEOUT = 30.0  # decoding every clip (without audio packs) is slow
+ARDUINO_BOOT_DELAY = 2.0  # the Arduino resets when its port is opened
+
+# Control loop rates, driven by the fixed-rate scheduler
+MD49_RATE_HZ = 20
+SABER_RATE_HZ = 20
+LOOP_STATS_INTERVAL = 60.0  # seconds between loop timing reports in the log
+
+# Run the MD49 and Sabertooth loops in a separate real-time process
+# (lib/motor_process.py) instead of on this event loop
+MOTOR_PROCESS = False
+MOTOR_PROCESS_CPU = 3  # core to pin it to (None for any); keep it free with isolcpus=3
+MOTOR_PROCESS_PRIORITY = 50  # SCHED_FIFO priority, 0 for normal scheduling
+motor_process = None
+motor_status = None  # latest MotorStatus read from it
+
+# Failsafe: heartbeats from the gamepad and the motor loops, watched by a supervisor
+INPUT_DEADLINE = 0.15  # seconds without a sign of life from the gamepad before every motor stops
+INPUT_PROBE_INTERVAL = 0.05  # how often an idle gamepad is asked if it is still there (< INPUT_DEADLINE)
+DEVICE_DEADLINE = 0.5  # seconds of failed MD49/Sabertooth cycles before the port is reopened
+SUPERVISOR_INTERVAL = 0.02  # seconds between heartbeat checks
+RECONNECT_MIN_DELAY = 0.5  # first wait between reconnect attempts; doubles after each failure
+RECONNECT_MAX_DELAY = 10.0
+input_heartbeat = None
+md49_heartbeat = None
+saber_heartbeat = None
+failsafe_active = False  # motors held at neutral until the gamepad is back
+
+# Telemetry: one record per MD49 drive cycle, written to disk in batches
+TELEMETRY_FLUSH_INTERVAL = 10.0  # seconds between writes to the SD card
+POWER_POLL_INTERVAL = 0.5  # seconds between MD49 volts/current reads
+telemetry = None
+md49_power = MD49.PowerStatus(0, 0, 0, 0)  # latest volts, currents and error byte
 
 
 
-logging.basicConfig(filename='/home/pi/Desktop/r2d2-2025.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-logger.info("Starting with the application logs")
 
 # List of selected sounds
 hums = ["/home/pi/Desktop/r2d2-new/audio-files/hum/HUM1.mp3", "/home/pi/Desktop/r2d2-new/audio-files/hum/HUM7.mp3",
@@ -78,6 +175,21 @@ sents = ["/home/pi/Desktop/r2d2-new/audio-files/sent/SENT2.mp3", "/home/pi/Deskt
 procs = ["/home/pi/Desktop/r2d2-new/audio-files/proc/PROC2.mp3", "/home/pi/Desktop/r2d2-new/audio-files/proc/PROC3.mp3",
          "/home/pi/Desktop/r2d2-new/audio-files/proc/PROC5.mp3", "/home/pi/Desktop/r2d2-new/audio-files/proc/PROC13.mp3", "/home/pi/Desktop/r2d2-new/audio-files/proc/PROC15.mp3"]
 starwars = ["/home/pi/Desktop/r2d2-new/audio-files/starwars/ALARM9.mp3", "/home/pi/Desktop/r2d2-new/audio-files/starwars/MISC14.mp3"]
+annoyed = ["/home/pi/Desktop/r2d2-new/audio-files/mix/ANNOYED.mp3"]
+cantina = ["/home/pi/Desktop/r2d2-new/audio-files/mix/CANTINA.mp3"]
+
+# Mixer settings: a small buffer keeps trigger latency low
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 512
+MIXER_CHANNELS = 8
+SOUND_MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of decoded audio kept in memory
+
+# Pre-decoded PCM packs built by tools/pack_audio.py (optional)
+AUDIO_ROOT = "/home/pi/Desktop/r2d2-new/audio-files"
+AUDIO_PACK_MANIFEST = "/home/pi/Desktop/r2d2-new/audio-packs/manifest.json"
+
+# Decoded sounds, created once the mixer is initialized in main()
+sound_bank = None
 
 #TODO: Clean up button mappings
 
@@ -101,6 +213,9 @@ lvaxis = 1
 rhaxis = 2
 rvaxis = 5
 
+# Select button toggles the LCD diagnostics pages
+selectBtn = 314
+
 # Click mode for l2 and r2 trig, which needs to be ignored.
 clickL2Trig = 312
 clickR2Trig = 313
@@ -111,376 +226,1157 @@ padRight = 1
 padUp = -1
 padDown = 1
 
-# Global drive values (updated by joystick handler)
-desired_forward = 0.0
-desired_turn = 0.0
-desired_head_value = 0.0
+# Drive command from the joystick handler, read by the control loops
+control_state = ControlState()
+# What the MD49 was last told, so unchanged commands are not resent
+md49_output = DriveOutput()
+# Stick position to motor speed table, built at startup (see build_drive_mixer)
+# and rebuilt when the tuning changes
+drive_mixer = None
+# Motion profile between the drive table and the MD49: ramps every speed
+# change so current spikes, brownouts and wheel slip are smaller
+MOTION_PROFILE = True
+MOTION_ACCEL = 320.0  # speed steps per second while speeding up (128 steps is full speed)
+MOTION_DECEL = 480.0  # speed steps per second while slowing down
+MOTION_JERK = 3200.0  # change of rate, steps per second per second
+MD49_ACCELERATION = 5  # the MD49's own ramp on top (1-10, reset_to_defaults uses 5)
+motion_profile = MotionProfile(MOTION_ACCEL, MOTION_DECEL, MOTION_JERK)
+# Evens out the wheels when driving straight (replaces the fixed drift bias)
+straight_line = StraightLineController(kp=STRAIGHT_KP, ki=STRAIGHT_KI,
+                                       max_correction=STRAIGHT_MAX_CORRECTION)
+# Dead-reckoning pose and wheel velocities from the encoders read each cycle
+odometry = Odometry(WHEEL_COUNTS_PER_REV, WHEEL_DIAMETER, WHEEL_TRACK)
 
 arduino_queue = asyncio.Queue()
 
-# Function for clearing the second line of the display.
-def clearLCDLine():
-    i = 0
-    while i < I2C_NUM_COLS:
-        lcd.move_to(i, 1)
-        lcd.putchar(" ")
-        i += 1
-    lcd.move_to(0, 1)
-
-async def play_sound(sound_list, display_message):
-    global lcd
-    clearLCDLine()
-    lcd.putstr(display_message)
-    pygame.mixer.music.load(random.choice(sound_list))
-    pygame.mixer.music.play()
-    while pygame.mixer.music.get_busy():
+scheduler = ControlScheduler(report_interval=LOOP_STATS_INTERVAL)
+# Every UART (MD49, Sabertooth, Arduino) is read and written on the event loop
+serial_reactor = SerialReactor()
+supervisor = Supervisor(check_interval=SUPERVISOR_INTERVAL)
+arduino_reconnect = None  # task reopening the Arduino after its port hung up
+
+metrics = MetricsRegistry()
+audio_latency = metrics.histogram('r2d2_audio_trigger_seconds',
+                                  "Time from a button press being handled to its sound starting")
+dome_rtt = metrics.histogram('r2d2_dome_rtt_seconds', "Round trip time of acknowledged dome commands")
+saber_errors = metrics.counter('r2d2_serial_errors_total', "Serial errors per device", device='sabertooth')
+stop_latency = metrics.histogram('r2d2_failsafe_stop_seconds',
+                                 "Time from the last sign of life of the gamepad to the motors being stopped")
+# LCD diagnostics pages, created in main()
+diagnostics = None
+
+# Function for showing a status message on the second line of the display.
+def show_status(message):
+    if lcd_service is None or (diagnostics and diagnostics.active):
+        return
+    lcd_service.show(1, message)
+
+# Function for replacing the whole display with a single message.
+def show_message(message):
+    if lcd_service is None or (diagnostics and diagnostics.active):
+        return
+    lcd_service.show_message(message)
+
+async def play_sound(sound_list, display_message, requested_at=None):
+    show_status(display_message)
+    if sound_bank is None:
+        return  # audio not up (yet)
+    channel = sound_bank.play(random.choice(sound_list))
+    if requested_at is not None:
+        audio_latency.observe(time.monotonic() - requested_at)
+    while channel.get_busy():
         await asyncio.sleep(0.1)  # Yield control while waiting for the sound to finish
 
 # TODO: integrate the R2 heads arduino & test the code
-async def send_to_arduino(message, arduino_head):
+async def send_to_arduino(opcode, dome):
     try:
-        arduino_head.write((message))
-        clearLCDLine()
-        lcd.putstr("SENT ARDUINO")
-        await asyncio.sleep(0)  # Yield control
+        await dome.send(opcode)
+        show_status("SENT ARDUINO")
     except Exception as e:
         logger.error(f"Error sending to Arduino: {e}")
 
-async def saber_drive_loop(saber, get_head_value_fn, interval=0.05):
-    """
-    Continuously sends Saber drive commands at a safe refresh rate.
-    Ensures head movement stays responsive.
-
-    :param saber: Sabertooth controller instance
-    :param get_head_value_fn: Callable that returns latest head axis value (-1.0 to 1.0)
-    :param interval: Update interval in seconds (default 50ms)
-    """
-    logger.info("Starting Saber drive loop")
-
-    while True:
-        try:
-            head_value = get_head_value_fn()
-            saber.drive(1, int(head_value * 40))
-        except Exception as e:
-            logger.error(f"Saber drive failed: {e}")
-
-        await asyncio.sleep(interval)
-
 async def process_event(event):
-    global lcd
+    now = time.monotonic()
     if event.type == ecodes.EV_KEY:
         if event.code == yBtn:
-            asyncio.create_task(play_sound(hums, "SOUND: HUM"))
+            asyncio.create_task(play_sound(hums, "SOUND: HUM", now))
         elif event.code == xBtn:
-            asyncio.create_task(play_sound(procs, "SOUND: PROC"))
+            asyncio.create_task(play_sound(procs, "SOUND: PROC", now))
         elif event.code == aBtn:
-            asyncio.create_task(play_sound(sents, "SOUND: SENT"))
+            asyncio.create_task(play_sound(sents, "SOUND: SENT", now))
         elif event.code == bBtn:
-            asyncio.create_task(play_sound(["/home/pi/Desktop/r2d2-new/audio-files/mix/ANNOYED.mp3"], "SOUND: ANNOYED"))
+            asyncio.create_task(play_sound(annoyed, "SOUND: ANNOYED", now))
         elif event.code == l1Btn:
-            asyncio.create_task(play_sound(["/home/pi/Desktop/r2d2-new/audio-files/mix/CANTINA.mp3"], "SOUND: CANTINA"))
+            asyncio.create_task(play_sound(cantina, "SOUND: CANTINA", now))
         elif event.code == r1Btn:
-            asyncio.create_task(play_sound(screams, "SOUND: SCREAM"))
+            asyncio.create_task(play_sound(screams, "SOUND: SCREAM", now))
+        elif event.code == selectBtn and diagnostics:
+            diagnostics.toggle()
         else:
             logging.info(f"Unsupported Button: {event}")
-            lcd.putstr("Unsupported")
-
-# Apply a stronger correction at lower speeds, tapering off at higher speeds
-def calculate_drift_correction(forward_value):
-    base_strength = 0.28  # Base strength of the correction
-    scaled_strength = base_strength * abs(forward_value)
-    return scaled_strength if forward_value >= 0 else -scaled_strength
-
-# TODO: Adjust response curve for better low-end control
-def apply_response_curve(input_value, curve_factor=1.0):  # Adjusted for finer low-end control
-    sign = 1 if input_value >= 0 else -1
-    return sign * (abs(input_value) ** curve_factor)
+            show_status("Unsupported")
 
-# TODO: remove magic numbers and create constants for the joystick values & deadzone
-async def process_joystick(event):
-    global desired_forward, desired_turn, desired_head_value
-
-    deadzone = 5 / 128.0  # increased deadzone
+def apply_axis(code, raw_value):
+    """
+    Update the drive state from the latest value of one analog stick axis.
+    """
+    raw_value = max(0, min(255, raw_value))
 
-    if event.code == lvaxis:
-        normalized_value = (event.value - 127) / 128.0
-        if INVERT_FORWARD_AXIS:
-            normalized_value *= -1
-        value = apply_response_curve(normalized_value, curve_factor=2.0)
-        desired_forward = value if abs(normalized_value) >= deadzone else 0.0
+    if code == lvaxis:
+        control_state.update(forward=shape_axis(raw_value, STICK_CURVE, STICK_DEADZONE, INVERT_FORWARD_AXIS),
+                             forward_raw=raw_value)
 
-    elif event.code == lhaxis:
-        normalized_value = (event.value - 127) / 128.0
-        desired_turn = apply_response_curve(normalized_value, curve_factor=2.0) if abs(normalized_value) >= deadzone else 0.0
+    elif code == lhaxis:
+        control_state.update(turn=shape_axis(raw_value, STICK_CURVE, STICK_DEADZONE),
+                             turn_raw=raw_value)
 
-    elif event.code == rhaxis:
-        normalized_value = (event.value - 127) / 128.0
-        desired_head_value = normalized_value if abs(normalized_value) >= deadzone else 0.0
+    elif code == rhaxis:
+        control_state.update(head=shape_axis(raw_value, 1.0, STICK_DEADZONE))
 
+async def process_dpad(event):
     # DPAD actions, queue Arduino messages safely
     if event.code == ABS_HAT0X:
         if event.value == padLeft:
-            await arduino_queue.put(bytes([4]))
+            await arduino_queue.put(OP_WAVE)
         elif event.value == padRight:
-            await arduino_queue.put(bytes([5]))
+            await arduino_queue.put(OP_STARTLED)
             asyncio.create_task(play_sound(screams, "DPAD: RIGHT"))
 
     elif event.code == ABS_HAT0Y:
         if event.value == padUp:
-            await arduino_queue.put(bytes([1]))
-            await arduino_queue.put(bytes([2]))
-            await arduino_queue.put(bytes([3]))
+            await arduino_queue.put(OP_TOGGLE_FLAP_1)
+            await arduino_queue.put(OP_TOGGLE_FLAP_2)
+            await arduino_queue.put(OP_TOGGLE_FLAP_3)
         elif event.value == padDown:
-            await arduino_queue.put(bytes([11]))
+            await arduino_queue.put(OP_CLOSE_FLAPS)
+
 
+async def poll_md49_telemetry():
+    """
+    Keeps md49_power up to date for the telemetry records.
 
-#TODO: Either do more with the MD49 polling or remove it
-async def poll_md49_telemetry(motors, interval=0.5):
+    Samples go to the telemetry recorder, not the log; only changes of the
+    MD49 error byte are logged.
+    """
+    global md49_power
     logger.info("Starting MD49 telemetry polling loop")
     while True:
         try:
-            volts = motors.get_volts()
-            encoder1 = motors.get_encoder(1)
-            encoder2 = motors.get_encoder(2)
-            logger.info(f"MD49 Telemetry: Volts={volts}, Encoder1={encoder1}, Encoder2={encoder2}")
+            if motors is None:
+                continue  # reconnecting
+            # Volts, currents and error in one round trip
+            status = await motors.get_volts_amps_error()
+            if status.error != md49_power.error:
+                logger.warning(f"MD49 error byte changed to {status.error:#04x} "
+                               f"(volts={status.volts})")
+            md49_power = status
         except Exception as e:
             logger.error(f"Telemetry polling failed: {e}")
-        await asyncio.sleep(interval)
+        finally:
+            await asyncio.sleep(POWER_POLL_INTERVAL)
 
-#TODO: Write proper commenting / function description
-async def md49_drive_loop(motors, interval=0.05):
-    global desired_forward, desired_turn
-    global last_left_speed, last_right_speed
+async def md49_drive_tick(motors):
+    """
+    One control cycle of the MD49 drive, run at MD49_RATE_HZ by the scheduler.
+    """
+    # Reading the encoders every cycle also keeps the MD49's 2 second comms
+    # timeout from stopping the motors while the stick is held still (the
+    # old full-forward cutout: a steady stick sent nothing).
+    stops = motors.stops
+    try:
+        encoders = await motors.get_encoders()
+        if md49_heartbeat:
+            md49_heartbeat.beat()
+    except Exception as e:
+        logger.error(f"MD49 encoder read failed: {e}")
+        encoders = None
+    now = time.monotonic()
+    if encoders is not None:
+        odometry.update(encoders.encoder1, encoders.encoder2, now)
+
+    if telemetry and encoders is not None:
+        # The speeds in effect while the encoders moved; jitter is the
+        # previous cycle's, as this one's is recorded after it returns.
+        stats = scheduler.stats.get("md49_drive")
+        telemetry.record(time.time(), md49_power.volts, md49_power.current1, md49_power.current2,
+                         md49_power.error, encoders.encoder1, encoders.encoder2,
+                         md49_output.left, md49_output.right, stats.last_jitter if stats else 0.0)
+
+    command = control_state.snapshot()
+    driving_straight = command.forward != 0.0 and command.turn == 0.0
+    if encoders is None or not driving_straight:
+        straight_line.reset(encoders, now)
+        if command.version == md49_output.version and motion_profile.settled:
+            return  # Nothing new from the joystick since the last cycle
+
+    # Mix, curve and mapping are all in the table
+    mapped_left, mapped_right = drive_mixer.mix(command.forward_raw, command.turn_raw)
+    if MOTION_PROFILE:
+        mapped_left, mapped_right = motion_profile.update(mapped_left, mapped_right, now)
+    if encoders is not None and driving_straight:
+        mapped_left, mapped_right = straight_line.update(mapped_left, mapped_right, encoders, now)
+
+    if mapped_left == NEUTRAL_SPEED and mapped_right == NEUTRAL_SPEED:
+        if md49_output.left != NEUTRAL_SPEED or md49_output.right != NEUTRAL_SPEED:
+            await motors.set_speeds(NEUTRAL_SPEED, NEUTRAL_SPEED)
+            md49_output.left = NEUTRAL_SPEED
+            md49_output.right = NEUTRAL_SPEED
+    else:
+        # Skip 1-step changes, except for where a ramp ends: the cycles
+        # after it return early, so a skipped last step would stay skipped
+        deadband = 0 if MOTION_PROFILE and motion_profile.settled and not driving_straight else 1
+        update_left = abs(mapped_left - md49_output.left) > deadband
+        update_right = abs(mapped_right - md49_output.right) > deadband
+
+        if update_left and update_right:
+            await motors.set_speeds(mapped_left, mapped_right)
+        elif update_left:
+            await motors.set_speed(1, mapped_left)
+        elif update_right:
+            await motors.set_speed(2, mapped_right)
+
+        if motors.stops != stops:
+            # A failsafe stop came while this cycle waited on the MD49: the
+            # write was dropped (or overridden) and md49_output is neutral
+            return
+        if update_left:
+            md49_output.left = mapped_left
+        if update_right:
+            md49_output.right = mapped_right
+
+    # Only after the write succeeded, so a failed one is retried next cycle
+    if motors.stops == stops:
+        md49_output.version = command.version
+
+def saber_drive_tick(saber):
+    """
+    One control cycle of the dome rotation, run at SABER_RATE_HZ by the scheduler.
+    """
+    try:
+        saber.drive(1, int(control_state.snapshot().head * SABER_SCALE))
+        if saber_heartbeat:
+            saber_heartbeat.beat()
+    except Exception as e:
+        saber_errors.inc()
+        logger.error(f"Saber drive error: {e}")
 
-    logger.info("Starting MD49 drive loop")
+def motor_status_tick():
+    """
+    Copy the motor process's latest status into md49_power, md49_output and
+    the telemetry recorder; run at MD49_RATE_HZ when MOTOR_PROCESS is on.
+
+    Telemetry is sampled from the shared status, so a record can be missed
+    while this process is busy; the motor loop itself is not affected.
+    """
+    global md49_power, motor_status
+    status = motor_process.status()
+    if motor_status is not None and status.tick == motor_status.tick:
+        return
+    if motor_status is not None and status.failsafe_stops != motor_status.failsafe_stops:
+        stop_latency.observe(status.stop_latency)
+        metrics.counter('r2d2_failsafe_stops_total', "Times the failsafe stopped the motors",
+                        reason='motor_process').inc()
+    motor_status = status
+    md49_power = MD49.PowerStatus(status.volts, status.current1, status.current2, status.error)
+    md49_output.left, md49_output.right = status.left, status.right
+    if telemetry:
+        telemetry.record(status.timestamp, status.volts, status.current1, status.current2,
+                         status.error, status.encoder1, status.encoder2,
+                         status.left, status.right, status.jitter)
+
+async def send_dome_command(dome, opcode):
+    """
+    Send one command to the dome and wait for its ACK.
+    """
+    try:
+        rtt = await dome.send(opcode)
+        dome_rtt.observe(rtt)
+        show_status(f"SENT ARD@: {opcode}")
+        logger.info(f"Dome ACK for opcode {opcode} in {rtt * 1000:.1f} ms")
+    except Exception as e:
+        logger.error(f"Arduino send failed: {e}")
+
+async def arduino_send_loop(dome):
+    """
+    Sends queued dome commands over the framed link.
 
+    Commands are pipelined: each one is written as soon as the link's
+    in-flight window allows, in queue order, and its ACK is awaited in its
+    own task instead of sleeping between commands.
+    """
+    logger.info("Starting Arduino send loop")
+    try:
+        await dome.send(OP_SYNC)
+    except Exception as e:
+        logger.error(f"Dome sync failed: {e}")
     while True:
-        # Combine forward and turn
-        left_motor = desired_forward + desired_turn
-        right_motor = desired_forward - desired_turn
-
-        # Clamp before drift correction
-        left_motor = max(-1.0, min(1.0, left_motor))
-        right_motor = max(-1.0, min(1.0, right_motor))
-
-        # Apply drift correction only if going straight
-        if abs(desired_forward) > 0.01 and abs(desired_turn) <= 0.01:
-            correction = calculate_drift_correction(desired_forward)
-            left_motor += correction
-            right_motor -= correction
-
-        # Clamp again after correction
-        left_motor = max(-1.0, min(1.0, left_motor))
-        right_motor = max(-1.0, min(1.0, right_motor))
-
-        # Apply response curve
-        left_motor = apply_response_curve(left_motor, curve_factor=1.0)
-        right_motor = apply_response_curve(right_motor, curve_factor=1.0)
-
-        mapped_left = int(128 + (left_motor) * 127)
-        mapped_right = int(128 + (right_motor) * 127)
-
-        if abs(desired_forward) <= 0.01 and abs(desired_turn) <= 0.01:
-            if last_left_speed != 128 or last_right_speed != 128:
-                motors.set_speed(1, 128)
-                motors.set_speed(2, 128)
-                last_left_speed = 128
-                last_right_speed = 128
-        else:
-            if abs(mapped_left - last_left_speed) > 1:
-                motors.set_speed(1, mapped_left)
-                last_left_speed = mapped_left
+        opcode = await arduino_queue.get()
+        asyncio.create_task(send_dome_command(dome, opcode))
+
+def register_md49_metrics(board):
+    """Point the MD49 serial metrics at a (re)connected board."""
+    metrics.counter('r2d2_serial_errors_total', "Serial errors per device",
+                    fn=lambda: board.errors, device='md49')
+    register_port_metrics(board.port)
+
+def register_port_metrics(port):
+    """Byte counts, queue and backpressure metrics of one reactor port."""
+    stats = port.stats
+    metrics.counter('r2d2_serial_bytes_total', "Bytes over each serial link",
+                    fn=lambda: stats.bytes_out, device=port.name, direction='tx')
+    metrics.counter('r2d2_serial_bytes_total', "Bytes over each serial link",
+                    fn=lambda: stats.bytes_in, device=port.name, direction='rx')
+    metrics.gauge('r2d2_serial_queued_bytes', "Bytes waiting for a serial port to take them",
+                  fn=lambda: stats.queued, device=port.name)
+    metrics.gauge('r2d2_serial_max_queued_bytes', "Most bytes ever waiting for a serial port",
+                  fn=lambda: stats.max_queued, device=port.name)
+    metrics.counter('r2d2_serial_would_block_total', "Writes a serial port could not take in full",
+                    fn=lambda: stats.would_block, device=port.name)
+    metrics.counter('r2d2_serial_drain_waits_total', "Writers held back by a full serial queue",
+                    fn=lambda: stats.drain_waits, device=port.name)
+
+def register_heartbeat_metrics(heartbeat):
+    """Age and missed deadlines of one supervisor heartbeat."""
+    metrics.gauge('r2d2_heartbeat_age_seconds', "Time since the last sign of life of a watched source",
+                  fn=lambda: time.monotonic() - heartbeat.last, source=heartbeat.name)
+    metrics.counter('r2d2_heartbeat_missed_total', "Deadlines missed by a watched source",
+                    fn=lambda: heartbeat.trips, source=heartbeat.name)
+
+def odometry_estimate():
+    """
+    The latest pose and wheel velocities (x, y, heading, velocity_left,
+    velocity_right, linear_velocity, angular_velocity): from odometry, or
+    from the motor process's status when it runs the drive loop.
+    """
+    return motor_process.status() if motor_process else odometry
 
-            if abs(mapped_right - last_right_speed) > 1:
-                motors.set_speed(2, mapped_right)
-                last_right_speed = mapped_right
+def register_metrics(dome):
+    """
+    Expose the counters the devices and loops already keep through the metrics registry.
 
-        await asyncio.sleep(interval)
+    :param dome: DomeLink, or None if the Arduino is not connected
+    """
+    for name, stats in scheduler.stats.items():
+        metrics.gauge('r2d2_loop_period_seconds', "Last measured period of a control loop",
+                      fn=lambda s=stats: s.last_period, loop=name)
+        metrics.gauge('r2d2_loop_jitter_seconds', "Start jitter of the last tick of a control loop",
+                      fn=lambda s=stats: s.last_jitter, loop=name)
+        metrics.gauge('r2d2_loop_max_jitter_seconds', "Worst start jitter since the last stats report",
+                      fn=lambda s=stats: s.max_jitter, loop=name)
+        metrics.counter('r2d2_loop_ticks_total', "Control loop ticks run",
+                        fn=lambda s=stats: s.ticks, loop=name)
+        metrics.counter('r2d2_loop_missed_total', "Control loop ticks skipped after an overrun",
+                        fn=lambda s=stats: s.missed, loop=name)
+    if motors:
+        register_md49_metrics(motors)
+    if motor_process:
+        metrics.gauge('r2d2_loop_jitter_seconds', "Start jitter of the last tick of a control loop",
+                      fn=lambda: motor_process.status().jitter, loop='motor_process')
+        metrics.gauge('r2d2_loop_max_jitter_seconds', "Worst start jitter since the last stats report",
+                      fn=lambda: motor_process.status().max_jitter, loop='motor_process')
+        metrics.counter('r2d2_loop_ticks_total', "Control loop ticks run",
+                        fn=lambda: motor_process.status().tick, loop='motor_process')
+        metrics.counter('r2d2_loop_missed_total', "Control loop ticks skipped after an overrun",
+                        fn=lambda: motor_process.status().missed, loop='motor_process')
+        metrics.counter('r2d2_serial_bytes_total', "Bytes over each serial link",
+                        fn=lambda: motor_process.status().bytes_written, device='md49', direction='tx')
+        metrics.counter('r2d2_serial_bytes_total', "Bytes over each serial link",
+                        fn=lambda: motor_process.status().bytes_read, device='md49', direction='rx')
+        metrics.counter('r2d2_serial_errors_total', "Serial errors per device",
+                        fn=lambda: motor_process.status().md49_errors, device='md49')
+        metrics.counter('r2d2_serial_errors_total', "Serial errors per device",
+                        fn=lambda: motor_process.status().saber_errors, device='sabertooth')
+    for port in serial_reactor.ports.values():
+        register_port_metrics(port)
+    if dome:
+        metrics.counter('r2d2_serial_errors_total', "Serial errors per device",
+                        fn=lambda: dome.errors + dome.parser.crc_errors, device='arduino')
+        metrics.counter('r2d2_dome_retransmits_total', "Dome frames sent again after a missing ACK",
+                        fn=lambda: dome.retransmits)
+        metrics.counter('r2d2_dome_failures_total', "Dome commands never acknowledged",
+                        fn=lambda: dome.failures)
+    metrics.gauge('r2d2_md49_volts', "Battery volts reported by the MD49", fn=lambda: md49_power.volts)
+    metrics.gauge('r2d2_md49_current_amps', "Motor current reported by the MD49",
+                  fn=lambda: md49_power.current1 / 10.0, motor='1')
+    metrics.gauge('r2d2_md49_current_amps', "Motor current reported by the MD49",
+                  fn=lambda: md49_power.current2 / 10.0, motor='2')
+    metrics.gauge('r2d2_md49_error', "MD49 error byte", fn=lambda: md49_power.error)
+    metrics.gauge('r2d2_odometry_position_meters', "Dead-reckoned position since startup",
+                  fn=lambda: odometry_estimate().x, axis='x')
+    metrics.gauge('r2d2_odometry_position_meters', "Dead-reckoned position since startup",
+                  fn=lambda: odometry_estimate().y, axis='y')
+    metrics.gauge('r2d2_odometry_heading_radians', "Dead-reckoned heading, counter-clockwise from the start",
+                  fn=lambda: odometry_estimate().heading)
+    metrics.gauge('r2d2_wheel_velocity_meters_per_second', "Wheel speed measured by the encoders",
+                  fn=lambda: odometry_estimate().velocity_left, wheel='left')
+    metrics.gauge('r2d2_wheel_velocity_meters_per_second', "Wheel speed measured by the encoders",
+                  fn=lambda: odometry_estimate().velocity_right, wheel='right')
+    metrics.counter('r2d2_lcd_flushes_total', "LCD refreshes written to the I2C bus",
+                    fn=lambda: lcd_service.flushes if lcd_service else 0)
+    if telemetry:
+        metrics.counter('r2d2_telemetry_dropped_total', "Telemetry records lost before reaching disk",
+                        fn=lambda: telemetry.dropped)
+
+def diagnostics_pages():
+    """
+    The pages the Select button cycles through on the LCD (16 characters per line).
+    """
+    events = RateMeter(metrics.counter('r2d2_input_events_total', "Gamepad events read"), time.monotonic)
 
-#TODO: Write proper commenting / function description
-async def saber_drive_loop(saber, interval=0.05):
-    global desired_head_value
-    logger.info("Starting Saber drive loop")
+    def loop_stats():
+        return scheduler.stats.get("md49_drive")
 
-    while True:
-        try:
-            saber.drive(1, int(desired_head_value * 80))
-        except Exception as e:
-            logger.error(f"Saber drive error: {e}")
-        await asyncio.sleep(interval)
+    def power_page():
+        stats = loop_stats()
+        jitter = f"{stats.last_jitter * 1000:.1f}ms" if stats else "--"
+        return [f"BAT {md49_power.volts}V ERR {md49_power.error:02X}",
+                f"IN{events.rate():4.0f}/s J{jitter}"]
 
-#TODO: Write proper commenting / function description
-async def arduino_send_loop(arduino_head):
-    logger.info("Starting Arduino send loop")
-    while True:
-        message = await arduino_queue.get()
-        try:
-            arduino_head.write(message)
-            clearLCDLine()
-            lcd.putstr(f"SENT ARD@: {message}")
-            await asyncio.sleep(0.05)
-        except Exception as e:
-            logger.error(f"Arduino send failed: {e}")
+    def link_page():
+        rtt = f"{dome_rtt.last * 1000:.0f}ms" if dome_rtt.last is not None else "--"
+        md49_errors = metrics.counter('r2d2_serial_errors_total', "Serial errors per device",
+                                      device='md49').get()
+        return [f"DOME RTT {rtt}", f"MD49 ERR {md49_errors}"]
+
+    def loop_page():
+        stats = loop_stats()
+        audio = audio_latency.quantile(0.99)
+        return [f"MISS {stats.missed if stats else 0} MAXJ {stats.max_jitter * 1000 if stats else 0:.1f}",
+                f"SND p99 {audio * 1000:.0f}ms" if audio is not None else "SND --"]
 
-async def arduino_read_loop(arduino_head):
+    def odometry_page():
+        estimate = odometry_estimate()
+        return [f"X{estimate.x:6.2f} Y{estimate.y:6.2f}",
+                f"H{math.degrees(estimate.heading):4.0f} V{estimate.linear_velocity:5.2f}m/s"]
+
+    return [power_page, link_page, loop_page, odometry_page]
+
+def set_audio_root(root):
     """
-    Asynchronously reads lines from the Arduino serial connection
-    and logs each response with a timestamp.
+    Point the sound lists at a different audio-files folder.
+
+    :param root: Folder holding the hum/, scream/, ... sub folders
     """
-    logger.info("Starting Arduino read loop")
+    global AUDIO_ROOT, hums, screams, sents, procs, starwars, annoyed, cantina
+    hums, screams, sents, procs, starwars, annoyed, cantina = (
+        [path.replace(AUDIO_ROOT, root, 1) for path in sounds]
+        for sounds in (hums, screams, sents, procs, starwars, annoyed, cantina))
+    AUDIO_ROOT = root
 
-    # Non-blocking read workaround using threads
-    loop = asyncio.get_event_loop()
-    
-    def read_line_blocking():
-        try:
-            line = arduino_head.readline()
-            return line
-        except Exception as e:
-            logger.error(f"Serial read failed: {e}")
-            return None
+def build_config_schema():
+    """
+    The settings the config file may contain, with the current constants as defaults.
+
+    Settings marked reloadable=False are read once at startup (ports, loop
+    rates, file locations); the rest take effect as soon as the file is saved.
+    """
+    return {
+        'devices': {
+            'gamepad_path': Setting(str, GAMEPAD_PATH, reloadable=False),
+            'md49_port': Setting(str, MD49_PORT, reloadable=False),
+            'saber_port': Setting(str, SABER_PORT, reloadable=False),
+            'saber_baud': Setting(int, SABER_BAUD, reloadable=False, minimum=1),
+            'arduino_port': Setting(str, ARDUINO_PORT, reloadable=False),
+            'arduino_baud': Setting(int, ARDUINO_BAUD, reloadable=False, minimum=1),
+            'lcd_address': Setting(int, I2C_ADDR, reloadable=False, minimum=0, maximum=0x7F),
+        },
+        'drive': {
+            'deadzone': Setting(float, STICK_DEADZONE, minimum=0.0, maximum=0.5),
+            'curve': Setting(float, STICK_CURVE, minimum=0.1, maximum=5.0),
+            'output_curve': Setting(float, OUTPUT_CURVE, minimum=0.1, maximum=5.0),
+            'drift_strength': Setting(float, DRIFT_STRENGTH, minimum=-1.0, maximum=1.0),
+            'invert_forward': Setting(bool, INVERT_FORWARD_AXIS),
+            'saber_scale': Setting(int, SABER_SCALE, minimum=0, maximum=127),
+        },
+        'motion': {
+            'enabled': Setting(bool, MOTION_PROFILE),
+            'accel': Setting(float, MOTION_ACCEL, minimum=1.0, maximum=10000.0),
+            'decel': Setting(float, MOTION_DECEL, minimum=1.0, maximum=10000.0),
+            'jerk': Setting(float, MOTION_JERK, minimum=1.0, maximum=100000.0),
+            'md49_acceleration': Setting(int, MD49_ACCELERATION, reloadable=False, minimum=1, maximum=10),
+        },
+        'odometry': {
+            'counts_per_rev': Setting(int, WHEEL_COUNTS_PER_REV, minimum=1),
+            'wheel_diameter': Setting(float, WHEEL_DIAMETER, minimum=0.01, maximum=1.0),
+            'track_width': Setting(float, WHEEL_TRACK, minimum=0.05, maximum=2.0),
+        },
+        'straight_line': {
+            'kp': Setting(float, STRAIGHT_KP, minimum=0.0, maximum=500.0),
+            'ki': Setting(float, STRAIGHT_KI, minimum=0.0, maximum=5000.0),
+            'max_correction': Setting(float, STRAIGHT_MAX_CORRECTION, minimum=0.0, maximum=127.0),
+        },
+        'loops': {
+            'md49_rate_hz': Setting(float, float(MD49_RATE_HZ), reloadable=False, minimum=1.0, maximum=200.0),
+            'saber_rate_hz': Setting(float, float(SABER_RATE_HZ), reloadable=False, minimum=1.0, maximum=200.0),
+            'stats_interval': Setting(float, LOOP_STATS_INTERVAL, minimum=1.0),
+            'motor_process': Setting(bool, MOTOR_PROCESS, reloadable=False),
+            'motor_process_cpu': Setting(int, -1 if MOTOR_PROCESS_CPU is None else MOTOR_PROCESS_CPU,
+                                         reloadable=False, minimum=-1),
+            'motor_process_priority': Setting(int, MOTOR_PROCESS_PRIORITY, reloadable=False,
+                                              minimum=0, maximum=99),
+        },
+        'failsafe': {
+            # Bounded: a long deadline would leave the droid driving with nobody in control
+            'input_deadline': Setting(float, INPUT_DEADLINE, minimum=0.05, maximum=1.0),
+            'probe_interval': Setting(float, INPUT_PROBE_INTERVAL, minimum=0.01, maximum=0.5),
+            'device_deadline': Setting(float, DEVICE_DEADLINE, minimum=0.1, maximum=5.0),
+            'check_interval': Setting(float, SUPERVISOR_INTERVAL, reloadable=False, minimum=0.005, maximum=0.1),
+            'reconnect_min_delay': Setting(float, RECONNECT_MIN_DELAY, minimum=0.1, maximum=60.0),
+            'reconnect_max_delay': Setting(float, RECONNECT_MAX_DELAY, minimum=0.1, maximum=300.0),
+        },
+        'telemetry': {
+            'directory': Setting(str, TELEMETRY_DIR, reloadable=False),
+            'flush_interval': Setting(float, TELEMETRY_FLUSH_INTERVAL, minimum=0.5),
+            'power_poll_interval': Setting(float, POWER_POLL_INTERVAL, minimum=0.05),
+        },
+        'audio': {
+            'root': Setting(str, AUDIO_ROOT, reloadable=False),
+            'pack_manifest': Setting(str, AUDIO_PACK_MANIFEST, reloadable=False),
+            'mixer_buffer': Setting(int, MIXER_BUFFER, reloadable=False, minimum=64),
+            'memory_budget_mb': Setting(int, SOUND_MEMORY_BUDGET // (1024 * 1024), reloadable=False, minimum=1),
+        },
+        'buttons': {
+            'a': Setting(int, aBtn), 'b': Setting(int, bBtn),
+            'x': Setting(int, xBtn), 'y': Setting(int, yBtn),
+            'l1': Setting(int, l1Btn), 'r1': Setting(int, r1Btn),
+            'select': Setting(int, selectBtn),
+            'forward_axis': Setting(int, lvaxis), 'turn_axis': Setting(int, lhaxis),
+            'head_axis': Setting(int, rhaxis),
+        },
+        'startup': {
+            'lcd_timeout': Setting(float, LCD_STARTUP_TIMEOUT, reloadable=False, minimum=0.1),
+            'md49_timeout': Setting(float, MD49_STARTUP_TIMEOUT, reloadable=False, minimum=0.1),
+            'saber_timeout': Setting(float, SABER_STARTUP_TIMEOUT, reloadable=False, minimum=0.1),
+            'arduino_timeout': Setting(float, ARDUINO_STARTUP_TIMEOUT, reloadable=False, minimum=0.1),
+            'audio_timeout': Setting(float, AUDIO_STARTUP_TIMEOUT, reloadable=False, minimum=0.1),
+            'arduino_boot_delay': Setting(float, ARDUINO_BOOT_DELAY, reloadable=False, minimum=0.0),
+        },
+        'logging': {
+            'file': Setting(str, LOG_FILE, reloadable=False),
+        },
+        'metrics': {
+            'host': Setting(str, METRICS_HOST, reloadable=False),
+            'port': Setting(int, METRICS_PORT, reloadable=False, minimum=0, maximum=65535),
+        },
+    }
+
+def apply_config(cfg, startup=False):
+    """
+    Copy config values into the module settings the control code reads.
+
+    Every assignment here is a plain rebinding done between two awaits, so
+    the control loops see either all of the old values or all of the new.
+
+    :param cfg: Config from load_config()
+    :param startup: Also apply the settings that are only read at startup
+    """
+    global STICK_DEADZONE, STICK_CURVE, OUTPUT_CURVE, DRIFT_STRENGTH, INVERT_FORWARD_AXIS, SABER_SCALE
+    global STRAIGHT_KP, STRAIGHT_KI, STRAIGHT_MAX_CORRECTION
+    global MOTION_PROFILE, MOTION_ACCEL, MOTION_DECEL, MOTION_JERK, MD49_ACCELERATION
+    global WHEEL_COUNTS_PER_REV, WHEEL_DIAMETER, WHEEL_TRACK
+    global LOOP_STATS_INTERVAL, TELEMETRY_FLUSH_INTERVAL, POWER_POLL_INTERVAL
+    global aBtn, bBtn, xBtn, yBtn, l1Btn, r1Btn, selectBtn, lvaxis, lhaxis, rhaxis
+    global GAMEPAD_PATH, MD49_PORT, SABER_PORT, SABER_BAUD, ARDUINO_PORT, ARDUINO_BAUD, I2C_ADDR
+    global MOTOR_PROCESS, MOTOR_PROCESS_CPU, MOTOR_PROCESS_PRIORITY
+    global MD49_RATE_HZ, SABER_RATE_HZ, TELEMETRY_DIR, AUDIO_PACK_MANIFEST, MIXER_BUFFER
+    global SOUND_MEMORY_BUDGET, LOG_FILE, METRICS_HOST, METRICS_PORT
+    global LCD_STARTUP_TIMEOUT, MD49_STARTUP_TIMEOUT, SABER_STARTUP_TIMEOUT
+    global ARDUINO_STARTUP_TIMEOUT, AUDIO_STARTUP_TIMEOUT, ARDUINO_BOOT_DELAY
+    global INPUT_DEADLINE, INPUT_PROBE_INTERVAL, DEVICE_DEADLINE, SUPERVISOR_INTERVAL
+    global RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY
+
+    drive = cfg.drive
+    STICK_DEADZONE, STICK_CURVE, OUTPUT_CURVE = drive.deadzone, drive.curve, drive.output_curve
+    DRIFT_STRENGTH, INVERT_FORWARD_AXIS, SABER_SCALE = drive.drift_strength, drive.invert_forward, drive.saber_scale
+    STRAIGHT_KP, STRAIGHT_KI = cfg.straight_line.kp, cfg.straight_line.ki
+    STRAIGHT_MAX_CORRECTION = cfg.straight_line.max_correction
+    motion = cfg.motion
+    if motion.enabled != MOTION_PROFILE:
+        # Carry on from the speeds the motors are running at
+        motion_profile.reset(md49_output.left, md49_output.right)
+    MOTION_PROFILE, MOTION_ACCEL, MOTION_DECEL, MOTION_JERK = motion.enabled, motion.accel, motion.decel, motion.jerk
+    WHEEL_COUNTS_PER_REV = cfg.odometry.counts_per_rev
+    WHEEL_DIAMETER, WHEEL_TRACK = cfg.odometry.wheel_diameter, cfg.odometry.track_width
+    LOOP_STATS_INTERVAL = cfg.loops.stats_interval
+    TELEMETRY_FLUSH_INTERVAL = cfg.telemetry.flush_interval
+    POWER_POLL_INTERVAL = cfg.telemetry.power_poll_interval
+    buttons = cfg.buttons
+    aBtn, bBtn, xBtn, yBtn = buttons.a, buttons.b, buttons.x, buttons.y
+    l1Btn, r1Btn, selectBtn = buttons.l1, buttons.r1, buttons.select
+    lvaxis, lhaxis, rhaxis = buttons.forward_axis, buttons.turn_axis, buttons.head_axis
+    failsafe = cfg.failsafe
+    INPUT_DEADLINE, INPUT_PROBE_INTERVAL = failsafe.input_deadline, failsafe.probe_interval
+    DEVICE_DEADLINE = failsafe.device_deadline
+    RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY = failsafe.reconnect_min_delay, failsafe.reconnect_max_delay
+
+    straight_line.kp, straight_line.ki = STRAIGHT_KP, STRAIGHT_KI
+    straight_line.max_correction = STRAIGHT_MAX_CORRECTION
+    motion_profile.configure(MOTION_ACCEL, MOTION_DECEL, MOTION_JERK)
+    odometry.configure(WHEEL_COUNTS_PER_REV, WHEEL_DIAMETER, WHEEL_TRACK)
+    scheduler.report_interval = LOOP_STATS_INTERVAL
+    if telemetry:
+        telemetry.flush_interval = TELEMETRY_FLUSH_INTERVAL
+    for heartbeat in supervisor.heartbeats.values():
+        heartbeat.deadline = INPUT_DEADLINE if heartbeat.name == 'input' else DEVICE_DEADLINE
+
+    if startup:
+        devices = cfg.devices
+        GAMEPAD_PATH, MD49_PORT, SABER_PORT = devices.gamepad_path, devices.md49_port, devices.saber_port
+        SABER_BAUD, ARDUINO_PORT, ARDUINO_BAUD = devices.saber_baud, devices.arduino_port, devices.arduino_baud
+        I2C_ADDR = devices.lcd_address
+        MD49_ACCELERATION = motion.md49_acceleration
+        MD49_RATE_HZ, SABER_RATE_HZ = cfg.loops.md49_rate_hz, cfg.loops.saber_rate_hz
+        MOTOR_PROCESS, MOTOR_PROCESS_PRIORITY = cfg.loops.motor_process, cfg.loops.motor_process_priority
+        MOTOR_PROCESS_CPU = None if cfg.loops.motor_process_cpu < 0 else cfg.loops.motor_process_cpu
+        TELEMETRY_DIR = cfg.telemetry.directory
+        if cfg.audio.root != AUDIO_ROOT:
+            set_audio_root(cfg.audio.root)
+        AUDIO_PACK_MANIFEST, MIXER_BUFFER = cfg.audio.pack_manifest, cfg.audio.mixer_buffer
+        SOUND_MEMORY_BUDGET = cfg.audio.memory_budget_mb * 1024 * 1024
+        LOG_FILE = cfg.logging.file
+        METRICS_HOST, METRICS_PORT = cfg.metrics.host, cfg.metrics.port
+        start = cfg.startup
+        LCD_STARTUP_TIMEOUT, MD49_STARTUP_TIMEOUT = start.lcd_timeout, start.md49_timeout
+        SABER_STARTUP_TIMEOUT, ARDUINO_STARTUP_TIMEOUT = start.saber_timeout, start.arduino_timeout
+        AUDIO_STARTUP_TIMEOUT, ARDUINO_BOOT_DELAY = start.audio_timeout, start.arduino_boot_delay
+        SUPERVISOR_INTERVAL = failsafe.check_interval
+        supervisor.check_interval = SUPERVISOR_INTERVAL
+
+def check_config(cfg):
+    """
+    Rules between settings that build_config_schema() cannot express one
+    value at a time. Raises ConfigError.
+    """
+    failsafe = cfg.failsafe
+    if failsafe.probe_interval + failsafe.check_interval >= failsafe.input_deadline:
+        # A still stick is only kept alive by the probe; if the probe plus
+        # one supervisor check does not fit in the deadline, it trips anyway
+        raise ConfigError(f"failsafe.input_deadline ({failsafe.input_deadline}) must be longer than "
+                          f"probe_interval + check_interval "
+                          f"({failsafe.probe_interval} + {failsafe.check_interval})")
+    if failsafe.reconnect_min_delay > failsafe.reconnect_max_delay:
+        raise ConfigError(f"failsafe.reconnect_min_delay ({failsafe.reconnect_min_delay}) must not be "
+                          f"longer than reconnect_max_delay ({failsafe.reconnect_max_delay})")
+
+def mixer_settings(cfg):
+    """The DriveMixer arguments a config asks for."""
+    return dict(curve_factor=cfg.drive.curve, deadzone=cfg.drive.deadzone,
+                drift_strength=cfg.drive.drift_strength, output_curve=cfg.drive.output_curve,
+                invert_forward=cfg.drive.invert_forward)
+
+def load_settings():
+    """
+    Read CONFIG_FILE (if there is one) and apply all of it, including the
+    startup-only settings. A broken file is ignored in favour of the
+    constants in this script.
+
+    :return: The reason the file was ignored, or None
+    """
+    global config, config_schema
+    config_schema = build_config_schema()
+    error = None
+    try:
+        config = load_config(CONFIG_FILE, config_schema, (check_config,))
+    except ConfigError as e:
+        error = str(e)
+        config = load_config(None, config_schema)
+    apply_config(config, startup=True)
+    return error
+
+def build_drive_mixer():
+    """
+    Build the drive lookup table from the current settings. This takes a
+    fraction of a second (longer on the Pi), so main() runs it on a worker
+    thread while the devices come up.
+    """
+    return DriveMixer(curve_factor=STICK_CURVE, deadzone=STICK_DEADZONE,
+                      drift_strength=DRIFT_STRENGTH, output_curve=OUTPUT_CURVE,
+                      invert_forward=INVERT_FORWARD_AXIS)
+
+def motor_tuning():
+    """The current drive settings, as MotorProcess.set_tuning() arguments."""
+    return dict(mixer=drive_mixer, kp=STRAIGHT_KP, ki=STRAIGHT_KI,
+                max_correction=STRAIGHT_MAX_CORRECTION, saber_scale=SABER_SCALE,
+                power_poll_interval=POWER_POLL_INTERVAL, failsafe_deadline=INPUT_DEADLINE,
+                motion_profile=MOTION_PROFILE, accel=MOTION_ACCEL, decel=MOTION_DECEL, jerk=MOTION_JERK,
+                counts_per_rev=WHEEL_COUNTS_PER_REV, wheel_diameter=WHEEL_DIAMETER, track_width=WHEEL_TRACK)
+
+async def reload_config(old, new, changed):
+    """
+    ConfigWatcher callback: apply a changed config file while running.
 
+    A new drive lookup table takes a moment to build, so it is built in a
+    worker thread from the new values and swapped in whole; until then the
+    drive loop keeps using the old table.
+    """
+    global drive_mixer
+    if mixer_settings(new) != mixer_settings(old):
+        mixer = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: DriveMixer(**mixer_settings(new)))
+        apply_config(new)
+        drive_mixer = mixer
+        # Make the drive loop resend its command through the new table
+        md49_output.version = -1
+    else:
+        apply_config(new)
+    if motor_process:
+        motor_process.set_tuning(**motor_tuning())
+    show_status("CONFIG RELOADED")
+
+def failsafe_stop(reason, lost_at):
+    """
+    Centre the controls and stop every motor now, ahead of anything queued.
+
+    :param reason: Why, for the log and metrics ('disconnected', 'deadline' or 'error')
+    :param lost_at: time.monotonic() of the gamepad's last sign of life
+    """
+    global failsafe_active
+    if failsafe_active:
+        return
+    failsafe_active = True
+    control_state.neutral()
+    if motor_process:
+        # The motor process stops on the neutral controls (or, if this
+        # process stalls, on the missing heartbeat)
+        asyncio.ensure_future(measure_motor_process_stop(lost_at))
+    else:
+        if motors:
+            try:
+                # Straight to neutral: the failsafe does not wait for a ramp
+                motors.stop_now()
+                motion_profile.reset()
+                md49_output.left = md49_output.right = NEUTRAL_SPEED
+            except Exception as e:
+                logger.error(f"Failed stopping motors: {e}")
+        if saber:
+            try:
+                saber.drive(1, 0)
+            except Exception as e:
+                logger.error(f"Failed stopping saber: {e}")
+        stop_latency.observe(time.monotonic() - lost_at)
+    metrics.counter('r2d2_failsafe_stops_total', "Times the failsafe stopped the motors",
+                    reason=reason).inc()
+    logger.warning(f"Failsafe stop ({reason}), {(time.monotonic() - lost_at) * 1000:.0f} ms "
+                   f"after the last input")
+    show_message("CTRL LOST")
+
+async def measure_motor_process_stop(lost_at):
+    """Record the stop latency once the motor process reports neutral speeds."""
+    give_up = time.monotonic() + 1.0
+    while time.monotonic() < give_up:
+        status = motor_process.status()
+        if status.left == NEUTRAL_SPEED and status.right == NEUTRAL_SPEED:
+            stop_latency.observe(time.monotonic() - lost_at)
+            return
+        await asyncio.sleep(0.005)
+    logger.error("Motor process did not report stopped motors within 1 s of the failsafe")
+
+def input_lost(heartbeat):
+    """Supervisor action: the gamepad has been quiet for longer than INPUT_DEADLINE."""
+    failsafe_stop('deadline', heartbeat.last)
+
+def input_back(heartbeat):
+    """Supervisor action: the gamepad answers again. The stick must move before the droid does."""
+    global failsafe_active
+    failsafe_active = False
+    show_message("CTRL CONNECTED")
+
+def motor_heartbeat_tick():
+    """
+    Tell the motor process the gamepad and this process are both alive.
+    Without it the motor process stops the motors on its own.
+    """
+    if not failsafe_active and supervisor.healthy('input'):
+        motor_process.heartbeat()
+
+async def probe_gamepad(gamepad):
+    """
+    Beat the input heartbeat while the gamepad is connected but quiet.
+
+    evdev only reports changes, so a stick held still sends nothing; asking
+    the kernel for an axis' state shows the device is still there. Raises
+    OSError once it is gone.
+    """
     while True:
-        line = await loop.run_in_executor(None, read_line_blocking)
-        if line:
-            logger.info(f"Arduino: {line}")
-        await asyncio.sleep(0.01)  # Prevent tight loop
+        await asyncio.sleep(INPUT_PROBE_INTERVAL)
+        gamepad.absinfo(lvaxis)
+        input_heartbeat.beat()
+
+async def read_frames(gamepad):
+    """Apply gamepad frames as they arrive."""
+    # One frame per batch of evdev reports: the latest value of every moved
+    # axis, plus the button and D-pad edges in order.
+    reader = GamepadReader(gamepad)
+    metrics.counter('r2d2_input_events_total', "Gamepad events read", fn=lambda: reader.events)
+    metrics.counter('r2d2_input_frames_total', "Gamepad frames handled", fn=lambda: reader.frames)
+    metrics.counter('r2d2_input_coalesced_total', "Stick values superseded within a frame",
+                    fn=lambda: reader.coalesced)
+    async for frame in reader:
+        input_heartbeat.beat()
+        # Publish all axes of the frame as one version of the drive state
+        with control_state.writing():
+            for code, value in frame.axes.items():
+                apply_axis(code, value)
+        for event in frame.edges:
+            if event.type == ecodes.EV_KEY:
+                # Only act on presses, not releases or autorepeat
+                if event.value == 1:
+                    await process_event(event)
+            else:
+                await process_dpad(event)
+
+async def handle_input(gamepad):
+    """
+    Apply gamepad input until the gamepad is lost: raises OSError as soon as
+    either the reader or the probe finds it gone.
+    """
+    input_heartbeat.beat()
+    frames = asyncio.create_task(read_frames(gamepad))
+    probe = asyncio.create_task(probe_gamepad(gamepad))
+    try:
+        done, _ = await asyncio.wait((frames, probe), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        frames.cancel()
+        probe.cancel()
+    for task in done:
+        task.result()
+
+async def open_gamepad_async():
+    return open_gamepad(GAMEPAD_PATH)
 
-#TODO: Write proper commenting / function description
-#TODO: Look into why saber is undefined here (suspect not in scope)
 async def main_loop(gamepad):
-    async for event in gamepad.async_read_loop():
-        try:
-            if event.type == ecodes.EV_KEY:
-                asyncio.create_task(process_event(event))
-            elif event.type == ecodes.EV_ABS:
-                asyncio.create_task(process_joystick(event))
+    """
+    Handle gamepad input for as long as the program runs.
 
-        except (OSError, IOError) as ex:
+    A lost gamepad stops the motors straight away and is reopened with a
+    growing delay between attempts. One that goes quiet without an error
+    is caught by the supervisor after INPUT_DEADLINE.
+    """
+    global input_heartbeat, failsafe_active
+    input_heartbeat = supervisor.watch('input', INPUT_DEADLINE, input_lost, input_back)
+    register_heartbeat_metrics(input_heartbeat)
+    backoff = Backoff(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY)
+    while True:
+        try:
+            await handle_input(gamepad)
+        except OSError as ex:
             logger.warning(f"Gamepad disconnected: {ex}")
-            lcd.clear()
-            lcd.putstr("CTRL LOST")
-
-            # Stop motors and saber safely
-            if saber:
-                try:
-                    saber.drive(1, 0)
-                except Exception as e:
-                    logger.error(f"Failed stopping saber: {e}")
-            if motors:
-                try:
-                    motors.set_speed(1, 128)
-                    motors.set_speed(2, 128)
-                except Exception as e:
-                    logger.error(f"Failed stopping motors: {e}")
-
-            # Try to reconnect
-            gamepad = None
-            while gamepad is None:
-                try:
-                    lcd.clear()
-                    lcd.putstr("WAITING FOR CTRL")
-                    gamepad = InputDevice(gamepad_path)
-                    lcd.clear()
-                    lcd.putstr("CTRL CONNECTED")
-                except Exception:
-                    await asyncio.sleep(2)
+            failsafe_stop('disconnected', input_heartbeat.last)
         except Exception as ex:
             logger.exception(f"Unexpected exception in main loop: {ex}")
-            lcd.clear()
-            lcd.putstr("R2D2 offline!")
-            if saber:
-                try:
-                    saber.drive(1, 0)
-                except Exception as e:
-                    logger.error(f"Failed stopping saber: {e}")
-            if motors:
-                try:
-                    motors.set_speed(1, 128)
-                    motors.set_speed(2, 128)
-                except Exception as e:
-                    logger.error(f"Failed stopping motors: {e}")
-            break
-
-# Write additional commenting
-async def main():
-    gamepad_path = '/dev/input/event6'
-
+            failsafe_stop('error', input_heartbeat.last)
+            show_message("R2D2 offline!")
+            return
+        show_message("WAITING FOR CTRL")
+        gamepad = await reconnect("Gamepad", open_gamepad_async, backoff)
+        failsafe_active = False
+        show_message("CTRL CONNECTED")
+
+async def connect_md49():
+    """Open the MD49 and check it answers (bring_up_md49 alone only writes)."""
+    board = await bring_up_md49()
+    try:
+        await board.get_error()
+    except Exception:
+        await board.close()
+        raise
+    return board
+
+async def md49_lost(heartbeat):
+    """Supervisor action: the MD49 stopped answering. Reopen it until it does."""
+    global motors
+    board, motors = motors, None
+    if board is None:
+        return
+    show_message("MD49 LOST")
+    try:
+        board.stop_now()
+    except Exception:
+        pass
+    await board.close()
+    motors = await reconnect("MD49", connect_md49, Backoff(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY))
+    register_md49_metrics(motors)
+    # Ramp up to the current command again on the fresh board, whose
+    # encoders start again from zero
+    motion_profile.reset()
+    odometry.restart()
+    md49_output.left = md49_output.right = NEUTRAL_SPEED
+    md49_output.version = -1
+    show_message("MD49 CONNECTED")
+
+async def saber_lost(heartbeat):
+    """
+    Supervisor action: writes to the Sabertooth keep failing (e.g. the USB
+    adapter was unplugged). Reopen it until they work. A Sabertooth that
+    loses power cannot be noticed: it never answers.
+    """
+    global saber
+    dome_motor, saber = saber, None
+    if dome_motor is None:
+        return
+    show_message("SABER LOST")
+    try:
+        dome_motor.saber.close()
+    except Exception:
+        pass
+    saber = await reconnect("Sabertooth", lambda: bring_up_saber(wiggle=False),
+                            Backoff(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY))
+    register_port_metrics(saber.saber)
+    show_message("SABER CONNECTED")
+
+def attach_dome_port(dome, port):
+    """Feed the dome link from the Arduino's port, and reopen the port if it is lost."""
+    dome.port = port
+    port.receiver = dome.feed
+    port.on_lost = lambda port: arduino_lost(dome, port)
+
+def arduino_lost(dome, port):
+    """SerialPort on_lost: the Arduino hung up (e.g. its USB adapter was unplugged)."""
+    global arduino_reconnect
+    if arduino_reconnect is None or arduino_reconnect.done():
+        arduino_reconnect = asyncio.ensure_future(reopen_arduino(dome, port))
+
+async def reopen_arduino(dome, port):
+    """Reopen the Arduino until it is back; the dome link carries on over the new port."""
+    show_message("DOME LOST")
+    port.close()
+    arduino_head = await reconnect("Arduino", bring_up_arduino, Backoff(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY))
+    port = serial_reactor.open('arduino', arduino_head)
+    attach_dome_port(dome, port)
+    register_port_metrics(port)
+    show_message("DOME CONNECTED")
+
+def open_audio():
+    """
+    Initialize the mixer and decode every clip so button presses never touch
+    the SD card. Blocking: main() runs it on a worker thread.
+    """
+    # Imported here: pygame alone is a noticeable part of startup, and
+    # nothing else needs it
+    import pygame
+    from lib.sound_bank import SoundBank
+
+    pygame.mixer.init(frequency=MIXER_FREQUENCY, buffer=MIXER_BUFFER)
+    bank = SoundBank(memory_budget=SOUND_MEMORY_BUDGET, num_channels=MIXER_CHANNELS)
+    if os.path.exists(AUDIO_PACK_MANIFEST):
+        try:
+            bank.load_pack(AUDIO_PACK_MANIFEST, AUDIO_ROOT)
+        except Exception as e:
+            logger.error(f"Failed to load audio packs: {e}")
+    bank.preload(hums + screams + sents + procs + starwars + annoyed + cantina)
+    return bank
+
+async def bring_up_md49():
+    board = MD49.AsyncMotorBoardMD49(port=MD49_PORT, reactor=serial_reactor)
+    await board.reset_to_defaults()
+    await board.set_acceleration(MD49_ACCELERATION)
+    await board.set_speeds(128, 128)
+    logging.info(f"md49 motor controller connected: {board}")
+    return board
+
+async def bring_up_saber(wiggle=True):
+    # Imported here to keep it off the startup path of the other devices
+    from pysabertooth import Sabertooth
+
+    loop = asyncio.get_running_loop()
+    dome_motor = await loop.run_in_executor(
+        None, lambda: Sabertooth(SABER_PORT, timeout=0.1, baudrate=SABER_BAUD, address=128))
+    # From here on pysabertooth writes through the reactor and never blocks the loop
+    dome_motor.saber = serial_reactor.open('sabertooth', dome_motor.saber)
+    if wiggle:
+        # Wiggle the dome so it is obvious the Sabertooth is alive
+        dome_motor.drive(1, 50)
+        await asyncio.sleep(0.2)
+        dome_motor.drive(1, -50)
+        await asyncio.sleep(0.2)
+    dome_motor.drive(1, 0)
+    return dome_motor
+
+async def bring_up_arduino():
+    loop = asyncio.get_running_loop()
+    arduino_head = await loop.run_in_executor(
+        None, lambda: serial.Serial(ARDUINO_PORT, ARDUINO_BAUD, timeout=0))
+    # Opening the port resets the Arduino; give its bootloader time to hand over
+    await asyncio.sleep(ARDUINO_BOOT_DELAY)
+    return arduino_head
+
+async def bring_up_motor_process(startup):
+    # The drive table is built here and copied into shared memory, so the
+    # motor process never has to build one itself
+    global drive_mixer
+    mixer, = await startup.wait('drive_table')
+    drive_mixer = mixer or build_drive_mixer()
+    motor_process.set_tuning(**motor_tuning())
+    await motor_process.start()
+    return motor_process
+
+async def wait_for_gamepad():
     while True:
         try:
-            lcd.clear()
-            lcd.putstr("WAITING FOR CTRL")
-            gamepad = InputDevice(gamepad_path)
-            lcd.clear()
-            lcd.putstr("CTRL CONNECTED")
-            break
+            show_message("WAITING FOR CTRL")
+            gamepad = open_gamepad(GAMEPAD_PATH)
+            show_message("CTRL CONNECTED")
+            return gamepad
         except Exception:
             await asyncio.sleep(2)
 
-    pygame.mixer.init()
-
-    serial_port = '/dev/ttyUSB0'
-    # arduino_serial_port = '/dev/ttyUSB0'
-    baud_rate = 9600
+async def start_display(startup):
+    """Takes over the LCD once it is initialized."""
+    global lcd_service, diagnostics
+    lcd, = await startup.wait('lcd')
+    if lcd is None:
+        return
+    # All text goes through the framebuffer so only changed cells hit the I2C bus.
+    lcd_service = LcdService(LcdFramebuffer(lcd))
+    asyncio.create_task(lcd_service.run())
+    show_message("CTRL CONNECTED" if startup.phases['gamepad'].ok else "WAITING FOR CTRL")
+    diagnostics = DiagnosticsPage(lcd_service, diagnostics_pages())
+    asyncio.create_task(diagnostics.run())
+
+async def start_drive(startup):
+    """Starts the MD49 drive loop as soon as the board and the drive table are ready."""
+    global drive_mixer, motors, telemetry, md49_heartbeat
+    if motor_process:
+        board, mixer = await startup.wait('motor_process', 'drive_table')
+    else:
+        board, mixer = await startup.wait('md49', 'drive_table')
+    drive_mixer = mixer or build_drive_mixer()
+    if CONFIG_FILE:
+        # Started after the table is in place so a reload cannot be overwritten by it
+        watcher = ConfigWatcher(CONFIG_FILE, config_schema, config, reload_config, CONFIG_POLL_INTERVAL,
+                                (check_config,))
+        asyncio.create_task(watcher.run())
+    if board is None:
+        return
+    if motor_process:
+        scheduler.add("motor_heartbeat", 1.0 / SUPERVISOR_INTERVAL, motor_heartbeat_tick)
+        if motor_process.md49_ok:
+            scheduler.add("motor_status", MD49_RATE_HZ, motor_status_tick)
+            telemetry = TelemetryRecorder(TELEMETRY_DIR, flush_interval=TELEMETRY_FLUSH_INTERVAL)
+            asyncio.create_task(telemetry.run())
+        return
+    motors = board
+    # (motors is None while md49_lost() reconnects it)
+    scheduler.add("md49_drive", MD49_RATE_HZ, lambda: md49_drive_tick(motors) if motors else None)
+    md49_heartbeat = supervisor.watch('md49', DEVICE_DEADLINE, md49_lost)
+    register_heartbeat_metrics(md49_heartbeat)
+    telemetry = TelemetryRecorder(TELEMETRY_DIR, flush_interval=TELEMETRY_FLUSH_INTERVAL)
+    asyncio.create_task(telemetry.run())
+    asyncio.create_task(poll_md49_telemetry())
+
+async def start_saber(startup):
+    global saber, saber_heartbeat
+    if motor_process:
+        return  # the motor process drives the dome
+    dome_motor, = await startup.wait('sabertooth')
+    if dome_motor is None:
+        return
+    saber = dome_motor
+    scheduler.add("saber_drive", SABER_RATE_HZ, lambda: saber_drive_tick(saber) if saber else None)
+    saber_heartbeat = supervisor.watch('sabertooth', DEVICE_DEADLINE, saber_lost)
+    register_heartbeat_metrics(saber_heartbeat)
+
+async def start_dome(startup):
+    """Starts the dome link once the Arduino has booted. Returns the DomeLink or None."""
+    arduino_head, = await startup.wait('arduino')
+    if arduino_head is None:
+        return None
+    port = serial_reactor.open('arduino', arduino_head)
+    dome = DomeLink(port)
+    attach_dome_port(dome, port)
+    asyncio.create_task(dome.run())
+    asyncio.create_task(arduino_send_loop(dome))
+    return dome
+
+async def start_audio(startup):
+    global sound_bank
+    sound_bank, = await startup.wait('audio')
+    if sound_bank:
+        asyncio.create_task(play_sound(starwars, "SOUND: STARWARS"))
 
-    try:
-        motors = MD49.MotorBoardMD49(port='/dev/ttyS0')
-        motors.reset_to_defaults()
-        motors.set_speed(1, 128)  
-        motors.set_speed(2, 128)
-
-        # ### REMOVE ME - TEMP TESTING ###
-        # lcd.clear()
-        # lcd.putstr("Testing L Motor")
-        # motors.set_speed(1, 200)  # Left motor forward
-        # motors.set_speed(2, 128)  # Right motor neutral
-        # time.sleep(3)
-
-        # motors.set_speed(1, 128)  # Left motor neutral
-        # motors.set_speed(2, 200)  # Right motor forward
-        # lcd.clear()
-        # lcd.putstr("Testing R Motor")
-        # time.sleep(3)
-
-        # motors.set_speed(1, 128)  # Stop both motors
-        # motors.set_speed(2, 128)
-        # lcd.clear()
-        # lcd.putstr("Test Complete")
-        # ### REMOVE ME - TEMP TESTING ###
-
-
-        logging.info(f"md49 motor controller connected: {motors}")
-    except Exception as e:
-        logger.error(f"Error connecting to MD49: {e}")
+async def report_startup(startup, drive_task, dome_task):
+    """Logs when the droid became drivable and the per-phase timings once everything is up."""
+    await drive_task
+    await startup.wait('gamepad')
+    if motors or (motor_process and motor_process.md49_ok):
+        startup.mark('drivable')
+        metrics.gauge('r2d2_startup_drivable_seconds',
+                      "Seconds from process start until the drive loop and gamepad were both ready"
+                      ).set(startup.milestones['drivable'])
+        since_boot = seconds_since_boot()
+        if since_boot is not None:
+            logger.info(f"Drivable {since_boot:.1f}s after boot")
+    await startup.wait_all()
+    register_metrics(await dome_task)
+    for name, phase in startup.phases.items():
+        metrics.gauge('r2d2_startup_phase_seconds', "Time each startup phase took",
+                      phase=name).set(phase.duration)
+    logger.info("Startup timing:\n  " + "\n  ".join(startup.summary()))
+
+async def serial_stats_loop():
+    """Logs the reactor's per-port counters alongside the loop stats."""
+    while True:
+        await asyncio.sleep(LOOP_STATS_INTERVAL)
+        for line in serial_reactor.summary():
+            logger.info(f"Serial stats {line}")
 
-    try:
-        saber = Sabertooth("/dev/ttyAMA3", timeout=0.1, baudrate=9600, address=128)
-        saber.drive(1, 50)
-        await asyncio.sleep(0.2)
-        saber.drive(1, -50)
-        await asyncio.sleep(0.2)
-        asyncio.create_task(play_sound(starwars, "SOUND: STARWARS"))
-        saber.drive(1, 0)
-    except Exception as e:
-        logger.error(f"Error connecting to Sabertooth: {e}")
+async def main():
+    """
+    Bring all devices up at once, start each control loop as soon as its
+    own device is ready, then handle gamepad input.
 
-    # Initialize the serial connection
+    Every device gets its own startup phase with a timeout; one that fails
+    or times out is left out (its loop never starts) instead of holding up
+    the rest.
+    """
+    global motor_process, control_state
+    if config is None:
+        error = load_settings()
+        if error:
+            logger.error(f"Config file ignored, using defaults: {error}")
+    if MOTOR_PROCESS:
+        # The input handler writes straight into the motor process's shared memory
+        motor_process = MotorProcess(MD49_PORT, SABER_PORT, SABER_BAUD, MD49_RATE_HZ, SABER_RATE_HZ,
+                                     MOTOR_PROCESS_CPU, MOTOR_PROCESS_PRIORITY, MD49_ACCELERATION)
+        control_state = motor_process.control
+
+    startup = Startup(PROCESS_STARTED_AT)
+    startup.run_blocking('lcd', open_lcd, LCD_STARTUP_TIMEOUT)
+    startup.run_blocking('drive_table', build_drive_mixer)
+    if MOTOR_PROCESS:
+        startup.run('motor_process', bring_up_motor_process(startup),
+                    MD49_STARTUP_TIMEOUT + SABER_STARTUP_TIMEOUT)
+    else:
+        startup.run('md49', bring_up_md49(), MD49_STARTUP_TIMEOUT)
+        startup.run('sabertooth', bring_up_saber(), SABER_STARTUP_TIMEOUT)
+    startup.run('arduino', bring_up_arduino(), ARDUINO_STARTUP_TIMEOUT)
+    startup.run_blocking('audio', open_audio, AUDIO_STARTUP_TIMEOUT)
+    startup.run('gamepad', wait_for_gamepad())
+
+    scheduler.start()
+    asyncio.create_task(supervisor.run())
+    asyncio.create_task(start_display(startup))
+    drive_task = asyncio.create_task(start_drive(startup))
+    asyncio.create_task(start_saber(startup))
+    dome_task = asyncio.create_task(start_dome(startup))
+    asyncio.create_task(start_audio(startup))
+    asyncio.create_task(report_startup(startup, drive_task, dome_task))
+    asyncio.create_task(serial_stats_loop())
     try:
-        arduino_head = serial.Serial(serial_port, baud_rate, timeout=10)
-        await asyncio.sleep(2)
+        await MetricsServer(metrics, METRICS_HOST, METRICS_PORT).start()
     except Exception as e:
-        logging.error(f"Failed to open serial to Arduino: {e}")
-        arduino_head = None
-
-    if motors:
-        asyncio.create_task(md49_drive_loop(motors))
-    if saber:
-        asyncio.create_task(saber_drive_loop(saber))
-    if arduino_head:
-        asyncio.create_task(arduino_send_loop(arduino_head))
-        asyncio.create_task(arduino_read_loop(arduino_head))
+        logger.error(f"Failed to start metrics server: {e}")
 
+    gamepad, = await startup.wait('gamepad')
     await main_loop(gamepad)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # Read the config first: it may move the log file
+    config_error = load_settings()
+    # Log lines are written by a background thread so SD card writes never
+    # hold up the control loops; repeated errors are rate limited.
+    setup_logging(LOG_FILE, level=logging.INFO, format_string='%(asctime)s - %(levelname)s - %(message)s')
+    logger.info("Starting with the application logs")
+    if config_error:
+        logger.error(f"Config file ignored, using defaults: {config_error}")
+    asyncio.run(main())
@@ -23,9 +23,24 @@ bool whichTriangle = true;  // Tracks which triangle to draw in animation
 // Create NeoPixel object (7 LEDs connected to NEOPIXELPIN)
 Adafruit_NeoPixel pixels(7, NEOPIXELPIN, NEO_GRB + NEO_KHZ800);
 
-// Variables for command reception over serial
-bool receivedCommand = false;
-uint8_t command = 0;
+// === Framed serial protocol (see lib/dome_link.py on the Pi) ===
+// START | SEQ | OPCODE | LEN | PAYLOAD | CRC8, CRC8 (poly 0x07) over SEQ..PAYLOAD
+#define FRAME_START 0xA5
+#define FRAME_MAX_PAYLOAD 16
+#define OP_SYNC 0x00
+#define OP_ACK 0x80
+#define SEQ_HISTORY 8   // Recently seen sequence numbers, to ignore retransmits
+
+enum FrameState { WAIT_START, READ_SEQ, READ_OPCODE, READ_LEN, READ_PAYLOAD, READ_CRC };
+FrameState frameState = WAIT_START;
+uint8_t frameSeq = 0;
+uint8_t frameOpcode = 0;
+uint8_t frameLen = 0;
+uint8_t framePayload[FRAME_MAX_PAYLOAD];
+uint8_t framePos = 0;
+
+int seqHistory[SEQ_HISTORY];
+uint8_t seqHistoryPos = 0;
 
 // Servo objects for the 3 flaps and their open/closed state flags
 Servo servos[SERVO_COUNT];
@@ -280,6 +295,120 @@ void handleAnimation() {
   }
 }
 
+// === Framed protocol helpers ===
+
+// CRC8 with polynomial 0x07, matching crc8() in lib/dome_link.py
+uint8_t crc8Update(uint8_t crc, uint8_t data) {
+  crc ^= data;
+  for (uint8_t i = 0; i < 8; i++) {
+    crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+  }
+  return crc;
+}
+
+// Send an ACK frame for a received sequence number
+void sendAck(uint8_t seq, uint8_t opcode) {
+  uint8_t frame[6] = {FRAME_START, seq, OP_ACK, 1, opcode, 0};
+  uint8_t crc = 0;
+  for (uint8_t i = 1; i < 5; i++) {
+    crc = crc8Update(crc, frame[i]);
+  }
+  frame[5] = crc;
+  Serial.write(frame, sizeof(frame));
+}
+
+void clearSeqHistory() {
+  for (int i = 0; i < SEQ_HISTORY; i++) {
+    seqHistory[i] = -1;
+  }
+}
+
+// Returns true if the sequence number was seen recently, otherwise records it
+bool isDuplicate(uint8_t seq) {
+  for (int i = 0; i < SEQ_HISTORY; i++) {
+    if (seqHistory[i] == seq) return true;
+  }
+  seqHistory[seqHistoryPos] = seq;
+  seqHistoryPos = (seqHistoryPos + 1) % SEQ_HISTORY;
+  return false;
+}
+
+// Run the action for a command
+void handleCommand(uint8_t command) {
+  if (command == 11) { 
+    // Command 11: Close all flaps immediately
+    closeAllFlaps();
+  } else if (command >= 1 && command <= 3) {
+    // Commands 1-3: Toggle respective flap (0-based index)
+    toggleFlap(command - 1);
+  } else if (command == 4) { 
+    // Command 4: Start wave sequence if not already running
+    closeAllFlaps();
+    if (!waveActive) {
+      waveActive = true;
+      waveOpening = true;
+      waveIndex = 0;
+      waveLastMoveTime = millis();
+      Serial.println("Starting wave sequence");
+    }
+  } else if (command == 5) { 
+    // Command 5: Start startled sequence
+    closeAllFlaps();
+    startStartledSequence();
+  }
+}
+
+// Called once a complete frame with a valid CRC has arrived
+void handleFrame() {
+  // Always ACK, so a lost ACK is answered again when the Pi retransmits
+  sendAck(frameSeq, frameOpcode);
+  if (frameOpcode == OP_SYNC) {
+    clearSeqHistory();
+    return;
+  }
+  if (isDuplicate(frameSeq)) return;
+  handleCommand(frameOpcode);
+}
+
+// Feed one received byte into the frame parser
+void parseFrameByte(uint8_t b) {
+  static uint8_t crc = 0;
+  switch (frameState) {
+    case WAIT_START:
+      if (b == FRAME_START) frameState = READ_SEQ;
+      break;
+    case READ_SEQ:
+      frameSeq = b;
+      crc = crc8Update(0, b);
+      frameState = READ_OPCODE;
+      break;
+    case READ_OPCODE:
+      frameOpcode = b;
+      crc = crc8Update(crc, b);
+      frameState = READ_LEN;
+      break;
+    case READ_LEN:
+      frameLen = b;
+      crc = crc8Update(crc, b);
+      framePos = 0;
+      if (frameLen > FRAME_MAX_PAYLOAD) {
+        frameState = WAIT_START;
+      } else {
+        frameState = frameLen ? READ_PAYLOAD : READ_CRC;
+      }
+      break;
+    case READ_PAYLOAD:
+      framePayload[framePos++] = b;
+      crc = crc8Update(crc, b);
+      if (framePos >= frameLen) frameState = READ_CRC;
+      break;
+    case READ_CRC:
+      if (b == crc) handleFrame();
+      frameState = WAIT_START;
+      break;
+  }
+}
+
 // === Setup function: initialize serial, displays, servos, LEDs ===
 void setup() {
   Serial.begin(9600);
@@ -310,17 +439,18 @@ void setup() {
 
   myDisplay.setPoint(22, 6, true); 
 
+  clearSeqHistory();
+
   Serial.println("Setup complete. Waiting for command...");
 }
 
 // === Main loop: read commands and run animations ===
 void loop() {
-  // Check for new serial command and set flags accordingly
+  // Feed every received byte to the frame parser; complete frames are ACKed and run
   if (Serial.available()) {
-    command = Serial.read();
-    receivedCommand = true;
-    Serial.print("ACK: ");
-    Serial.println(command, DEC);
+    while (Serial.available()) {
+      parseFrameByte(Serial.read());
+    }
   } else {
     // Periodically print waiting message if no command received
     static unsigned long lastPrint = 0;
@@ -330,32 +460,6 @@ void loop() {
     }
   }
 
-  // Process received commands
-  if (receivedCommand) {
-    if (command == 11) { 
-      // Command 11: Close all flaps immediately
-      closeAllFlaps();
-    } else if (command >= 1 && command <= 3) {
-      // Commands 1-3: Toggle respective flap (0-based index)
-      toggleFlap(command - 1);
-    } else if (command == 4) { 
-      // Command 4: Start wave sequence if not already running
-      closeAllFlaps();
-      if (!waveActive) {
-        waveActive = true;
-        waveOpening = true;
-        waveIndex = 0;
-        waveLastMoveTime = millis();
-        Serial.println("Starting wave sequence");
-      }
-    } else if (command == 5) { 
-      // Command 5: Start startled sequence
-      closeAllFlaps();
-      startStartledSequence();
-    }
-    receivedCommand = false; 
-  }
-
   // Run regular animation (LEDs and display)
   handleAnimation();
 
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+"""
+End-to-end input-to-actuator latency benchmark for the R2D2 control path.
+
+Replays synthetic evdev streams through the real handle_input, apply_axis
+and md49_drive_tick code, with the MD49 on a simulated serial port
+(sim/devices.py), and timestamps every stage:
+
+    event     - the gamepad hands the event to the input reader
+    apply     - apply_axis() stores the new stick value
+    actuator  - the MD49 speed command is written to the serial port
+    audio     - SoundBank.play() is called for a button press
+
+For each scenario it reports p50/p99/max latency per stage, event
+throughput, updates that were superseded before reaching the motors, and
+CPU time per event. Results are written as JSON so they can be compared
+across changes to the control path.
+
+Usage (from the project folder):
+    python3 -m bench.latency [--scenario wobble] [--output bench_output.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import R2D2_main
+import lib.MD49 as MD49
+from lib.control_state import ControlState, DriveOutput
+from lib.lcd_framebuffer import LcdFramebuffer
+from lib.lcd_service import LcdService
+from sim.devices import FakeMD49, SimLcd
+from sim.gamepad import AXIS_CENTRE, SyntheticGamepad, axis, click, sweep, wobble
+
+SPEED_COMMANDS = (MD49.MotorBoardMD49.CMD_SET_SPEED_1, MD49.MotorBoardMD49.CMD_SET_SPEED_2)
+
+
+def scenario_sweep():
+    """Slow, deliberate stick movements: full forward and back, then a turn."""
+    script = [(0.2, [axis(R2D2_main.lvaxis, AXIS_CENTRE)])]
+    script += sweep(R2D2_main.lvaxis, AXIS_CENTRE, 0, 0.5, rate_hz=100)
+    script += sweep(R2D2_main.lvaxis, 0, AXIS_CENTRE, 0.5, rate_hz=100)
+    script += sweep(R2D2_main.lhaxis, AXIS_CENTRE, 255, 0.5, rate_hz=100)
+    script += sweep(R2D2_main.lhaxis, 255, AXIS_CENTRE, 0.5, rate_hz=100)
+    return script + [(0.3, [])]
+
+
+def scenario_wobble():
+    """A busy stick: both drive axes oscillating with reports at 250 Hz."""
+    left = wobble(R2D2_main.lvaxis, 120, 2.0, frequency=1.5)
+    right = wobble(R2D2_main.lhaxis, 60, 2.0, frequency=0.7)
+    script = [(delay, events + right[i][1]) for i, (delay, events) in enumerate(left)]
+    return script + [(0.3, [])]
+
+
+def scenario_buttons():
+    """Sound buttons pressed in quick succession."""
+    script = []
+    for code in (R2D2_main.yBtn, R2D2_main.xBtn, R2D2_main.aBtn, R2D2_main.yBtn) * 5:
+        script += [(0.05, [])] + click(code, hold=0.03)
+    return script + [(0.3, [])]
+
+
+SCENARIOS = {
+    'sweep': scenario_sweep,
+    'wobble': scenario_wobble,
+    'buttons': scenario_buttons,
+}
+
+
+class RecordingSerial:
+    """Wraps a serial port and timestamps every MD49 speed command written."""
+
+    def __init__(self, ser):
+        self._ser = ser
+        self.speed_writes = []  # perf_counter_ns of each write containing a speed command
+
+    def write(self, data):
+        t = time.perf_counter_ns()
+        if any(data[i + 1] in SPEED_COMMANDS for i in range(0, len(data) - 1) if data[i] == 0):
+            self.speed_writes.append(t)
+        return self._ser.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_ser', 'speed_writes'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._ser, name, value)
+
+
+class _SilentChannel:
+    def get_busy(self):
+        return False
+
+
+class RecordingSoundBank:
+    """Stand-in SoundBank that timestamps play() calls instead of making noise."""
+
+    def __init__(self):
+        self.plays = []
+
+    def play(self, path):
+        self.plays.append(time.perf_counter_ns())
+        return _SilentChannel()
+
+
+def percentiles(samples_ns):
+    """p50/p99/max of a list of nanosecond samples, in milliseconds."""
+    if not samples_ns:
+        return {'count': 0, 'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+    ordered = sorted(samples_ns)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))]
+
+    return {
+        'count': len(ordered),
+        'p50_ms': rank(50) / 1e6,
+        'p99_ms': rank(99) / 1e6,
+        'max_ms': ordered[-1] / 1e6,
+    }
+
+
+def analyse(gamepad, applies, speed_writes, plays):
+    """Match stage timestamps and compute latency statistics."""
+    drive_axes = (R2D2_main.lvaxis, R2D2_main.lhaxis)
+    stick_events = [e for e in gamepad.delivered
+                    if e.type == R2D2_main.ecodes.EV_ABS and e.code in drive_axes]
+    presses = [e for e in gamepad.delivered
+               if e.type == R2D2_main.ecodes.EV_KEY and e.value == 1]
+
+    # event -> apply: each applied value belongs to the newest event for that
+    # axis delivered before it; older events in between were coalesced away.
+    event_to_apply = []
+    applied_events = []
+    pending = {code: [] for code in drive_axes}
+    for e in stick_events:
+        pending[e.code].append(e)
+    for code, value, t in applies:
+        if code not in pending:
+            continue
+        queue = pending[code]
+        newest = None
+        while queue and queue[0].timestamp_ns <= t:
+            newest = queue.pop(0)
+        if newest is not None:
+            event_to_apply.append(t - newest.timestamp_ns)
+            applied_events.append((t, newest))
+
+    # apply -> actuator: an update reaches the motors with the first speed
+    # write after it. If a newer update was applied before that write, the
+    # motors never saw this value on its own (superseded), but the latency
+    # still counts: that is how long the droid lagged behind the stick.
+    apply_to_actuator = []
+    end_to_end = []
+    superseded = 0
+    writes = list(speed_writes)
+    w = 0
+    for i, (t, event) in enumerate(applied_events):
+        while w < len(writes) and writes[w] < t:
+            w += 1
+        if w == len(writes):
+            break
+        next_apply = applied_events[i + 1][0] if i + 1 < len(applied_events) else None
+        if next_apply is not None and next_apply < writes[w]:
+            superseded += 1
+        apply_to_actuator.append(writes[w] - t)
+        end_to_end.append(writes[w] - event.timestamp_ns)
+
+    button_to_audio = []
+    play_times = list(plays)
+    for e in presses:
+        later = [t for t in play_times if t >= e.timestamp_ns]
+        if later:
+            button_to_audio.append(later[0] - e.timestamp_ns)
+            play_times.remove(later[0])
+
+    return {
+        'stick_events': len(stick_events),
+        'applied_updates': len(applied_events),
+        'coalesced_events': len(stick_events) - len(applied_events),
+        'superseded_updates': superseded,
+        'speed_writes': len(writes),
+        'latency': {
+            'event_to_apply': percentiles(event_to_apply),
+            'apply_to_actuator': percentiles(apply_to_actuator),
+            'event_to_actuator': percentiles(end_to_end),
+            'button_to_audio': percentiles(button_to_audio),
+        },
+    }
+
+
+async def run_scenario(name, script, time_scale):
+    """Replay one script through the control path and collect timestamps."""
+    md49 = FakeMD49(time_scale=time_scale).start()
+    lcd = SimLcd(R2D2_main.I2C_NUM_ROWS, R2D2_main.I2C_NUM_COLS)
+    R2D2_main.lcd_service = LcdService(LcdFramebuffer(lcd))
+    sound_bank = RecordingSoundBank()
+    R2D2_main.sound_bank = sound_bank
+    R2D2_main.control_state = ControlState()
+    R2D2_main.md49_output = DriveOutput()
+    R2D2_main.straight_line.reset()
+    if R2D2_main.drive_mixer is None:
+        R2D2_main.drive_mixer = R2D2_main.build_drive_mixer()
+
+    applies = []
+    real_apply_axis = R2D2_main.apply_axis
+
+    def recording_apply_axis(code, value):
+        real_apply_axis(code, value)
+        applies.append((code, value, time.perf_counter_ns()))
+
+    R2D2_main.apply_axis = recording_apply_axis
+    motors = MD49.AsyncMotorBoardMD49(port=md49.port, reactor=R2D2_main.serial_reactor)
+    recorder = RecordingSerial(motors.port)
+    motors.port = recorder
+    gamepad = SyntheticGamepad(script, time_scale=time_scale)
+
+    tasks = [asyncio.create_task(R2D2_main.lcd_service.run())]
+    R2D2_main.scheduler.add(f"md49_drive_{name}", R2D2_main.MD49_RATE_HZ,
+                            lambda: R2D2_main.md49_drive_tick(motors))
+    R2D2_main.scheduler.start()
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    # The supervisor is not running: the heartbeat is only there to be beaten
+    R2D2_main.input_heartbeat = R2D2_main.supervisor.watch('input', R2D2_main.INPUT_DEADLINE, None)
+    try:
+        await R2D2_main.handle_input(gamepad)
+    except OSError:
+        pass
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    R2D2_main.scheduler.stop()
+    R2D2_main.scheduler = type(R2D2_main.scheduler)()
+    for task in tasks:
+        task.cancel()
+    R2D2_main.apply_axis = real_apply_axis
+    await motors.close()
+    md49.stop()
+
+    events = len(gamepad.delivered)
+    result = analyse(gamepad, applies, recorder.speed_writes, sound_bank.plays)
+    result.update({
+        'events': events,
+        'reports': gamepad.reports,
+        'wall_s': wall,
+        'events_per_s': events / wall if wall else None,
+        'cpu_s': cpu,
+        'cpu_us_per_event': cpu / events * 1e6 if events else None,
+    })
+    return result
+
+
+async def run_all(names, time_scale):
+    results = {}
+    for name in names:
+        results[name] = await run_scenario(name, SCENARIOS[name](), time_scale)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure input-to-actuator latency of the control path.")
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS) + ['all'], default='all')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="Replay the scripts this many times faster than real time")
+    parser.add_argument('--output', help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    names = sorted(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'md49_rate_hz': R2D2_main.MD49_RATE_HZ,
+        'time_scale': args.time_scale,
+        'scenarios': asyncio.run(run_all(names, args.time_scale)),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
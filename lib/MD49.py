@@ -9,8 +9,29 @@ It also includes a method to reset the controller to safe default settings.
 '''
 
 
+import asyncio
+from collections import namedtuple
+
 import serial
-from struct import unpack
+from struct import calcsize, unpack
+
+# Compact results of the bulk read commands
+Encoders = namedtuple('Encoders', ['encoder1', 'encoder2'])
+Speeds = namedtuple('Speeds', ['speed1', 'speed2'])
+PowerStatus = namedtuple('PowerStatus', ['volts', 'current1', 'current2', 'error'])
+Status = namedtuple('Status', ['volts', 'current1', 'current2', 'error', 'encoder1', 'encoder2'])
+
+
+def encoder_delta(new, old):
+    """
+    Counts moved between two encoder readings, allowing for 32-bit wraparound.
+
+    :param new: Latest signed 32-bit encoder reading
+    :param old: Previous reading
+    :return: Signed difference
+    """
+    return ((new - old + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
  
 class MotorBoardMD49:
     """
@@ -27,9 +48,11 @@ class MotorBoardMD49:
     CMD_GET_SPEED_2 = 0x22
     CMD_GET_ENCODER_1 = 0x23
     CMD_GET_ENCODER_2 = 0x24
+    CMD_GET_ENCODERS = 0x25
     CMD_GET_VOLTS = 0x26
     CMD_GET_CURRENT_1 = 0x27
     CMD_GET_CURRENT_2 = 0x28
+    CMD_GET_VI = 0x2C
     CMD_GET_ERROR = 0x2D
     CMD_SET_SPEED_1 = 0x31
     CMD_SET_SPEED_2 = 0x32
@@ -40,6 +63,20 @@ class MotorBoardMD49:
     CMD_ENABLE_REGULATOR = 0x37
     CMD_DISABLE_TIMEOUT = 0x38
     CMD_ENABLE_TIMEOUT = 0x39
+
+    # Big-endian struct format of the reply to each command that returns data
+    REPLY_FORMATS = {
+        CMD_GET_SPEED_1: 'B',
+        CMD_GET_SPEED_2: 'B',
+        CMD_GET_ENCODER_1: 'i',
+        CMD_GET_ENCODER_2: 'i',
+        CMD_GET_ENCODERS: 'ii',
+        CMD_GET_VOLTS: 'B',
+        CMD_GET_CURRENT_1: 'B',
+        CMD_GET_CURRENT_2: 'B',
+        CMD_GET_VI: 'BBB',
+        CMD_GET_ERROR: 'B',
+    }
  
     def __init__(self, port, baudrate=38400, timeout=1):
         """
@@ -50,6 +87,8 @@ class MotorBoardMD49:
         :param timeout: Serial read timeout in seconds
         """
         self.ser = serial.Serial(port, baudrate, timeout=timeout)
+        self.bytes_written = 0
+        self.bytes_read = 0
  
     def _write(self, command, *data):
         """
@@ -60,6 +99,7 @@ class MotorBoardMD49:
         """
         packet = bytes([self.SYNC_BYTE, command] + list(data))
         self.ser.write(packet)
+        self.bytes_written += len(packet)
  
     def _read_bytes(self, count):
         """
@@ -68,7 +108,9 @@ class MotorBoardMD49:
         :param count: Number of bytes to read
         :return: Byte string of length 'count'
         """
-        return self.ser.read(count)
+        data = self.ser.read(count)
+        self.bytes_read += len(data)
+        return data
  
     def _read_byte(self):
         """
@@ -89,6 +131,50 @@ class MotorBoardMD49:
         if len(data) != 4:
             raise IOError("Failed to read 4 bytes from MD49")
         return unpack('>i', data)[0]
+
+    # -------------------- Batched Commands --------------------
+    def transact(self, commands):
+        """
+        Send several commands in one write and read all of their replies in one read.
+
+        :param commands: List of (command, *data) tuples,
+                         e.g. [(CMD_SET_SPEED_1, 200), (CMD_GET_VOLTS,)]
+        :return: Tuple of reply values, in command order, for the commands that reply
+        """
+        packet, fmt = self.encode_batch(commands)
+        self.ser.write(packet)
+        self.bytes_written += len(packet)
+        size = calcsize(fmt)
+        if size == 0:
+            return ()
+        data = self._read_bytes(size)
+        if len(data) != size:
+            raise IOError(f"Failed to read {size} bytes from MD49")
+        return unpack(fmt, data)
+
+    @classmethod
+    def encode_batch(cls, commands):
+        """
+        Build the bytes for a batch of commands and the format of their replies.
+
+        :param commands: List of (command, *data) tuples
+        :return: (packet bytes, big-endian struct format of the combined reply)
+        """
+        packet = bytearray()
+        fmt = '>'
+        for command, *data in commands:
+            packet += bytes([cls.SYNC_BYTE, command] + data)
+            fmt += cls.REPLY_FORMATS.get(command, '')
+        return bytes(packet), fmt
+
+    def expects_reply(self, commands):
+        """
+        Check whether any command in a batch returns data.
+
+        :param commands: List of (command, *data) tuples
+        :return: True if at least one command has a reply
+        """
+        return any(command in self.REPLY_FORMATS for command, *_ in commands)
  
     # -------------------- GET Commands --------------------
     def get_speed(self, motor):
@@ -141,6 +227,40 @@ class MotorBoardMD49:
         """
         self._write(self.CMD_GET_ERROR)
         return self._read_byte()
+
+    # -------------------- Bulk GET Commands --------------------
+    def get_encoders(self):
+        """
+        Get both encoder counts from a single reply, so they are sampled together.
+
+        :return: Encoders(encoder1, encoder2)
+        """
+        return Encoders(*self.transact([(self.CMD_GET_ENCODERS,)]))
+
+    def get_speeds(self):
+        """
+        Get the requested speed of both motors in one round trip.
+
+        :return: Speeds(speed1, speed2)
+        """
+        return Speeds(*self.transact([(self.CMD_GET_SPEED_1,), (self.CMD_GET_SPEED_2,)]))
+
+    def get_volts_amps_error(self):
+        """
+        Get battery voltage, both motor currents and the error byte in one round trip.
+
+        :return: PowerStatus(volts, current1, current2, error)
+        """
+        return PowerStatus(*self.transact([(self.CMD_GET_VI,), (self.CMD_GET_ERROR,)]))
+
+    def get_status(self):
+        """
+        Get power status and both encoder counts in one round trip.
+
+        :return: Status(volts, current1, current2, error, encoder1, encoder2)
+        """
+        return Status(*self.transact([(self.CMD_GET_VI,), (self.CMD_GET_ERROR,),
+                                      (self.CMD_GET_ENCODERS,)]))
  
     # -------------------- SET Commands --------------------
     def set_speed(self, motor, speed):
@@ -153,6 +273,16 @@ class MotorBoardMD49:
         cmd = self.CMD_SET_SPEED_1 if motor == 1 else self.CMD_SET_SPEED_2
         speed = max(0, min(255, speed))  # Clamp to 0-255 range
         self._write(cmd, speed)
+
+    def set_speeds(self, speed1, speed2):
+        """
+        Set the speed of both motors with a single serial write.
+
+        :param speed1: Speed value for motor 1
+        :param speed2: Speed value for motor 2
+        """
+        self.transact([(self.CMD_SET_SPEED_1, max(0, min(255, speed1))),
+                       (self.CMD_SET_SPEED_2, max(0, min(255, speed2)))])
  
     def set_acceleration(self, value):
         """
@@ -225,3 +355,254 @@ class MotorBoardMD49:
         Close the serial connection to the MD49.
         """
         self.ser.close()
+
+
+class AsyncMotorBoardMD49:
+    """
+    Asyncio front end for the MD49 Dual 24V Motor Controller.
+
+    The port is driven by a SerialReactor, so the event loop never blocks
+    on it and no I/O thread is needed. Requests from concurrent coroutines
+    take turns on a FIFO lock and run strictly in the order they were made,
+    so a command and its reply can never interleave with another caller's
+    bytes. Every method is one batch: a single write, and for commands that
+    reply a single wait for the whole reply.
+    """
+
+    B = MotorBoardMD49
+
+    def __init__(self, port, reactor, baudrate=38400, timeout=0.1):
+        """
+        Initialize serial connection to MD49 motor controller.
+
+        :param port: Serial port (e.g., '/dev/ttyUSB0' or 'COM3')
+        :param reactor: SerialReactor that will own the port
+        :param baudrate: Communication baud rate (default 38400)
+        :param timeout: Default per-request reply timeout in seconds
+        """
+        self.board = MotorBoardMD49(port, baudrate, timeout=timeout)
+        self.port = reactor.open('md49', self.board.ser)
+        self.timeout = timeout
+        self.errors = 0
+        self.stops = 0  # stop_now() calls; speed writes queued before one are dropped
+        self._lock = asyncio.Lock()
+
+    # -------------------- Batched Commands --------------------
+    async def transact(self, commands, timeout=None, stops=None):
+        """
+        Send several commands in one write and read all of their replies in one read.
+
+        :param commands: List of (command, *data) tuples (see MotorBoardMD49.transact)
+        :param timeout: Reply timeout in seconds (None for the default)
+        :param stops: self.stops when the request was made; if stop_now() has
+                      been called since, the commands are not sent
+        :return: Tuple of reply values for the commands that reply, or None if not sent
+        """
+        packet, fmt = self.B.encode_batch(commands)
+        size = calcsize(fmt)
+        async with self._lock:
+            if stops is not None and stops != self.stops:
+                return None
+            try:
+                if size:
+                    # Drop anything left over from an earlier reply that timed out.
+                    self.port.reset_input()
+                self.port.write(packet)
+                self.board.bytes_written += len(packet)
+                if not size:
+                    return ()
+                data = await self.port.read_exactly(size, self.timeout if timeout is None else timeout)
+                self.board.bytes_read += len(data)
+            except Exception:
+                self.errors += 1
+                raise
+        return unpack(fmt, data)
+
+    def stop_now(self):
+        """
+        Write neutral speeds for both motors at once, ahead of any queued requests.
+
+        Speed commands have no reply, so this can go out while another
+        request is waiting for its reply without confusing either of them.
+        Speed writes still waiting for their turn are dropped, so none of
+        them can restart the motors afterwards.
+        """
+        self.stops += 1
+        packet, _ = self.B.encode_batch([(self.B.CMD_SET_SPEED_1, 128), (self.B.CMD_SET_SPEED_2, 128)])
+        try:
+            self.port.write(packet)
+            self.board.bytes_written += len(packet)
+        except Exception:
+            self.errors += 1
+            raise
+
+    # -------------------- GET Commands --------------------
+    async def get_speed(self, motor, timeout=None):
+        """
+        Get the requested speed of a motor.
+
+        :param motor: Motor number (1 or 2)
+        :return: Speed value
+        """
+        cmd = self.B.CMD_GET_SPEED_1 if motor == 1 else self.B.CMD_GET_SPEED_2
+        return (await self.transact([(cmd,)], timeout))[0]
+
+    async def get_encoder(self, motor, timeout=None):
+        """
+        Get encoder count of a motor.
+
+        :param motor: Motor number (1 or 2)
+        :return: Signed 32-bit encoder count
+        """
+        cmd = self.B.CMD_GET_ENCODER_1 if motor == 1 else self.B.CMD_GET_ENCODER_2
+        return (await self.transact([(cmd,)], timeout))[0]
+
+    async def get_volts(self, timeout=None):
+        """
+        Get battery voltage.
+
+        :return: Voltage value in volts
+        """
+        return (await self.transact([(self.B.CMD_GET_VOLTS,)], timeout))[0]
+
+    async def get_current(self, motor, timeout=None):
+        """
+        Get current draw of a motor.
+
+        :param motor: Motor number (1 or 2)
+        :return: Current in tenths of an ampere
+        """
+        cmd = self.B.CMD_GET_CURRENT_1 if motor == 1 else self.B.CMD_GET_CURRENT_2
+        return (await self.transact([(cmd,)], timeout))[0]
+
+    async def get_error(self, timeout=None):
+        """
+        Get error status byte.
+
+        :return: Error byte
+        """
+        return (await self.transact([(self.B.CMD_GET_ERROR,)], timeout))[0]
+
+    # -------------------- Bulk GET Commands --------------------
+    async def get_encoders(self, timeout=None):
+        """
+        Get both encoder counts from a single reply.
+
+        :return: Encoders(encoder1, encoder2)
+        """
+        return Encoders(*await self.transact([(self.B.CMD_GET_ENCODERS,)], timeout))
+
+    async def get_speeds(self, timeout=None):
+        """
+        Get the requested speed of both motors in one round trip.
+
+        :return: Speeds(speed1, speed2)
+        """
+        return Speeds(*await self.transact([(self.B.CMD_GET_SPEED_1,), (self.B.CMD_GET_SPEED_2,)], timeout))
+
+    async def get_volts_amps_error(self, timeout=None):
+        """
+        Get battery voltage, both motor currents and the error byte in one round trip.
+
+        :return: PowerStatus(volts, current1, current2, error)
+        """
+        return PowerStatus(*await self.transact([(self.B.CMD_GET_VI,), (self.B.CMD_GET_ERROR,)], timeout))
+
+    async def get_status(self, timeout=None):
+        """
+        Get power status and both encoder counts in one round trip.
+
+        :return: Status(volts, current1, current2, error, encoder1, encoder2)
+        """
+        return Status(*await self.transact([(self.B.CMD_GET_VI,), (self.B.CMD_GET_ERROR,),
+                                            (self.B.CMD_GET_ENCODERS,)], timeout))
+
+    # -------------------- SET Commands --------------------
+    async def set_speed(self, motor, speed):
+        """
+        Set the speed of a motor.
+
+        :param motor: Motor number (1 or 2)
+        :param speed: Speed value (clamped to 0-255)
+        :return: False if a stop_now() while it waited its turn dropped it
+        """
+        cmd = self.B.CMD_SET_SPEED_1 if motor == 1 else self.B.CMD_SET_SPEED_2
+        return await self.transact([(cmd, max(0, min(255, speed)))], stops=self.stops) is not None
+
+    async def set_speeds(self, speed1, speed2):
+        """
+        Set the speed of both motors with a single serial write.
+
+        :param speed1: Speed for motor 1 (clamped to 0-255)
+        :param speed2: Speed for motor 2 (clamped to 0-255)
+        :return: False if a stop_now() while it waited its turn dropped it
+        """
+        return await self.transact([(self.B.CMD_SET_SPEED_1, max(0, min(255, speed1))),
+                                    (self.B.CMD_SET_SPEED_2, max(0, min(255, speed2)))],
+                                   stops=self.stops) is not None
+
+    async def set_acceleration(self, value):
+        """
+        Set the acceleration rate.
+
+        :param value: Acceleration (clamped to 1-10)
+        """
+        await self.transact([(self.B.CMD_SET_ACCELERATION, max(1, min(10, value)))])
+
+    async def set_mode(self, mode):
+        """
+        Set the MD49 operation mode.
+
+        :param mode: Mode 0-3
+        """
+        if mode not in (0, 1, 2, 3):
+            raise ValueError("Mode must be 0, 1, 2, or 3")
+        await self.transact([(self.B.CMD_SET_MODE, mode)])
+
+    async def reset_encoders(self):
+        """
+        Reset both encoder counts to zero.
+        """
+        await self.transact([(self.B.CMD_RESET_ENCODERS,)])
+
+    # -------------------- Regulator Control --------------------
+    async def disable_regulator(self):
+        """
+        Disable automatic speed regulation using encoder feedback.
+        """
+        await self.transact([(self.B.CMD_DISABLE_REGULATOR,)])
+
+    async def enable_regulator(self):
+        """
+        Enable automatic speed regulation using encoder feedback.
+        """
+        await self.transact([(self.B.CMD_ENABLE_REGULATOR,)])
+
+    # -------------------- Timeout Control --------------------
+    async def disable_timeout(self):
+        """
+        Disable the 2-second serial communication timeout safety feature.
+        """
+        await self.transact([(self.B.CMD_DISABLE_TIMEOUT,)])
+
+    async def enable_timeout(self):
+        """
+        Enable the 2-second serial communication timeout safety feature.
+        """
+        await self.transact([(self.B.CMD_ENABLE_TIMEOUT,)])
+
+    # -------------------- Safe Defaults --------------------
+    async def reset_to_defaults(self):
+        """
+        Reset the MD49 to safe default settings (see MotorBoardMD49.reset_to_defaults),
+        in one write.
+        """
+        await self.transact([(self.B.CMD_SET_MODE, 0), (self.B.CMD_SET_ACCELERATION, 5),
+                             (self.B.CMD_ENABLE_REGULATOR,), (self.B.CMD_RESET_ENCODERS,),
+                             (self.B.CMD_ENABLE_TIMEOUT,)])
+
+    async def close(self):
+        """
+        Close the serial connection to the MD49.
+        """
+        self.port.close()
@@ -0,0 +1,169 @@
+"""Non-blocking logging: records go through a bounded queue to a writer thread with file rotation."""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+import time
+
+_DIGITS = re.compile(r'\d+')
+
+
+class RepeatFilter(logging.Filter):
+    """
+    Limits how often one message can be written.
+
+    Messages are grouped by where they were logged from (file and line)
+    and their text with every number taken out. An f-string error that
+    fires every control cycle with a different count or timing is one
+    message, while a shared helper line logging different names (startup
+    phases, devices, loops) is several. Each message may be logged
+    `burst` times per `window` seconds; the rest are dropped and counted.
+
+    Once a window with dropped records is over, the last dropped record
+    is passed to `emit` with "[N similar messages suppressed]" added, so
+    a burst that stops still says how big it was. Windows are checked
+    for expiry (at most once a second) whenever any record is filtered.
+    """
+
+    def __init__(self, window=10.0, burst=3, max_sites=1000, emit=None):
+        """
+        :param window: Length of the rate limiting window, in seconds
+        :param burst: Records allowed of one message per window
+        :param max_sites: Messages tracked at most; the oldest windows are ended early beyond it
+        :param emit: Called with each summary record (e.g. the handler's emit); None drops them
+        """
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_sites = max_sites
+        self.emit = emit
+        self.suppressed = 0
+        self._next_sweep = 0.0
+        # (pathname, lineno, text without digits) -> [window start, count, suppressed, last dropped record]
+        self._sites = {}
+
+    def filter(self, record):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        key = (record.pathname, record.lineno, _DIGITS.sub('#', str(record.msg)))
+        site = self._sites.get(key)
+        if site is None or now - site[0] >= self.window:
+            if site is not None:
+                self._end(site)
+            elif len(self._sites) >= self.max_sites:
+                self._sweep(now)
+                while len(self._sites) >= self.max_sites:
+                    oldest = min(self._sites, key=lambda k: self._sites[k][0])
+                    self._end(self._sites.pop(oldest))
+            self._sites[key] = [now, 1, 0, None]
+            return True
+        site[1] += 1
+        if site[1] <= self.burst:
+            return True
+        site[2] += 1
+        site[3] = record
+        self.suppressed += 1
+        return False
+
+    def _sweep(self, now):
+        self._next_sweep = now + 1.0
+        for key, site in list(self._sites.items()):
+            if now - site[0] >= self.window:
+                del self._sites[key]
+                self._end(site)
+
+    def _end(self, site):
+        """Report the records a finished window dropped."""
+        if not site[2] or self.emit is None:
+            return
+        summary = logging.makeLogRecord(site[3].__dict__)
+        summary.msg = f"{site[3].getMessage()} [{site[2]} similar messages suppressed]"
+        summary.args = None
+        summary.exc_info = None
+        summary.exc_text = None
+        self.emit(summary)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller.
+
+    When the queue is full the record is dropped and counted; the next
+    record that fits is preceded by a warning saying how many were lost.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def enqueue(self, record):
+        try:
+            if self._unreported:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"Log queue full: dropped {self._unreported} messages",
+                }))
+                self._unreported = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+
+
+def setup_logging(filename, level=logging.INFO,
+                  format_string='%(asctime)s - %(levelname)s - %(message)s',
+                  max_bytes=1024 * 1024, backup_count=5, queue_size=10000,
+                  repeat_window=10.0, repeat_burst=3):
+    """
+    Route the root logger through a bounded queue to a rotating log file.
+
+    The calling thread (the event loop) filters the record, formats its
+    message and any traceback (QueueHandler.prepare) and puts it on the
+    queue; building the output line and writing to the SD card happen on
+    the listener's thread.
+
+    :param filename: Log file path
+    :param level: Root logger level
+    :param format_string: Log line format
+    :param max_bytes: Size at which the log file is rotated
+    :param backup_count: Rotated files to keep (.1, .2, ... after the file name)
+    :param queue_size: Records buffered before new ones are dropped
+    :param repeat_window: See RepeatFilter
+    :param repeat_burst: See RepeatFilter
+    :return: The running QueueListener (stopped automatically at exit)
+    """
+    file_handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes,
+                                                        backupCount=backup_count)
+    file_handler.setFormatter(logging.Formatter(format_string))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(log_queue)
+    queue_handler.addFilter(RepeatFilter(window=repeat_window, burst=repeat_burst,
+                                         emit=queue_handler.emit))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = _Listener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class _Listener(logging.handlers.QueueListener):
+    """QueueListener whose stop() can be called more than once (explicitly and at exit)."""
+
+    def enqueue_sentinel(self):
+        # Wait for room rather than failing when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
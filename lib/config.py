@@ -0,0 +1,197 @@
+"""Typed JSON configuration with validation and hot reload."""
+
+import asyncio
+import json
+import logging
+import math
+import os
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigError(Exception):
+    """Raised when a config file cannot be read or does not match its schema."""
+
+
+class Setting:
+    """Type, default and limits of one configuration value."""
+
+    def __init__(self, kind, default, reloadable=True, minimum=None, maximum=None):
+        """
+        :param kind: bool, int, float, str or list
+        :param default: Value used when the file does not set it
+        :param reloadable: False if a change only takes effect after a restart
+        :param minimum: Smallest allowed value (numbers only)
+        :param maximum: Largest allowed value (numbers only)
+        """
+        self.kind = kind
+        self.default = default
+        self.reloadable = reloadable
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def convert(self, name, value):
+        """Checks a value from the file and returns it as the setting's type."""
+        if self.kind is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if self.kind is int and isinstance(value, bool) or not isinstance(value, self.kind):
+            raise ConfigError(f"{name} must be a {self.kind.__name__}, not {value!r}")
+        if self.kind is float and not math.isfinite(value):
+            # json.load accepts NaN and Infinity, and NaN passes any range check
+            raise ConfigError(f"{name} must be a finite number, not {value!r}")
+        if self.minimum is not None and value < self.minimum:
+            raise ConfigError(f"{name} must be at least {self.minimum}, not {value!r}")
+        if self.maximum is not None and value > self.maximum:
+            raise ConfigError(f"{name} must be at most {self.maximum}, not {value!r}")
+        return value
+
+
+def build_config(data, schema, checks=()):
+    """
+    Validate parsed JSON against a schema and fill in defaults.
+
+    :param data: Dict of {section: {name: value}} from the file
+    :param schema: Dict of {section: {name: Setting}}
+    :param checks: Functions taking the finished config and raising ConfigError
+                   for values that are each allowed but not together
+    :return: Immutable config: one namedtuple per section, read as config.section.name
+    :raises ConfigError: On unknown sections or names, wrong types, out of range
+                         values or a failed check
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("Config file must contain a JSON object")
+    unknown = set(data) - set(schema)
+    if unknown:
+        raise ConfigError(f"Unknown config sections: {', '.join(sorted(unknown))}")
+    sections = {}
+    for section, settings in schema.items():
+        values = data.get(section, {})
+        if not isinstance(values, dict):
+            raise ConfigError(f"Config section {section} must be a JSON object")
+        unknown = set(values) - set(settings)
+        if unknown:
+            raise ConfigError(f"Unknown settings in {section}: {', '.join(sorted(unknown))}")
+        fields = {}
+        for name, setting in settings.items():
+            if name in values:
+                fields[name] = setting.convert(f"{section}.{name}", values[name])
+            else:
+                fields[name] = setting.default
+        sections[section] = namedtuple(section.title().replace('_', ''), fields)(**fields)
+    config = namedtuple('Config', sections)(**sections)
+    for check in checks:
+        check(config)
+    return config
+
+
+def load_config(path, schema, checks=()):
+    """
+    Read and validate a JSON config file. A missing file gives the defaults.
+
+    :param checks: See build_config
+    :raises ConfigError: If the file is not valid JSON or does not match the schema
+    """
+    if path is None or not os.path.exists(path):
+        return build_config({}, schema, checks)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"Could not read {path}: {e}")
+    return build_config(data, schema, checks)
+
+
+def changed_settings(old, new):
+    """Returns the 'section.name' of every value that differs between two configs."""
+    changed = []
+    for section in old._fields:
+        old_section, new_section = getattr(old, section), getattr(new, section)
+        for name in old_section._fields:
+            if getattr(old_section, name) != getattr(new_section, name):
+                changed.append(f"{section}.{name}")
+    return changed
+
+
+def default_config_json(schema):
+    """The defaults of a schema as formatted JSON, for writing an example file."""
+    return json.dumps({section: {name: setting.default for name, setting in settings.items()}
+                       for section, settings in schema.items()}, indent=4) + '\n'
+
+
+class ConfigWatcher:
+    """
+    Polls a config file and hands every valid new version to a callback.
+
+    The file's modification time and size are checked every interval
+    seconds, which needs no inotify support and costs one stat() call. A
+    file that fails to parse or validate is logged and ignored, so the
+    running configuration stays in force until the file is fixed.
+    """
+
+    def __init__(self, path, schema, config, on_change, interval=1.0, checks=()):
+        """
+        :param path: Config file to watch
+        :param schema: Schema to validate it against
+        :param config: The config currently in use
+        :param on_change: Coroutine function called as on_change(old, new, changed)
+        :param interval: Seconds between checks
+        :param checks: See build_config
+        """
+        self.path = path
+        self.schema = schema
+        self.checks = checks
+        self.config = config
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self.errors = 0
+        self._stamp = self._file_stamp()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def restart_only(self, changed):
+        """The names in changed that only take effect after a restart."""
+        result = []
+        for name in changed:
+            section, setting = name.split('.', 1)
+            if not self.schema[section][setting].reloadable:
+                result.append(name)
+        return result
+
+    async def check(self):
+        """Reloads the file if it changed since the last check."""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+        try:
+            new = load_config(self.path, self.schema, self.checks)
+        except ConfigError as e:
+            self.errors += 1
+            logger.error(f"Ignoring config change: {e}")
+            return
+        changed = changed_settings(self.config, new)
+        if not changed:
+            return
+        old, self.config = self.config, new
+        self.reloads += 1
+        later = self.restart_only(changed)
+        if later:
+            logger.warning(f"Config changes that need a restart: {', '.join(later)}")
+        logger.info(f"Config reloaded: {', '.join(changed)}")
+        await self.on_change(old, new, changed)
+
+    async def run(self):
+        """Checks the file every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.exception(f"Config reload failed: {e}")
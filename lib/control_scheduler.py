@@ -0,0 +1,138 @@
+"""Fixed-rate scheduler for the asyncio control loops."""
+
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LoopStats:
+    """Timing statistics for one scheduled control loop.
+
+    All times are in seconds. Jitter is how late a tick started relative
+    to its deadline; latency is how long after its deadline a tick finished.
+    """
+
+    def __init__(self, name, period):
+        self.name = name
+        self.period = period
+        self.ticks = 0
+        self.overruns = 0
+        self.missed = 0
+        self.last_period = 0.0
+        self.last_jitter = 0.0
+        self.max_jitter = 0.0
+        self.worst_latency = 0.0
+        self._last_start = None
+
+    def record(self, deadline, start, end):
+        """Records the timing of one tick."""
+        if self._last_start is not None:
+            self.last_period = start - self._last_start
+        self._last_start = start
+        self.ticks += 1
+        self.last_jitter = start - deadline
+        self.max_jitter = max(self.max_jitter, self.last_jitter)
+        self.worst_latency = max(self.worst_latency, end - deadline)
+
+    def reset_peaks(self):
+        """Clears the worst-case values so the next report covers a fresh window."""
+        self.max_jitter = 0.0
+        self.worst_latency = 0.0
+
+    def summary(self):
+        """Returns a one line, human readable summary of the statistics."""
+        return (f"{self.name}: ticks={self.ticks} period={self.last_period * 1000:.1f}ms "
+                f"(target {self.period * 1000:.1f}ms) jitter={self.last_jitter * 1000:.2f}ms "
+                f"max_jitter={self.max_jitter * 1000:.2f}ms "
+                f"worst_latency={self.worst_latency * 1000:.2f}ms "
+                f"overruns={self.overruns} missed={self.missed}")
+
+
+class ControlScheduler:
+    """Runs registered control callbacks at a fixed cadence.
+
+    Each loop keeps an absolute deadline on the event loop's monotonic
+    clock, so the time spent inside a callback does not stretch the
+    period. When a callback runs past one or more deadlines, those ticks
+    are skipped rather than run back to back, and counted as missed.
+    """
+
+    def __init__(self, report_interval=None):
+        """
+        :param report_interval: Seconds between logged stats reports (None to disable)
+        """
+        self.report_interval = report_interval
+        self.stats = {}
+        self._loops = []
+        self._tasks = []
+        self._started = False
+
+    def add(self, name, rate_hz, callback):
+        """Registers a control callback.
+
+        :param name: Name used in the statistics
+        :param rate_hz: How many times per second to run the callback
+        :param callback: Function or coroutine function taking no arguments
+        :return: The LoopStats for this loop
+        """
+        stats = LoopStats(name, 1.0 / rate_hz)
+        self.stats[name] = stats
+        self._loops.append((callback, stats))
+        if self._started:
+            # Already running: start this loop straight away
+            self._tasks.append(asyncio.create_task(self._run(callback, stats)))
+        return stats
+
+    def start(self):
+        """Starts a task for every registered loop (must be called from the event loop).
+
+        Loops added after this start immediately.
+        """
+        self._started = True
+        for callback, stats in self._loops:
+            self._tasks.append(asyncio.create_task(self._run(callback, stats)))
+        if self.report_interval:
+            self._tasks.append(asyncio.create_task(self._report()))
+
+    def stop(self):
+        """Cancels all scheduler tasks."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._started = False
+
+    async def _run(self, callback, stats):
+        loop = asyncio.get_running_loop()
+        period = stats.period
+        logger.info(f"Starting {stats.name} loop at {1.0 / period:.0f} Hz")
+        deadline = loop.time()
+        while True:
+            now = loop.time()
+            if deadline > now:
+                await asyncio.sleep(deadline - now)
+                now = loop.time()
+            try:
+                result = callback()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"{stats.name} tick failed: {e}")
+            end = loop.time()
+            stats.record(deadline, now, end)
+
+            deadline += period
+            if end > deadline:
+                # Skip the ticks we are already too late for and stay on the grid.
+                skipped = int((end - deadline) // period) + 1
+                deadline += skipped * period
+                stats.overruns += 1
+                stats.missed += skipped
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            for stats in self.stats.values():
+                logger.info(f"Loop stats {stats.summary()}")
+                stats.reset_peaks()
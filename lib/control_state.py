@@ -0,0 +1,114 @@
+"""Shared drive state written by the input handler and read by the control loops."""
+
+from collections import namedtuple
+
+ControlSnapshot = namedtuple('ControlSnapshot', 'version forward turn head forward_raw turn_raw')
+
+AXIS_CENTRE = 127  # raw stick value at rest
+
+
+class ControlState:
+    """Latest operator command, published with a sequence number (a seqlock).
+
+    There is a single writer (the input handler). It makes the sequence
+    odd while it changes the axes and even again when it is done, so a
+    reader that sees the same even number before and after copying the
+    axes knows it has a consistent set. Readers never block the writer;
+    they retry if they raced with a write.
+
+    The version of a snapshot changes (by 2) on every completed write, even
+    one that sets the same values again, and never otherwise, so a loop
+    can remember the last version it acted on and skip the work when
+    nothing has been written since.
+    """
+
+    __slots__ = ('_seq', '_depth', 'forward', 'turn', 'head', 'forward_raw', 'turn_raw')
+
+    def __init__(self):
+        self._seq = 0
+        self._depth = 0
+        self.forward = 0.0  # -1.0 (reverse) to 1.0 (forward)
+        self.turn = 0.0     # -1.0 (left) to 1.0 (right)
+        self.head = 0.0     # -1.0 to 1.0 dome rotation
+        # Raw stick values (0-255) behind forward and turn, for table lookups
+        self.forward_raw = AXIS_CENTRE
+        self.turn_raw = AXIS_CENTRE
+
+    @property
+    def version(self):
+        """Sequence number: goes up by 2 with every completed write, odd while one is in progress."""
+        return self._seq
+
+    def begin_write(self):
+        """Start a write. Writes nest, so a frame of updates publishes once."""
+        if self._depth == 0:
+            self._seq += 1
+        self._depth += 1
+
+    def end_write(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._seq += 1
+
+    def writing(self):
+        """Context manager around a group of axis updates."""
+        return _WriteBlock(self)
+
+    def update(self, forward=None, turn=None, head=None, forward_raw=None, turn_raw=None):
+        """Set any of the axes in one write."""
+        self.begin_write()
+        try:
+            if forward is not None:
+                self.forward = forward
+            if turn is not None:
+                self.turn = turn
+            if head is not None:
+                self.head = head
+            if forward_raw is not None:
+                self.forward_raw = forward_raw
+            if turn_raw is not None:
+                self.turn_raw = turn_raw
+        finally:
+            self.end_write()
+
+    def neutral(self):
+        """Centre every axis, e.g. when the controller is lost."""
+        self.update(forward=0.0, turn=0.0, head=0.0,
+                    forward_raw=AXIS_CENTRE, turn_raw=AXIS_CENTRE)
+
+    def snapshot(self):
+        """Returns a consistent ControlSnapshot of all axes."""
+        while True:
+            seq = self._seq
+            if seq & 1:
+                continue
+            snap = ControlSnapshot(seq, self.forward, self.turn, self.head,
+                                   self.forward_raw, self.turn_raw)
+            if self._seq == seq:
+                return snap
+
+
+class _WriteBlock:
+    __slots__ = ('_state',)
+
+    def __init__(self, state):
+        self._state = state
+
+    def __enter__(self):
+        self._state.begin_write()
+        return self._state
+
+    def __exit__(self, exc_type, exc, tb):
+        self._state.end_write()
+        return False
+
+
+class DriveOutput:
+    """Speeds last sent to the MD49 and the ControlState version they came from."""
+
+    __slots__ = ('left', 'right', 'version')
+
+    def __init__(self):
+        self.left = 128
+        self.right = 128
+        self.version = -1
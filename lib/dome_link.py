@@ -0,0 +1,234 @@
+"""Framed, acknowledged serial protocol between the Pi and the dome Arduino.
+
+Every message is a frame:
+
+    START (0xA5) | SEQ | OPCODE | LEN | PAYLOAD (LEN bytes) | CRC8
+
+The CRC8 (polynomial 0x07) covers SEQ through the end of PAYLOAD. The
+Arduino answers every valid frame with an ACK frame carrying the same
+sequence number, opcode OP_ACK and the acknowledged opcode as payload.
+Anything outside a frame is plain debug text from the Arduino.
+
+The matching parser lives in arduino_dome_code/arduino_dome_code.ino.
+"""
+
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+START_BYTE = 0xA5
+MAX_PAYLOAD = 16
+
+# Opcodes understood by the dome
+OP_SYNC = 0x00          # Clears the Arduino's duplicate-detection history
+OP_TOGGLE_FLAP_1 = 0x01
+OP_TOGGLE_FLAP_2 = 0x02
+OP_TOGGLE_FLAP_3 = 0x03
+OP_WAVE = 0x04
+OP_STARTLED = 0x05
+OP_CLOSE_FLAPS = 0x0B
+OP_ACK = 0x80
+
+
+def _make_crc8_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+CRC8_TABLE = _make_crc8_table()
+
+
+def crc8(data):
+    """Returns the CRC8 (polynomial 0x07, initial value 0) of a byte string."""
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_frame(seq, opcode, payload=b''):
+    """
+    Build a frame.
+
+    :param seq: Sequence number (0-255)
+    :param opcode: Opcode byte
+    :param payload: Up to MAX_PAYLOAD bytes
+    :return: Encoded frame as bytes
+    """
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Payload longer than {MAX_PAYLOAD} bytes")
+    body = bytes([seq, opcode, len(payload)]) + bytes(payload)
+    return bytes([START_BYTE]) + body + bytes([crc8(body)])
+
+
+class FrameParser:
+    """Incremental decoder that splits a byte stream into frames and text lines."""
+
+    def __init__(self):
+        self.crc_errors = 0
+        self._buf = bytearray()
+        self._text = bytearray()
+
+    def feed(self, data):
+        """
+        Decode received bytes.
+
+        :param data: Newly received bytes
+        :return: (frames, lines) where frames is a list of (seq, opcode, payload)
+                 tuples and lines is a list of complete debug text lines
+        """
+        frames = []
+        lines = []
+        buf = self._buf
+        buf += data
+        while buf:
+            if buf[0] != START_BYTE:
+                byte = buf.pop(0)
+                if byte == 0x0A:
+                    lines.append(self._text.decode('ascii', 'replace').rstrip('\r'))
+                    self._text.clear()
+                else:
+                    self._text.append(byte)
+                continue
+            if len(buf) < 4:
+                break
+            length = buf[3]
+            if length > MAX_PAYLOAD:
+                buf.pop(0)
+                continue
+            end = 4 + length + 1
+            if len(buf) < end:
+                break
+            body = bytes(buf[1:end - 1])
+            if crc8(body) == buf[end - 1]:
+                frames.append((body[0], body[1], body[3:]))
+                del buf[:end]
+            else:
+                # Not a real frame (or a corrupted one); resync on the next byte.
+                self.crc_errors += 1
+                buf.pop(0)
+        return frames, lines
+
+
+class DomeLink:
+    """Async client for the dome Arduino.
+
+    send() writes a frame immediately and waits for its ACK. Up to
+    `window` commands may be in flight at once; unacknowledged frames are
+    retransmitted after ack_timeout and give up after max_retries.
+    Round-trip time is measured for every command acknowledged on its
+    first transmission.
+
+    Received bytes are passed in with feed(), normally as the receiver
+    callback of the Arduino's SerialPort, so frames are handled as soon as
+    the event loop sees them.
+    """
+
+    def __init__(self, port, ack_timeout=0.1, max_retries=3, window=4):
+        """
+        :param port: SerialPort (or anything with a non-blocking write()) connected to the Arduino
+        :param ack_timeout: Seconds to wait for an ACK before retransmitting
+        :param max_retries: Retransmissions before a command fails
+        :param window: Maximum number of unacknowledged commands
+        """
+        self.port = port
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.parser = FrameParser()
+        self.last_rtt = None
+        self.avg_rtt = None
+        self.retransmits = 0
+        self.failures = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.errors = 0
+        self._seq = random.randrange(256)
+        self._window = asyncio.Semaphore(window)
+        self._in_flight = {}
+
+    def _next_seq(self):
+        seq = self._seq
+        self._seq = (self._seq + 1) & 0xFF
+        return seq
+
+    async def send(self, opcode, payload=b''):
+        """
+        Send a command and wait for the Arduino to acknowledge it.
+
+        :param opcode: Opcode byte
+        :param payload: Optional payload bytes
+        :return: Round-trip time in seconds
+        :raises IOError: If no ACK arrives after all retries
+        """
+        loop = asyncio.get_running_loop()
+        async with self._window:
+            seq = self._next_seq()
+            frame = encode_frame(seq, opcode, payload)
+            future = loop.create_future()
+            now = loop.time()
+            # [frame, first sent, last sent, attempts, future]
+            self._in_flight[seq] = [frame, now, now, 1, future]
+            try:
+                self.port.write(frame)
+                self.bytes_written += len(frame)
+                return await future
+            finally:
+                self._in_flight.pop(seq, None)
+
+    def _handle_frame(self, seq, opcode, payload):
+        if opcode != OP_ACK:
+            logger.info(f"Dome frame: seq={seq} opcode={opcode} payload={payload!r}")
+            return
+        entry = self._in_flight.get(seq)
+        if entry is None or entry[4].done():
+            return
+        rtt = asyncio.get_running_loop().time() - entry[2]
+        if entry[3] == 1:
+            # Only first transmissions give an unambiguous RTT sample.
+            self.last_rtt = rtt
+            self.avg_rtt = rtt if self.avg_rtt is None else 0.9 * self.avg_rtt + 0.1 * rtt
+        entry[4].set_result(rtt)
+
+    async def _retransmit_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.ack_timeout / 2)
+            now = loop.time()
+            for seq, entry in list(self._in_flight.items()):
+                frame, _, sent, attempts, future = entry
+                if future.done() or now - sent < self.ack_timeout:
+                    continue
+                if attempts > self.max_retries:
+                    self.failures += 1
+                    future.set_exception(IOError(f"No ACK from dome for seq {seq}"))
+                    continue
+                try:
+                    self.port.write(frame)
+                    self.bytes_written += len(frame)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Dome retransmit failed: {e}")
+                entry[2] = now
+                entry[3] = attempts + 1
+                self.retransmits += 1
+
+    def feed(self, data):
+        """Handles bytes received from the Arduino: ACKs, other frames and debug text."""
+        self.bytes_read += len(data)
+        frames, lines = self.parser.feed(data)
+        for seq, opcode, payload in frames:
+            self._handle_frame(seq, opcode, payload)
+        for line in lines:
+            if line:
+                logger.info(f"Arduino: {line}")
+
+    async def run(self):
+        """Retransmits unacknowledged frames until cancelled."""
+        await self._retransmit_loop()
@@ -0,0 +1,134 @@
+"""Precomputed differential drive mixing from raw stick values to MD49 speeds."""
+
+AXIS_CENTRE = 127  # raw stick value at rest
+NEUTRAL_SPEED = 128  # MD49 mode 0 stop
+
+
+def apply_response_curve(input_value, curve_factor=1.0):
+    """Raise the magnitude to curve_factor, keeping the sign (finer low-end control)."""
+    sign = 1 if input_value >= 0 else -1
+    return sign * (abs(input_value) ** curve_factor)
+
+
+def shape_axis(raw_value, curve_factor, deadzone, invert=False):
+    """
+    Convert a raw stick value (0-255) to -1.0..1.0 with deadzone and response curve.
+
+    :param raw_value: Value reported by the gamepad
+    :param curve_factor: Response curve exponent
+    :param deadzone: Normalized distance from centre that reads as zero
+    :param invert: Flip the direction of the axis
+    """
+    normalized_value = (raw_value - AXIS_CENTRE) / 128.0
+    if invert:
+        normalized_value *= -1
+    if abs(normalized_value) < deadzone:
+        return 0.0
+    return apply_response_curve(normalized_value, curve_factor)
+
+
+def drift_correction(forward_value, strength):
+    """Correction that scales with forward speed (stronger in absolute terms at speed)."""
+    scaled_strength = strength * abs(forward_value)
+    return scaled_strength if forward_value >= 0 else -scaled_strength
+
+
+def mix_speeds(forward, turn, drift_strength, output_curve=1.0):
+    """
+    Mix shaped forward/turn values into (left, right) MD49 speed bytes.
+
+    This is the per-tick pipeline the lookup table is built from: mix,
+    clamp, drift correction when driving straight, clamp, output curve and
+    map to 0-255. Near-zero commands give an exact stop.
+    """
+    if abs(forward) <= 0.01 and abs(turn) <= 0.01:
+        return NEUTRAL_SPEED, NEUTRAL_SPEED
+
+    # Combine forward and turn, clamped before drift correction
+    left_motor = max(-1.0, min(1.0, forward + turn))
+    right_motor = max(-1.0, min(1.0, forward - turn))
+
+    # Apply drift correction only if going straight
+    if abs(forward) > 0.01 and abs(turn) <= 0.01:
+        correction = drift_correction(forward, drift_strength)
+        left_motor += correction
+        right_motor -= correction
+
+    # Clamp again after correction
+    left_motor = max(-1.0, min(1.0, left_motor))
+    right_motor = max(-1.0, min(1.0, right_motor))
+
+    left_motor = apply_response_curve(left_motor, output_curve)
+    right_motor = apply_response_curve(right_motor, output_curve)
+
+    return int(128 + left_motor * 127), int(128 + right_motor * 127)
+
+
+class DriveMixer:
+    """
+    Lookup table from raw (forward, turn) stick values to MD49 speeds.
+
+    The gamepad reports 256 values per axis, so every possible stick
+    position is mixed once when the table is built and each control tick
+    is a single index. Changing the tuning rebuilds the table.
+    """
+
+    TUNING = ('curve_factor', 'deadzone', 'drift_strength', 'output_curve', 'invert_forward')
+
+    def __init__(self, curve_factor=2.0, deadzone=5 / 128.0, drift_strength=0.0,
+                 output_curve=1.0, invert_forward=False):
+        """
+        :param curve_factor: Response curve exponent for both stick axes
+        :param deadzone: Normalized distance from centre that reads as zero
+        :param drift_strength: Open-loop straight-line drift correction at full
+                               forward (0 when the encoder controller is used)
+        :param output_curve: Response curve applied to the mixed motor values
+        :param invert_forward: Flip the forward axis
+        """
+        self.curve_factor = curve_factor
+        self.deadzone = deadzone
+        self.drift_strength = drift_strength
+        self.output_curve = output_curve
+        self.invert_forward = invert_forward
+        self.left = bytearray(256 * 256)
+        self.right = bytearray(256 * 256)
+        self.builds = 0
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute every entry of the table from the current tuning."""
+        forward_values = [shape_axis(raw, self.curve_factor, self.deadzone, self.invert_forward)
+                          for raw in range(256)]
+        turn_values = [shape_axis(raw, self.curve_factor, self.deadzone) for raw in range(256)]
+        left = self.left
+        right = self.right
+        drift_strength = self.drift_strength
+        output_curve = self.output_curve
+        i = 0
+        for forward in forward_values:
+            for turn in turn_values:
+                left[i], right[i] = mix_speeds(forward, turn, drift_strength, output_curve)
+                i += 1
+        self.builds += 1
+
+    def set_tuning(self, **tuning):
+        """
+        Change any of the tuning parameters, rebuilding the table if one changed.
+
+        :return: True if the table was rebuilt
+        """
+        changed = False
+        for name, value in tuning.items():
+            if name not in self.TUNING:
+                raise ValueError(f"Unknown drive tuning parameter: {name}")
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed = True
+        if changed:
+            self.rebuild()
+        return changed
+
+    def mix(self, forward_raw, turn_raw):
+        """Returns (left, right) MD49 speeds for raw stick values 0-255."""
+        i = (forward_raw << 8) | turn_raw
+        return self.left[i], self.right[i]
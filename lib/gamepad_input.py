@@ -0,0 +1,84 @@
+"""Batched evdev input reader that coalesces events into SYN_REPORT frames."""
+
+from evdev import ecodes
+
+# Absolute axes that behave like buttons (the D-pad), so every change matters.
+DISCRETE_AXES = (ecodes.ABS_HAT0X, ecodes.ABS_HAT0Y)
+
+
+class InputFrame:
+    """State changes reported by the gamepad since the previous frame.
+
+    axes holds only the latest value of each analog axis that moved.
+    edges holds every button and D-pad event, in the order they happened.
+    """
+
+    __slots__ = ('axes', 'edges')
+
+    def __init__(self, axes, edges):
+        self.axes = axes
+        self.edges = edges
+
+
+class GamepadReader:
+    """Reads evdev events in batches and yields one InputFrame per batch.
+
+    Events are grouped by SYN_REPORT; analog axis values from every
+    complete report in a batch are merged so that only the newest value
+    per axis is published. A SYN_DROPPED marker discards the partial
+    report, as the kernel documentation asks.
+    """
+
+    def __init__(self, device, discrete_axes=DISCRETE_AXES):
+        """
+        :param device: evdev InputDevice (or anything with async_read())
+        :param discrete_axes: EV_ABS codes to report as edges instead of values
+        """
+        self.device = device
+        self.discrete_axes = discrete_axes
+        self.events = 0
+        self.frames = 0
+        self.coalesced = 0
+
+    async def frames_iter(self):
+        """Async generator of InputFrame objects, one per batch of complete reports."""
+        axes = {}
+        edges = []
+        pending_axes = {}
+        pending_edges = []
+        dropping = False
+        while True:
+            events = await self.device.async_read()
+            for event in events:
+                self.events += 1
+                if event.type == ecodes.EV_SYN:
+                    if event.code == ecodes.SYN_REPORT:
+                        if not dropping:
+                            for code, value in pending_axes.items():
+                                if code in axes:
+                                    self.coalesced += 1
+                                axes[code] = value
+                            edges.extend(pending_edges)
+                        dropping = False
+                        pending_axes.clear()
+                        pending_edges.clear()
+                    elif event.code == ecodes.SYN_DROPPED:
+                        dropping = True
+                        pending_axes.clear()
+                        pending_edges.clear()
+                elif dropping:
+                    continue
+                elif event.type == ecodes.EV_ABS and event.code not in self.discrete_axes:
+                    if event.code in pending_axes:
+                        self.coalesced += 1
+                    pending_axes[event.code] = event.value
+                elif event.type in (ecodes.EV_KEY, ecodes.EV_ABS):
+                    pending_edges.append(event)
+            if axes or edges:
+                self.frames += 1
+                yield InputFrame(axes, edges)
+                axes = {}
+                edges = []
+
+    def __aiter__(self):
+        return self.frames_iter()
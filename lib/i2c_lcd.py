@@ -17,6 +17,10 @@ MASK_E = 0x04
 SHIFT_BACKLIGHT = 3
 SHIFT_DATA = 4
 
+# SMBus block writes carry a command byte plus at most 32 data bytes. The
+# PCF8574 has no registers, so the "command" byte is just another output byte.
+I2C_BLOCK_SIZE = 33
+
 
 class I2cLcd(LcdApi):
     """Implements a HD44780 character LCD connected via PCF8574 on I2C."""
@@ -93,4 +97,36 @@ class I2cLcd(LcdApi):
                 (self.backlight << SHIFT_BACKLIGHT) |
                 ((data & 0x0f) << SHIFT_DATA))
         self.bus.write_byte(self.i2c_addr, byte | MASK_E)
-        self.bus.write_byte(self.i2c_addr, byte)
\ No newline at end of file
+        self.bus.write_byte(self.i2c_addr, byte)
+
+    def hal_write_batch(self, ops):
+        """Write a sequence of commands and data bytes to the LCD.
+
+        Every nibble is clocked out as an E-high/E-low byte pair, and the
+        resulting byte stream is sent with SMBus block writes instead of
+        one write_byte call per byte.
+        """
+        buf = bytearray()
+        backlight = self.backlight << SHIFT_BACKLIGHT
+        for is_data, value in ops:
+            rs = MASK_RS if is_data else 0
+            for nibble in ((value >> 4) & 0x0f, value & 0x0f):
+                byte = rs | backlight | (nibble << SHIFT_DATA)
+                buf.append(byte | MASK_E)
+                buf.append(byte)
+            if not is_data and value <= 3:
+                # The home and clear commands require a worst
+                # case delay of 4.1 msec
+                self._write_block(buf)
+                buf = bytearray()
+                time.sleep(0.005)
+        self._write_block(buf)
+
+    def _write_block(self, buf):
+        """Send raw PCF8574 output bytes using as few bus transactions as possible."""
+        for i in range(0, len(buf), I2C_BLOCK_SIZE):
+            chunk = buf[i:i + I2C_BLOCK_SIZE]
+            if len(chunk) == 1:
+                self.bus.write_byte(self.i2c_addr, chunk[0])
+            else:
+                self.bus.write_i2c_block_data(self.i2c_addr, chunk[0], list(chunk[1:]))
@@ -125,12 +125,16 @@ class LcdApi:
         """
         self.cursor_x = cursor_x
         self.cursor_y = cursor_y
+        self.hal_write_command(self.LCD_DDRAM | self.ddram_addr(cursor_x, cursor_y))
+
+    def ddram_addr(self, cursor_x, cursor_y):
+        """Returns the DD RAM address of the indicated cursor position."""
         addr = cursor_x & 0x3f
         if cursor_y & 1:
             addr += 0x40    # Lines 1 & 3 add 0x40
         if cursor_y & 2:    # Lines 2 & 3 add number of columns
             addr += self.num_columns
-        self.hal_write_command(self.LCD_DDRAM | addr)
+        return addr
 
     def putchar(self, char):
         """Writes the indicated character to the LCD at the current cursor
@@ -203,6 +207,20 @@ class LcdApi:
         """
         raise NotImplementedError
 
+    def hal_write_batch(self, ops):
+        """Write a sequence of commands and data bytes to the LCD.
+
+        ops is an iterable of (is_data, value) tuples. This default
+        implementation writes them one at a time; a derived HAL class
+        may override it to send the whole sequence in fewer bus
+        transactions.
+        """
+        for is_data, value in ops:
+            if is_data:
+                self.hal_write_data(value)
+            else:
+                self.hal_write_command(value)
+
     # This is a default implementation of hal_sleep_us which is suitable
     # for most micropython implementations. For platforms which don't
     # support `time.sleep_us()` they should provide their own implementation
@@ -0,0 +1,70 @@
+"""Rotating diagnostics pages on the LCD, toggled from the controller."""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DiagnosticsPage:
+    """
+    Shows live diagnostics on the LCD in place of the normal status text.
+
+    Each page is a callable returning one string per LCD line. While the
+    page is active, the current page is redrawn every refresh_interval
+    seconds and the next one comes up every rotate_interval seconds.
+    Drawing goes through the LcdService like everything else, so only
+    changed characters reach the I2C bus.
+    """
+
+    def __init__(self, lcd_service, pages, refresh_interval=0.5, rotate_interval=3.0):
+        """
+        :param lcd_service: LcdService that owns the display
+        :param pages: List of callables, each returning a list of line strings
+        :param refresh_interval: Seconds between redraws of the current page
+        :param rotate_interval: Seconds each page stays up
+        """
+        self.lcd_service = lcd_service
+        self.pages = pages
+        self.refresh_interval = refresh_interval
+        self.rotate_interval = rotate_interval
+        self.active = False
+        self.index = 0
+        self._wakeup = asyncio.Event()
+
+    def toggle(self):
+        """Switches between diagnostics and the normal display."""
+        self.active = not self.active
+        self.index = 0
+        self._wakeup.set()
+        if not self.active:
+            self.lcd_service.show_message("DIAG OFF")
+
+    def _draw(self):
+        try:
+            lines = self.pages[self.index]()
+        except Exception as e:
+            logger.error(f"Diagnostics page {self.index} failed: {e}")
+            lines = [f"PAGE {self.index} ERROR"]
+        for line in range(self.lcd_service.framebuffer.num_lines):
+            self.lcd_service.show(line, lines[line] if line < len(lines) else '')
+
+    async def run(self):
+        """Draws the pages while active, until cancelled."""
+        loop = asyncio.get_running_loop()
+        shown_at = loop.time()
+        while True:
+            if not self.active:
+                await self._wakeup.wait()
+                shown_at = loop.time()
+            self._wakeup.clear()
+            if not self.active:
+                continue
+            if loop.time() - shown_at >= self.rotate_interval:
+                self.index = (self.index + 1) % len(self.pages)
+                shown_at = loop.time()
+            self._draw()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,105 @@
+"""Shadow framebuffer renderer for HD44780 compatible character LCDs."""
+
+# Writing one unchanged character costs the same number of bus bytes as a
+# cursor move, so gaps up to this width are rewritten rather than skipped.
+MAX_GAP = 1
+
+
+class LcdFramebuffer:
+    """Keeps a copy of what is on the LCD and only sends the cells that change.
+
+    Callers describe the screen they want with set_line()/set_text(), then
+    call flush() to push the difference to the display in a single batch.
+    Once a framebuffer owns an LCD, nothing else should write characters to
+    that LCD directly (call invalidate() if something does).
+    """
+
+    def __init__(self, lcd):
+        """
+        :param lcd: An LcdApi instance (e.g. I2cLcd) that has just been cleared
+        """
+        self.lcd = lcd
+        self.num_lines = lcd.num_lines
+        self.num_columns = lcd.num_columns
+        blank = b' ' * self.num_columns
+        self._desired = [bytearray(blank) for _ in range(self.num_lines)]
+        self._shadow = [bytearray(blank) for _ in range(self.num_lines)]
+        self._stale = False
+
+    def set_line(self, line, text):
+        """Sets the desired contents of one line, padded or cut to the LCD width.
+
+        :param line: Zero based line number
+        :param text: Text to show on that line
+        """
+        data = text.encode('ascii', 'replace')[:self.num_columns]
+        self._desired[line][:] = data.ljust(self.num_columns)
+
+    def set_text(self, text):
+        """Sets the desired contents of the whole screen, one line per '\\n'."""
+        lines = text.split('\n')
+        for line in range(self.num_lines):
+            self.set_line(line, lines[line] if line < len(lines) else '')
+
+    def get_line(self, line):
+        """Returns the desired contents of a line, without trailing padding."""
+        return self._desired[line].decode('ascii').rstrip()
+
+    def clear(self):
+        """Sets the desired screen contents to blank."""
+        for line in range(self.num_lines):
+            self.set_line(line, '')
+
+    def invalidate(self):
+        """Forces the next flush() to redraw every cell.
+
+        Use this after anything other than the framebuffer has written to
+        the LCD (for example LcdApi.clear()).
+        """
+        self._stale = True
+
+    def flush(self):
+        """Writes the changed cells to the LCD.
+
+        :return: Number of characters sent to the LCD
+        """
+        lcd = self.lcd
+        ops = []
+        written = 0
+        cursor = (lcd.cursor_x, lcd.cursor_y)
+        for y in range(self.num_lines):
+            desired = self._desired[y]
+            shadow = self._shadow[y]
+            x = 0
+            while x < self.num_columns:
+                if not self._stale and desired[x] == shadow[x]:
+                    x += 1
+                    continue
+                # Extend the run over any short stretch of unchanged cells
+                # that sits between two changed ones.
+                end = x + 1
+                while end < self.num_columns:
+                    if self._stale or desired[end] != shadow[end]:
+                        end += 1
+                        continue
+                    gap_end = end
+                    while (gap_end < self.num_columns and gap_end - end < MAX_GAP
+                           and desired[gap_end] == shadow[gap_end]):
+                        gap_end += 1
+                    if gap_end < self.num_columns and desired[gap_end] != shadow[gap_end]:
+                        end = gap_end
+                    else:
+                        break
+                if cursor != (x, y):
+                    ops.append((False, lcd.LCD_DDRAM | lcd.ddram_addr(x, y)))
+                for col in range(x, end):
+                    ops.append((True, desired[col]))
+                    shadow[col] = desired[col]
+                written += end - x
+                cursor = (end, y)
+                x = end
+        self._stale = False
+        if ops:
+            lcd.hal_write_batch(ops)
+            lcd.cursor_x, lcd.cursor_y = cursor
+        return written
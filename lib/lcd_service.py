@@ -0,0 +1,70 @@
+"""Asyncio service that owns the LCD and coalesces display updates."""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# The HD44780 liquid crystal takes ~100 ms to visibly settle, so refreshing
+# any faster than this only burns I2C bus time.
+DEFAULT_MIN_INTERVAL = 0.1
+
+
+class LcdService:
+    """Single owner of an LcdFramebuffer, driven from one asyncio task.
+
+    Any coroutine may call show() without blocking. Requests are kept
+    per line and only the latest text for each line is drawn, at most
+    once every min_interval seconds. The blocking smbus I/O runs on a
+    dedicated worker thread so it never stalls the event loop.
+    """
+
+    def __init__(self, framebuffer, min_interval=DEFAULT_MIN_INTERVAL):
+        """
+        :param framebuffer: LcdFramebuffer wrapping the physical LCD
+        :param min_interval: Minimum time in seconds between two flushes
+        """
+        self.framebuffer = framebuffer
+        self.min_interval = min_interval
+        self.flushes = 0
+        self.superseded = 0
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lcd')
+
+    def show(self, line, text):
+        """Requests that a line of the display shows the given text.
+
+        :param line: Zero based line number
+        :param text: Text to show, padded or cut to the LCD width
+        """
+        if line in self._pending:
+            self.superseded += 1
+        self._pending[line] = text
+        self._wakeup.set()
+
+    def show_message(self, text):
+        """Requests that the display shows text on the first line only."""
+        for line in range(self.framebuffer.num_lines):
+            self.show(line, text if line == 0 else '')
+
+    async def run(self):
+        """Flushes pending updates to the LCD until cancelled."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                pending, self._pending = self._pending, {}
+                for line, text in pending.items():
+                    self.framebuffer.set_line(line, text)
+                try:
+                    await loop.run_in_executor(self._executor, self.framebuffer.flush)
+                    self.flushes += 1
+                except Exception as e:
+                    logger.error(f"LCD flush failed: {e}")
+                    self.framebuffer.invalidate()
+                await asyncio.sleep(self.min_interval)
+        finally:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,246 @@
+"""In-process metrics (counters, gauges, histograms) with a Prometheus text endpoint."""
+
+import asyncio
+import bisect
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets, in seconds: 1 ms to 1 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A value that only goes up (events, bytes, errors)."""
+
+    kind = 'counter'
+
+    def __init__(self, fn=None):
+        """
+        :param fn: Optional callable returning the current total, for counts
+                   another object already keeps
+        """
+        self.value = 0
+        self._fn = fn
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def get(self):
+        return self._fn() if self._fn else self.value
+
+    def samples(self, name, labels):
+        yield name, labels, self.get()
+
+
+class Gauge:
+    """A value that can go up and down (volts, jitter, queue length)."""
+
+    kind = 'gauge'
+
+    def __init__(self, fn=None):
+        """
+        :param fn: Optional callable returning the current value, read at scrape time
+        """
+        self.value = 0
+        self._fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self._fn() if self._fn else self.value
+
+    def samples(self, name, labels):
+        yield name, labels, self.get()
+
+
+class Histogram:
+    """Counts observations into fixed buckets (latencies)."""
+
+    kind = 'histogram'
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: Sorted upper bounds of the buckets
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.last = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+
+    def quantile(self, q):
+        """Rough quantile: the upper bound of the bucket holding it (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return math.inf
+
+    def samples(self, name, labels):
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            yield name + '_bucket', labels + (('le', _format_value(float(bound))),), total
+        yield name + '_sum', labels, self.sum
+        yield name + '_count', labels, self.count
+
+
+class RateMeter:
+    """Per-second rate of a Counter between successive calls, for on-device displays."""
+
+    def __init__(self, counter, clock):
+        """
+        :param counter: Counter to watch
+        :param clock: Callable returning the time in seconds (e.g. time.monotonic)
+        """
+        self.counter = counter
+        self.clock = clock
+        self._last = (clock(), counter.get())
+        self.value = 0.0
+
+    def rate(self):
+        now, total = self.clock(), self.counter.get()
+        elapsed = now - self._last[0]
+        if elapsed > 0:
+            self.value = (total - self._last[1]) / elapsed
+            self._last = (now, total)
+        return self.value
+
+
+class MetricsRegistry:
+    """
+    Named metrics, optionally with labels, rendered in Prometheus text format.
+
+    Registering the same name and labels again returns the existing
+    metric, so code can look a metric up where it uses it. Counters and
+    gauges can read their value from a callable at scrape time, which
+    costs nothing on the control path.
+    """
+
+    def __init__(self):
+        self._families = {}  # name -> [kind, help, {labels: metric}]
+
+    def _register(self, cls, name, help_text, labels, **kwargs):
+        key = tuple(sorted(labels.items()))
+        family = self._families.setdefault(name, [cls.kind, help_text, {}])
+        if family[0] != cls.kind:
+            raise ValueError(f"Metric {name} is already registered as a {family[0]}")
+        metric = family[2].get(key)
+        if metric is None:
+            metric = cls(**kwargs)
+            family[2][key] = metric
+        elif kwargs.get('fn') is not None:
+            # Re-registered with a new source (e.g. a reconnected device);
+            # keep the same object so references to it stay valid.
+            metric._fn = kwargs['fn']
+        return metric
+
+    def counter(self, name, help_text, fn=None, **labels):
+        """Returns the Counter with this name and labels, creating it if needed."""
+        return self._register(Counter, name, help_text, labels, fn=fn)
+
+    def gauge(self, name, help_text, fn=None, **labels):
+        """Returns the Gauge with this name and labels, creating it if needed."""
+        return self._register(Gauge, name, help_text, labels, fn=fn)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, **labels):
+        """Returns the Histogram with this name and labels, creating it if needed."""
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        """Returns every metric in Prometheus text exposition format."""
+        lines = []
+        for name, (kind, help_text, metrics) in sorted(self._families.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics.items():
+                try:
+                    for sample_name, sample_labels, value in metric.samples(name, labels):
+                        lines.append(f"{sample_name}{_format_labels(sample_labels)} "
+                                     f"{_format_value(value)}")
+                except Exception as e:
+                    logger.error(f"Metric {name} failed: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    Minimal HTTP server for Prometheus scrapes (or curl) on the event loop.
+
+    Every GET is answered with the registry's text format. Listens on a
+    TCP host/port, or on a Unix socket when socket_path is given.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=9108, socket_path=None):
+        """
+        :param registry: MetricsRegistry to serve
+        :param host: Address to listen on (keep it local unless the network is trusted)
+        :param port: TCP port
+        :param socket_path: Unix socket path to listen on instead of TCP
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.requests = 0
+        self._server = None
+
+    async def start(self):
+        if self.socket_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+            logger.info(f"Metrics on unix socket {self.socket_path}")
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5.0)
+            # Skip the headers; nothing in them matters here.
+            while (await asyncio.wait_for(reader.readline(), 5.0)) not in (b'\r\n', b'\n', b''):
+                pass
+            if request.startswith(b'GET '):
+                status, body = '200 OK', self.registry.render().encode()
+            else:
+                status, body = '405 Method Not Allowed', b''
+            self.requests += 1
+            writer.write(f"HTTP/1.0 {status}\r\n"
+                         f"Content-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
@@ -0,0 +1,133 @@
+"""Acceleration, deceleration and jerk limits for the wheel speed commands."""
+
+import math
+
+from lib.drive_mixer import NEUTRAL_SPEED
+
+
+class AxisProfile:
+    """
+    Jerk-limited ramp for one axis, in MD49 speed steps from neutral.
+
+    The value moves toward the target at a rate of at most `accel` steps
+    per second while it moves away from zero and `decel` while it moves
+    toward zero, and the rate itself changes by at most `jerk` steps/s²
+    per second, so every ramp starts and ends as an S-curve.
+
+    The rate is also capped at sqrt(2 * jerk * distance left). That is the
+    fastest rate that can still be run down to zero, at the jerk limit,
+    by the time the target is reached, so the ramp eases off ahead of the
+    target instead of overshooting it.
+    """
+
+    __slots__ = ('accel', 'decel', 'jerk', 'value', 'rate')
+
+    def __init__(self, accel, decel, jerk):
+        """
+        :param accel: Largest rate away from zero, steps per second
+        :param decel: Largest rate toward zero, steps per second
+        :param jerk: Largest change of rate, steps per second per second
+        """
+        self.accel = accel
+        self.decel = decel
+        self.jerk = jerk
+        self.value = 0.0
+        self.rate = 0.0
+
+    def reset(self, value=0.0):
+        self.value = value
+        self.rate = 0.0
+
+    def step(self, target, dt):
+        """
+        Advance by dt seconds toward target.
+
+        :return: The new value
+        """
+        error = target - self.value
+        if error == 0.0:
+            self.rate = 0.0
+            return self.value
+        away_from_zero = self.value == 0.0 or (error > 0.0) == (self.value > 0.0)
+        limit = self.accel if away_from_zero else self.decel
+        wanted = math.copysign(min(limit, math.sqrt(2.0 * self.jerk * abs(error))), error)
+        max_change = self.jerk * dt
+        rate = self.rate + max(-max_change, min(max_change, wanted - self.rate))
+        # Exact for a rate that changed linearly over dt
+        self.value += 0.5 * (self.rate + rate) * dt
+        self.rate = rate
+        if (target - self.value) * error <= 0.0:
+            # Reached (or stepped past) the target
+            self.value = target
+            self.rate = 0.0
+        return self.value
+
+
+class MotionProfile:
+    """
+    Shapes the left and right MD49 speed commands between the drive table
+    and the serial port, one AxisProfile per wheel.
+
+    Each update uses the time actually elapsed since the previous one, so
+    a late or early control cycle still follows the same curve, and a
+    higher control rate just gives finer steps along it. The elapsed time
+    is capped at max_dt, so a stalled cycle does not turn into a jump, and
+    a ramp that starts from rest counts as having started one cycle ago,
+    not when the previous ramp ended.
+    """
+
+    def __init__(self, accel=320.0, decel=480.0, jerk=3200.0, max_dt=0.1):
+        """
+        :param accel: Largest rate away from stopped, speed steps per second (128 steps is full speed)
+        :param decel: Largest rate toward stopped, speed steps per second
+        :param jerk: Largest change of rate, steps per second per second
+        :param max_dt: Longest time step a single update may take
+        """
+        self.left = AxisProfile(accel, decel, jerk)
+        self.right = AxisProfile(accel, decel, jerk)
+        self.max_dt = max_dt
+        self.target_left = 0.0
+        self.target_right = 0.0
+        self._last_time = None
+        self._last_dt = 0.0
+
+    def configure(self, accel, decel, jerk):
+        """Change the limits; the current ramp carries on under the new ones."""
+        for axis in (self.left, self.right):
+            axis.accel, axis.decel, axis.jerk = accel, decel, jerk
+
+    def reset(self, left=NEUTRAL_SPEED, right=NEUTRAL_SPEED):
+        """
+        Forget the ramp in progress and start again from the speeds the motors
+        are actually at (stopped, after a failsafe stop).
+        """
+        self.left.reset(float(left - NEUTRAL_SPEED))
+        self.right.reset(float(right - NEUTRAL_SPEED))
+        self.target_left, self.target_right = self.left.value, self.right.value
+        self._last_time = None
+
+    @property
+    def settled(self):
+        """True once both wheels have reached their targets."""
+        return (self.left.value == self.target_left and self.right.value == self.target_right
+                and self.left.rate == 0.0 and self.right.rate == 0.0)
+
+    def update(self, left, right, now):
+        """
+        Advance both ramps to the time now.
+
+        :param left: Target MD49 speed for motor 1 (0-255, NEUTRAL_SPEED stopped)
+        :param right: Target MD49 speed for motor 2
+        :param now: time.monotonic() of this cycle
+        :return: (left, right) MD49 speeds to send
+        """
+        dt = 0.0 if self._last_time is None else min(self.max_dt, max(0.0, now - self._last_time))
+        if self.settled:
+            dt = min(dt, self._last_dt)
+        else:
+            self._last_dt = dt
+        self._last_time = now
+        self.target_left = float(left - NEUTRAL_SPEED)
+        self.target_right = float(right - NEUTRAL_SPEED)
+        return (NEUTRAL_SPEED + int(round(self.left.step(self.target_left, dt))),
+                NEUTRAL_SPEED + int(round(self.right.step(self.target_right, dt))))
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+
+"""
+Real-time motor control process.
+
+Runs the MD49 drive and Sabertooth dome loops in their own process, so
+audio decoding, LCD updates, logging or a garbage collection pass in the
+main process cannot delay a motor command. The process can be pinned to
+its own CPU core and given SCHED_FIFO priority.
+
+The main process (MotorProcess) and this one share one block of memory:
+    control  stick state written by the input handler (SharedControlState)
+    tuning   gains, dome scale and which drive table bank is live
+    heartbeat  last time the main process vouched for the gamepad and itself
+    status   speeds, encoders, power and loop timing written every MD49 cycle
+    tables   two banks of drive lookup tables
+Every record is a seqlock, so neither side ever waits for the other.
+Log lines go to stderr, which MotorProcess forwards to the main log.
+
+Started by MotorProcess as `python3 -m lib.motor_process ...`.
+"""
+
+import argparse
+import asyncio
+import atexit
+import gc
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import lib.MD49 as MD49
+from lib.control_state import AXIS_CENTRE, ControlSnapshot, DriveOutput
+from lib.drive_mixer import NEUTRAL_SPEED
+from lib.motion_profile import MotionProfile
+from lib.odometry import Odometry
+from lib.shared_state import CONTROL_FIELDS, SharedControlState, SharedDriveTable, SharedRecord
+from lib.straight_line import StraightLineController
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TUNING_FIELDS = [('bank', 'B'), ('kp', 'd'), ('ki', 'd'), ('max_correction', 'd'),
+                 ('saber_scale', 'i'), ('power_poll_interval', 'd'), ('failsafe_deadline', 'd'),
+                 ('motion_profile', 'B'), ('accel', 'd'), ('decel', 'd'), ('jerk', 'd'),
+                 ('counts_per_rev', 'I'), ('wheel_diameter', 'd'), ('track_width', 'd')]
+HEARTBEAT_FIELDS = [('alive', 'd')]
+STATUS_FIELDS = [('tick', 'Q'), ('timestamp', 'd'), ('left', 'B'), ('right', 'B'),
+                 ('volts', 'B'), ('current1', 'B'), ('current2', 'B'), ('error', 'B'),
+                 ('encoder1', 'i'), ('encoder2', 'i'), ('jitter', 'd'), ('max_jitter', 'd'),
+                 ('missed', 'I'), ('md49_errors', 'I'), ('saber_errors', 'I'),
+                 ('bytes_written', 'Q'), ('bytes_read', 'Q'), ('failsafe_stops', 'I'),
+                 ('stop_latency', 'd'), ('x', 'd'), ('y', 'd'), ('heading', 'd'),
+                 ('velocity_left', 'd'), ('velocity_right', 'd'), ('linear_velocity', 'd'),
+                 ('angular_velocity', 'd')]
+
+# Log records cross to the main process one per stderr line: level, file,
+# line number and message separated by tabs, with the message's own line
+# breaks (tracebacks) replaced by LOG_LINE_BREAK
+LOG_FORMAT = '%(levelname)s\t%(pathname)s\t%(lineno)d\t%(message)s'
+LOG_LINE_BREAK = '\x1e'
+
+# What the loops act on while the heartbeat is missing; its version never
+# comes from a ControlState, so leaving the failsafe always resends
+NEUTRAL_COMMAND = ControlSnapshot(-2, 0.0, 0.0, 0.0, AXIS_CENTRE, AXIS_CENTRE)
+
+
+class MotorBlock:
+    """The records and drive tables inside the shared memory block."""
+
+    def __init__(self, buf):
+        offset = 0
+        self.control = SharedRecord(buf, offset, 'Control', CONTROL_FIELDS)
+        offset += SharedRecord.size(CONTROL_FIELDS)
+        self.tuning = SharedRecord(buf, offset, 'MotorTuning', TUNING_FIELDS)
+        offset += SharedRecord.size(TUNING_FIELDS)
+        self.heartbeat = SharedRecord(buf, offset, 'Heartbeat', HEARTBEAT_FIELDS)
+        offset += SharedRecord.size(HEARTBEAT_FIELDS)
+        self.status = SharedRecord(buf, offset, 'MotorStatus', STATUS_FIELDS)
+        self.tables = SharedDriveTable(buf, self.tables_offset())
+
+    @staticmethod
+    def tables_offset():
+        size = sum(SharedRecord.size(fields) for fields in (CONTROL_FIELDS, TUNING_FIELDS, HEARTBEAT_FIELDS,
+                                                                STATUS_FIELDS))
+        return (size + 63) & ~63
+
+    @classmethod
+    def size(cls):
+        return cls.tables_offset() + SharedDriveTable.size()
+
+    def release(self):
+        self.tables.release()
+
+
+def make_realtime(cpu, priority):
+    """
+    Pin this process to one CPU core and switch it to SCHED_FIFO.
+
+    Either step can fail without root (or CAP_SYS_NICE for the priority);
+    that is logged and the loop runs with normal scheduling.
+
+    :param cpu: Core number, or None to leave the affinity alone
+    :param priority: SCHED_FIFO priority 1-99, or 0 to keep normal scheduling
+    """
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+            logger.info(f"Motor process pinned to CPU {cpu}")
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not pin the motor process to CPU {cpu}: {e}")
+    if priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            logger.info(f"Motor process running SCHED_FIFO priority {priority}")
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not set real-time priority {priority} "
+                           f"(needs root or CAP_SYS_NICE): {e}")
+
+
+class MotorLoop:
+    """
+    The MD49 and Sabertooth control cycles, run on fixed deadlines.
+
+    The MD49 cycle is the same as R2D2_main.md49_drive_tick: read the
+    encoders (which also keeps the MD49's comms timeout fed) into the
+    odometry, apply the
+    straight-line correction when driving straight, look the stick up in
+    the live drive table, ramp toward it through the motion profile and
+    send only the speeds that changed.
+
+    The main process writes the heartbeat record while the gamepad is
+    connected. Once it is older than the failsafe deadline (gamepad lost,
+    or the main process stalled) both loops drive to neutral on their own.
+    """
+
+    def __init__(self, block, board, saber, md49_rate_hz, saber_rate_hz):
+        self.block = block
+        self.control = SharedControlState(block.control, publish=False)
+        self.board = board
+        self.saber = saber
+        self.md49_period = 1.0 / md49_rate_hz
+        self.saber_period = 1.0 / saber_rate_hz
+        self.output = DriveOutput()
+        self.straight_line = StraightLineController()
+        self.profile = MotionProfile()
+        self.odometry = Odometry()
+        self.power = MD49.PowerStatus(0, 0, 0, 0)
+        self.encoders = MD49.Encoders(0, 0)
+        self.tuning = None
+        self._tuning_seq = None
+        self.stopping = False
+        self.ticks = 0
+        self.jitter = 0.0
+        self.max_jitter = 0.0
+        self.missed = 0
+        self.md49_errors = 0
+        self.saber_errors = 0
+        self.failsafe = False
+        self.failsafe_since = 0.0
+        self.failsafe_stops = 0
+        self.stop_latency = 0.0
+
+    def command(self, now):
+        """
+        The command to act on: the shared controls, or neutral while the
+        heartbeat is missing. A record the main process left half written
+        (stuck or killed mid-write) counts as a missing heartbeat.
+        """
+        heartbeat = self.block.heartbeat
+        alive = heartbeat.read().alive
+        stuck = heartbeat.stale
+        if not stuck and now - alive <= self.tuning.failsafe_deadline:
+            command = self.control.snapshot()
+            stuck = self.control.stale
+            if not stuck:
+                if self.failsafe:
+                    self.failsafe = False
+                    logger.info("Heartbeat from the main process is back")
+                return command
+        if not self.failsafe and alive:
+            # (alive is 0 until the main process has a gamepad: already neutral)
+            self.failsafe = True
+            self.failsafe_since = alive
+            if stuck:
+                logger.warning("Main process stopped in the middle of a shared write, stopping the motors")
+            else:
+                logger.warning(f"No heartbeat from the main process for {(now - alive) * 1000:.0f} ms, "
+                               f"stopping the motors")
+        return NEUTRAL_COMMAND
+
+    def check_tuning(self):
+        """Pick up new gains or a new drive table bank from the main process."""
+        seq, tuning = self.block.tuning.read_versioned()
+        if seq == self._tuning_seq:
+            return
+        self._tuning_seq = seq
+        if self.tuning is None or tuning.bank != self.tuning.bank:
+            self.output.version = -1  # resend through the new table
+        if self.tuning is not None and tuning.motion_profile != self.tuning.motion_profile:
+            self.profile.reset(self.output.left, self.output.right)
+        self.tuning = tuning
+        self.profile.configure(tuning.accel, tuning.decel, tuning.jerk)
+        self.odometry.configure(tuning.counts_per_rev, tuning.wheel_diameter, tuning.track_width)
+        self.straight_line.kp = tuning.kp
+        self.straight_line.ki = tuning.ki
+        self.straight_line.max_correction = tuning.max_correction
+
+    def md49_tick(self):
+        board = self.board
+        output = self.output
+        try:
+            encoders = board.get_encoders()
+            self.encoders = encoders
+        except Exception as e:
+            self.md49_errors += 1
+            logger.error(f"MD49 encoder read failed: {e}")
+            encoders = None
+        now = time.monotonic()
+        if encoders is not None:
+            self.odometry.update(encoders.encoder1, encoders.encoder2, now)
+
+        command = self.command(now)
+        driving_straight = command.forward != 0.0 and command.turn == 0.0
+        if encoders is None or not driving_straight:
+            self.straight_line.reset(encoders, now)
+            if command.version == output.version and self.profile.settled:
+                return
+
+        left, right = self.block.tables.mix(self.tuning.bank, command.forward_raw, command.turn_raw)
+        if command is NEUTRAL_COMMAND:
+            # The failsafe stops at once, not down the ramp
+            self.profile.reset()
+        elif self.tuning.motion_profile:
+            left, right = self.profile.update(left, right, now)
+        if encoders is not None and driving_straight:
+            left, right = self.straight_line.update(left, right, encoders, now)
+
+        try:
+            if left == NEUTRAL_SPEED and right == NEUTRAL_SPEED:
+                if output.left != NEUTRAL_SPEED or output.right != NEUTRAL_SPEED:
+                    board.set_speeds(NEUTRAL_SPEED, NEUTRAL_SPEED)
+                    output.left = output.right = NEUTRAL_SPEED
+                    if command is NEUTRAL_COMMAND and self.failsafe:
+                        self.failsafe_stops += 1
+                        self.stop_latency = time.monotonic() - self.failsafe_since
+            else:
+                # As in md49_drive_tick, a ramp's last step is always sent
+                settled = self.tuning.motion_profile and self.profile.settled and not driving_straight
+                deadband = 0 if settled else 1
+                update_left = abs(left - output.left) > deadband
+                update_right = abs(right - output.right) > deadband
+                if update_left and update_right:
+                    board.set_speeds(left, right)
+                elif update_left:
+                    board.set_speed(1, left)
+                elif update_right:
+                    board.set_speed(2, right)
+                if update_left:
+                    output.left = left
+                if update_right:
+                    output.right = right
+        except Exception as e:
+            self.md49_errors += 1
+            logger.error(f"MD49 speed write failed: {e}")
+            return
+        output.version = command.version
+
+    def saber_tick(self):
+        try:
+            self.saber.drive(1, int(self.command(time.monotonic()).head * self.tuning.saber_scale))
+        except Exception as e:
+            self.saber_errors += 1
+            logger.error(f"Saber drive error: {e}")
+
+    def poll_power(self):
+        try:
+            status = self.board.get_volts_amps_error()
+        except Exception as e:
+            self.md49_errors += 1
+            logger.error(f"MD49 power read failed: {e}")
+            return
+        if status.error != self.power.error:
+            logger.warning(f"MD49 error byte changed to {status.error:#04x} (volts={status.volts})")
+        self.power = status
+
+    def publish_status(self):
+        power, encoders, output = self.power, self.encoders, self.output
+        board, odometry = self.board, self.odometry
+        self.block.status.write(self.ticks, time.time(), output.left, output.right,
+                                power.volts, power.current1, power.current2, power.error,
+                                encoders.encoder1, encoders.encoder2, self.jitter, self.max_jitter,
+                                self.missed, self.md49_errors, self.saber_errors,
+                                board.bytes_written, board.bytes_read, self.failsafe_stops,
+                                self.stop_latency, odometry.x, odometry.y, odometry.heading,
+                                odometry.velocity_left, odometry.velocity_right,
+                                odometry.linear_velocity, odometry.angular_velocity)
+
+    def _next_deadline(self, deadline, period, now):
+        deadline += period
+        if now > deadline:
+            # Too late for one or more ticks: skip them and stay on the grid
+            skipped = int((now - deadline) // period) + 1
+            self.missed += skipped
+            deadline += skipped * period
+        return deadline
+
+    def run(self, parent_pid):
+        """Runs the loops until stop is requested or the main process goes away."""
+        self.check_tuning()
+        start = time.monotonic()
+        next_md49 = next_saber = next_power = start
+        while not self.stopping:
+            deadline = min(next_md49 if self.board else start + 3600,
+                           next_saber if self.saber else start + 3600,
+                           time.monotonic() + 0.1)
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if os.getppid() != parent_pid:
+                logger.error("Main process is gone, stopping the motors")
+                break
+            self.check_tuning()
+            now = time.monotonic()
+            if self.board and now >= next_md49:
+                self.jitter = now - next_md49
+                self.max_jitter = max(self.max_jitter, self.jitter)
+                self.md49_tick()
+                if now >= next_power:
+                    self.poll_power()
+                    next_power = now + self.tuning.power_poll_interval
+                self.ticks += 1
+                self.publish_status()
+                next_md49 = self._next_deadline(next_md49, self.md49_period, time.monotonic())
+            if self.saber and now >= next_saber:
+                self.saber_tick()
+                next_saber = self._next_deadline(next_saber, self.saber_period, time.monotonic())
+
+    def stop_motors(self):
+        if self.board:
+            try:
+                self.board.set_speeds(NEUTRAL_SPEED, NEUTRAL_SPEED)
+            except Exception as e:
+                logger.error(f"Failed stopping motors: {e}")
+        if self.saber:
+            try:
+                self.saber.drive(1, 0)
+            except Exception as e:
+                logger.error(f"Failed stopping saber: {e}")
+
+
+class _OneLineFormatter(logging.Formatter):
+    """Formats each record (traceback included) as a single line of LOG_FORMAT."""
+
+    def format(self, record):
+        return super().format(record).replace('\n', LOG_LINE_BREAK)
+
+
+def open_md49(port, acceleration):
+    try:
+        board = MD49.MotorBoardMD49(port=port, timeout=0.1)
+        board.reset_to_defaults()
+        board.set_acceleration(acceleration)
+        board.set_speeds(NEUTRAL_SPEED, NEUTRAL_SPEED)
+        logger.info(f"md49 motor controller connected on {port}")
+        return board
+    except Exception as e:
+        logger.error(f"Error connecting to MD49: {e}")
+        return None
+
+
+def open_saber(port, baudrate):
+    try:
+        from pysabertooth import Sabertooth
+        saber = Sabertooth(port, timeout=0.1, baudrate=baudrate, address=128)
+        # Wiggle the dome so it is obvious the Sabertooth is alive
+        saber.drive(1, 50)
+        time.sleep(0.2)
+        saber.drive(1, -50)
+        time.sleep(0.2)
+        saber.drive(1, 0)
+        return saber
+    except Exception as e:
+        logger.error(f"Error connecting to Sabertooth: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="R2D2 real-time motor control process.")
+    parser.add_argument('--shm', required=True, help="Name of the shared memory block")
+    parser.add_argument('--md49-port')
+    parser.add_argument('--saber-port')
+    parser.add_argument('--saber-baud', type=int, default=9600)
+    parser.add_argument('--md49-rate', type=float, default=20.0)
+    parser.add_argument('--saber-rate', type=float, default=20.0)
+    parser.add_argument('--md49-acceleration', type=int, default=5, help="MD49 acceleration register (1-10)")
+    parser.add_argument('--cpu', type=int, help="CPU core to pin the process to")
+    parser.add_argument('--priority', type=int, default=0, help="SCHED_FIFO priority (0 for normal)")
+    args = parser.parse_args()
+
+    # One line per record; the main process rebuilds the records from them
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(_OneLineFormatter(LOG_FORMAT))
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+    parent_pid = os.getppid()
+
+    shm = shared_memory.SharedMemory(name=args.shm)
+    # The main process owns the block; don't let this process's resource
+    # tracker remove it when we exit
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    block = MotorBlock(shm.buf)
+
+    loop = None
+
+    def request_stop(signum, frame):
+        if loop:
+            loop.stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    make_realtime(args.cpu, args.priority)
+    board = open_md49(args.md49_port, args.md49_acceleration) if args.md49_port else None
+    saber = open_saber(args.saber_port, args.saber_baud) if args.saber_port else None
+    loop = MotorLoop(block, board, saber, args.md49_rate, args.saber_rate)
+    print(f"READY md49={int(board is not None)} saber={int(saber is not None)}", flush=True)
+
+    # Everything created so far lives for the whole run; keep the cyclic
+    # garbage collector from scanning it on the control path
+    gc.freeze()
+    try:
+        loop.run(parent_pid)
+    finally:
+        loop.stop_motors()
+        logger.info("Motor process stopped")
+        loop.control = None
+        block.release()
+        shm.close()
+    return 0
+
+
+class MotorProcess:
+    """
+    Starts and talks to the motor control process from the main process.
+
+    `control` is a drop-in replacement for the main process's ControlState:
+    the input handler writes it as before and the motor process reads it.
+    """
+
+    def __init__(self, md49_port, saber_port, saber_baud=9600, md49_rate_hz=20.0,
+                 saber_rate_hz=20.0, cpu=None, priority=0, md49_acceleration=5):
+        """
+        :param md49_port: Serial port of the MD49 (None to run without it)
+        :param saber_port: Serial port of the Sabertooth (None to run without it)
+        :param saber_baud: Sabertooth baud rate
+        :param md49_rate_hz: MD49 control cycles per second
+        :param saber_rate_hz: Sabertooth control cycles per second
+        :param cpu: Core to pin the process to (None for any)
+        :param priority: SCHED_FIFO priority, 0 for normal scheduling
+        :param md49_acceleration: The MD49's own acceleration setting (1-10)
+        """
+        self.shm = shared_memory.SharedMemory(create=True, size=MotorBlock.size())
+        self.block = MotorBlock(self.shm.buf)
+        self.control = SharedControlState(self.block.control)
+        self.args = ['--shm', self.shm.name, '--saber-baud', str(saber_baud),
+                     '--md49-rate', str(md49_rate_hz), '--saber-rate', str(saber_rate_hz),
+                     '--priority', str(priority), '--md49-acceleration', str(md49_acceleration)]
+        if md49_port:
+            self.args += ['--md49-port', md49_port]
+        if saber_port:
+            self.args += ['--saber-port', saber_port]
+        if cpu is not None:
+            self.args += ['--cpu', str(cpu)]
+        self.process = None
+        self.md49_ok = False
+        self.saber_ok = False
+        self._bank = None
+        atexit.register(self.close)
+
+    def set_tuning(self, mixer, kp, ki, max_correction, saber_scale, power_poll_interval,
+                   failsafe_deadline, motion_profile, accel, decel, jerk, counts_per_rev,
+                   wheel_diameter, track_width):
+        """
+        Hand new tuning to the motor process. The drive table is copied into
+        the bank not in use before the process is told to switch to it.
+
+        :param mixer: DriveMixer holding the table to use
+        :param failsafe_deadline: Seconds without a heartbeat before the process stops the motors
+        :param motion_profile: Whether to ramp the speeds through a MotionProfile
+        :param accel: MotionProfile limits (see MotionProfile)
+        :param counts_per_rev: Odometry wheel geometry (see Odometry)
+        """
+        bank = 0 if self._bank is None else 1 - self._bank
+        self.block.tables.store(bank, mixer)
+        self.block.tuning.write(bank, kp, ki, max_correction, saber_scale, power_poll_interval,
+                                failsafe_deadline, motion_profile, accel, decel, jerk,
+                                counts_per_rev, wheel_diameter, track_width)
+        self._bank = bank
+
+    def heartbeat(self):
+        """Vouch for the gamepad and this process; call more often than failsafe_deadline."""
+        self.block.heartbeat.write(time.monotonic())
+
+    async def start(self):
+        """
+        Start the process and wait until it has opened its devices.
+        set_tuning() must have been called first.
+        """
+        if self._bank is None:
+            raise RuntimeError("MotorProcess.set_tuning() must be called before start()")
+        self.process = subprocess.Popen([sys.executable, '-m', 'lib.motor_process', *self.args],
+                                        cwd=PROJECT_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        threading.Thread(target=self._forward_log, name='motor-log', daemon=True).start()
+        line = await asyncio.get_running_loop().run_in_executor(None, self.process.stdout.readline)
+        if not line.startswith(b'READY'):
+            raise RuntimeError(f"Motor process exited during startup (code {self.process.wait()})")
+        ready = dict(item.split('=') for item in line.decode().split()[1:])
+        self.md49_ok = ready.get('md49') == '1'
+        self.saber_ok = ready.get('saber') == '1'
+        logger.info(f"Motor process {self.process.pid} running (md49={self.md49_ok}, saber={self.saber_ok})")
+
+    def _forward_log(self):
+        """
+        Thread: pass the process's log records on to this process's log until
+        it exits. Each keeps the file and line it was logged from, so the
+        repeat filter limits the process's messages one by one rather than
+        as if they all came from here.
+        """
+        for line in self.process.stderr:
+            text = line.decode(errors='replace').rstrip('\n')
+            fields = text.split('\t', 3)
+            if len(fields) == 4 and isinstance(logging.getLevelName(fields[0]), int) and fields[2].isdigit():
+                levelname, pathname, lineno, message = fields
+            else:
+                # Not from the logging module (e.g. the interpreter dying)
+                levelname, pathname, lineno, message = 'ERROR', __file__, '0', text
+            level = logging.getLevelName(levelname)
+            if not logger.isEnabledFor(level):
+                continue
+            logger.handle(logging.makeLogRecord({
+                'name': logger.name, 'levelno': level, 'levelname': levelname,
+                'pathname': pathname, 'filename': os.path.basename(pathname),
+                'module': os.path.splitext(os.path.basename(pathname))[0], 'lineno': int(lineno),
+                'msg': "[motor] " + message.replace(LOG_LINE_BREAK, '\n'),
+            }))
+        code = self.process.wait()
+        if code:
+            logger.error(f"Motor process exited with code {code}")
+        else:
+            logger.info("Motor process exited")
+
+    def status(self):
+        """Latest MotorStatus written by the process."""
+        return self.block.status.read()
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def close(self):
+        """Stop the process (it stops the motors first) and free the shared memory."""
+        if self.running:
+            self.process.terminate()
+            try:
+                # Blocking on purpose: this runs at exit, and the process
+                # must be done with the shared memory before it is removed
+                self.process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.shm is not None:
+            self.control = None
+            self.block.release()
+            self.block = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
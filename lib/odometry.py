@@ -0,0 +1,116 @@
+"""Dead-reckoning pose and wheel velocities of the differential drive from MD49 encoder counts."""
+
+import math
+from array import array
+
+from lib.MD49 import encoder_delta
+
+
+class Odometry:
+    """
+    Integrates the two wheel encoders into a pose (x, y, heading) and
+    estimates the wheel velocities, one encoder reading per control cycle.
+
+    The pose starts at (0, 0) facing along +x; heading is in radians,
+    counter-clockwise positive, kept within -pi..pi. Each cycle moves the
+    droid by the mean of the two wheel distances along the heading half
+    way through the turn, which is exact for a constant-curvature arc.
+
+    Velocities are the distance each wheel covered over the last `window`
+    readings divided by the time they span, so a single late cycle or a
+    one-count jitter does not show up as a speed spike. The readings are
+    kept in fixed arrays allocated here; update() only overwrites them.
+    """
+
+    def __init__(self, counts_per_rev=980, wheel_diameter=0.125, track_width=0.40, window=5):
+        """
+        :param counts_per_rev: Encoder counts per turn of the wheel
+        :param wheel_diameter: Wheel diameter in metres
+        :param track_width: Distance between the wheel contact points in metres
+        :param window: Readings the velocity estimate spans (at least 2)
+        """
+        self.window = max(2, window)
+        self._times = array('d', bytes(8 * self.window))
+        self._left = array('d', bytes(8 * self.window))   # total distance of each wheel
+        self._right = array('d', bytes(8 * self.window))  # at each reading, metres
+        self._head = 0
+        self._count = 0
+        self._encoder1 = 0
+        self._encoder2 = 0
+        self._has_reading = False
+        self.configure(counts_per_rev, wheel_diameter, track_width)
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self.distance_left = 0.0
+        self.distance_right = 0.0
+        self.velocity_left = 0.0   # metres per second
+        self.velocity_right = 0.0
+        self.linear_velocity = 0.0
+        self.angular_velocity = 0.0  # radians per second
+        self.updates = 0
+
+    def configure(self, counts_per_rev, wheel_diameter, track_width):
+        """Change the wheel geometry; the pose so far is kept."""
+        self.counts_per_rev = counts_per_rev
+        self.wheel_diameter = wheel_diameter
+        self.track_width = track_width
+        self.metres_per_count = math.pi * wheel_diameter / counts_per_rev
+
+    def reset(self, x=0.0, y=0.0, heading=0.0):
+        """Set the pose, e.g. to make the droid's current position the origin."""
+        self.x, self.y, self.heading = x, y, heading
+
+    def restart(self):
+        """
+        Forget the last encoder reading and the velocity history, keeping the
+        pose. Call it when the encoders were reset (the MD49 reconnected).
+        """
+        self._has_reading = False
+        self._count = 0
+        self.velocity_left = self.velocity_right = 0.0
+        self.linear_velocity = self.angular_velocity = 0.0
+
+    @property
+    def pose(self):
+        """(x, y, heading)"""
+        return self.x, self.y, self.heading
+
+    def update(self, encoder1, encoder2, now):
+        """
+        Take one encoder reading.
+
+        :param encoder1: Signed 32-bit count of motor 1 (left wheel)
+        :param encoder2: Signed 32-bit count of motor 2 (right wheel)
+        :param now: time.monotonic() of the reading
+        """
+        if self._has_reading:
+            left = encoder_delta(encoder1, self._encoder1) * self.metres_per_count
+            right = encoder_delta(encoder2, self._encoder2) * self.metres_per_count
+            self.distance_left += left
+            self.distance_right += right
+            distance = 0.5 * (left + right)
+            turn = (right - left) / self.track_width
+            direction = self.heading + 0.5 * turn
+            self.x += distance * math.cos(direction)
+            self.y += distance * math.sin(direction)
+            self.heading = math.remainder(self.heading + turn, math.tau)
+        self._encoder1 = encoder1
+        self._encoder2 = encoder2
+        self._has_reading = True
+        self.updates += 1
+
+        head = self._head
+        self._times[head] = now
+        self._left[head] = self.distance_left
+        self._right[head] = self.distance_right
+        self._head = (head + 1) % self.window
+        if self._count < self.window:
+            self._count += 1
+        oldest = (head + 1 - self._count) % self.window
+        span = now - self._times[oldest]
+        if span > 0.0:
+            self.velocity_left = (self.distance_left - self._left[oldest]) / span
+            self.velocity_right = (self.distance_right - self._right[oldest]) / span
+            self.linear_velocity = 0.5 * (self.velocity_left + self.velocity_right)
+            self.angular_velocity = (self.velocity_right - self.velocity_left) / self.track_width
@@ -0,0 +1,266 @@
+"""Non-blocking I/O for all serial ports on the asyncio event loop, with per-port statistics."""
+
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 4096  # bytes read per readiness event
+DEFAULT_HIGH_WATER = 4096  # queued bytes at which drain() starts waiting
+DEFAULT_LOW_WATER = 1024  # queued bytes at which waiting writers resume
+
+
+class PortStats:
+    """Throughput and backpressure counters for one port."""
+
+    __slots__ = ('bytes_in', 'bytes_out', 'reads', 'writes', 'queued', 'max_queued',
+                 'would_block', 'drain_waits', 'errors')
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.reads = 0         # readiness events that returned data
+        self.writes = 0        # write() calls
+        self.queued = 0        # bytes waiting for the UART right now
+        self.max_queued = 0
+        self.would_block = 0   # writes the tty could not take in full
+        self.drain_waits = 0   # drain() calls that had to wait
+        self.errors = 0
+
+    def summary(self):
+        return (f"in={self.bytes_in}B out={self.bytes_out}B queued={self.queued}B "
+                f"max_queued={self.max_queued}B would_block={self.would_block} "
+                f"drain_waits={self.drain_waits} errors={self.errors}")
+
+
+class SerialPort:
+    """
+    One serial port driven by the event loop.
+
+    Incoming bytes are either handed to a receiver callback as they arrive
+    (for framed protocols with their own parser) or buffered for
+    read_exactly() (for request/reply devices). write() never blocks: what
+    the tty cannot take now is queued and written when the port is ready.
+
+    write(), flush() and close() match pyserial's, so drivers written for a
+    serial.Serial (e.g. pysabertooth) can write through it unchanged.
+
+    A port that hangs up (its USB adapter unplugged) or fails with an I/O
+    error is taken off the event loop at once, so a dead tty cannot keep
+    epoll spinning. From then on is_open is False, reads and writes raise
+    IOError and on_lost is called once; the owner reopens the device.
+    """
+
+    def __init__(self, name, ser, receiver=None, high_water=DEFAULT_HIGH_WATER,
+                 low_water=DEFAULT_LOW_WATER, on_lost=None):
+        """
+        :param name: Name used in logs and statistics
+        :param ser: Open serial.Serial (it keeps the tty settings; I/O goes around it)
+        :param receiver: Callable taking each chunk of received bytes, or None to buffer them
+        :param high_water: Queued bytes at which drain() waits
+        :param low_water: Queued bytes at which drain() returns again
+        :param on_lost: Callable taking the port, called when it hangs up or fails
+        """
+        self.name = name
+        self.ser = ser
+        self.fd = ser.fileno()
+        self.receiver = receiver
+        self.on_lost = on_lost
+        self.high_water = high_water
+        self.low_water = low_water
+        self.stats = PortStats()
+        self.is_open = True
+        self._loop = asyncio.get_running_loop()
+        self._tx = bytearray()
+        self._rx = bytearray()
+        self._rx_waiter = None
+        self._rx_wanted = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+        os.set_blocking(self.fd, False)
+        self._loop.add_reader(self.fd, self._on_readable)
+
+    # -------------------- Receiving --------------------
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(e)
+            return
+        if not data:
+            # Readable with nothing to read: the other end hung up
+            self._fail("hung up")
+            return
+        self.stats.bytes_in += len(data)
+        self.stats.reads += 1
+        if self.receiver:
+            try:
+                self.receiver(data)
+            except Exception:
+                logger.exception(f"{self.name}: receiver failed")
+            return
+        self._rx += data
+        waiter = self._rx_waiter
+        if waiter and not waiter.done() and len(self._rx) >= self._rx_wanted:
+            waiter.set_result(None)
+
+    def _fail(self, error):
+        """The port is dead: stop watching it and tell whoever is waiting on it."""
+        self.stats.errors += 1
+        if not self.is_open:
+            return
+        logger.error(f"{self.name}: serial I/O failed: {error}")
+        self.is_open = False
+        self._detach()
+        self._tx.clear()
+        self._update_queued()
+        waiter = self._rx_waiter
+        if waiter and not waiter.done():
+            waiter.set_exception(IOError(f"{self.name}: {error}"))
+        if self.on_lost:
+            try:
+                self.on_lost(self)
+            except Exception:
+                logger.exception(f"{self.name}: on_lost failed")
+
+    def _detach(self):
+        try:
+            self._loop.remove_reader(self.fd)
+            self._loop.remove_writer(self.fd)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    def reset_input(self):
+        """Throw away buffered input, e.g. what is left of a reply that timed out."""
+        self._rx.clear()
+
+    async def read_exactly(self, count, timeout):
+        """
+        Wait for count bytes of buffered input.
+
+        :param count: Bytes wanted
+        :param timeout: Seconds to wait
+        :return: The bytes
+        :raises IOError: If they do not all arrive in time, or the port is dead
+        """
+        if len(self._rx) < count and not self.is_open:
+            raise IOError(f"{self.name}: port is closed")
+        if len(self._rx) < count:
+            self._rx_wanted = count
+            self._rx_waiter = self._loop.create_future()
+            try:
+                await asyncio.wait_for(self._rx_waiter, timeout)
+            except asyncio.TimeoutError:
+                self.stats.errors += 1
+                raise IOError(f"{self.name}: timed out waiting for {count} bytes "
+                              f"(got {len(self._rx)})")
+            finally:
+                self._rx_waiter = None
+        data = bytes(self._rx[:count])
+        del self._rx[:count]
+        return data
+
+    # -------------------- Sending --------------------
+    def write(self, data):
+        """Queue bytes for the port and write as much as it will take right now."""
+        self.stats.writes += 1
+        if not self.is_open:
+            raise IOError(f"{self.name}: port is closed")
+        if self._tx:
+            self._tx += data
+        else:
+            try:
+                written = self._write_some(data)
+            except OSError as e:
+                self._fail(e)
+                raise IOError(f"{self.name}: {e}")
+            if written < len(data):
+                self.stats.would_block += 1
+                self._tx += data[written:]
+                self._loop.add_writer(self.fd, self._on_writable)
+        self._update_queued()
+        return len(data)
+
+    def _write_some(self, data):
+        try:
+            written = os.write(self.fd, data)
+        except BlockingIOError:
+            return 0
+        self.stats.bytes_out += written
+        return written
+
+    def _on_writable(self):
+        try:
+            written = self._write_some(self._tx)
+        except OSError as e:
+            self._fail(e)
+            return
+        del self._tx[:written]
+        if not self._tx:
+            self._loop.remove_writer(self.fd)
+        self._update_queued()
+
+    def _update_queued(self):
+        queued = len(self._tx)
+        self.stats.queued = queued
+        if queued > self.stats.max_queued:
+            self.stats.max_queued = queued
+        if queued >= self.high_water:
+            self._drained.clear()
+        elif queued <= self.low_water:
+            self._drained.set()
+
+    async def drain(self):
+        """Wait while more than high_water bytes are queued (backpressure for bulk writers)."""
+        if not self._drained.is_set():
+            self.stats.drain_waits += 1
+            await self._drained.wait()
+
+    def flush(self):
+        """pyserial compatibility: writes are already on their way, nothing to wait for."""
+
+    def close(self):
+        """Stop watching the port and close the tty (also after it was lost)."""
+        if self.is_open:
+            self.is_open = False
+            self._detach()
+        self.ser.close()
+
+
+class SerialReactor:
+    """
+    Owns every serial port of the droid on the event loop's selector.
+
+    On Linux the asyncio loop waits with epoll, so each port's tty file
+    descriptor is watched by the same epoll call as everything else and
+    no port needs a thread or an executor.
+    """
+
+    def __init__(self):
+        self.ports = {}
+
+    def open(self, name, ser, receiver=None, on_lost=None, **kwargs):
+        """
+        Take over an open serial.Serial. Must be called on the event loop.
+
+        :param name: Port name, e.g. 'md49'
+        :param ser: Open serial.Serial
+        :param receiver: See SerialPort
+        :param on_lost: See SerialPort
+        :return: The SerialPort
+        """
+        port = SerialPort(name, ser, receiver, on_lost=on_lost, **kwargs)
+        self.ports[name] = port
+        logger.info(f"Serial port {name} ({ser.port}) on the reactor")
+        return port
+
+    def summary(self):
+        """One line per port, for the log."""
+        return [f"{name}: {port.stats.summary()}" for name, port in self.ports.items()]
+
+    def close(self):
+        for port in self.ports.values():
+            port.close()
@@ -0,0 +1,160 @@
+"""Seqlock records in a shared memory block, for passing control state between processes."""
+
+import os
+import struct
+from collections import namedtuple
+
+from lib.control_state import ControlSnapshot, ControlState
+
+SEQ = struct.Struct('<I')
+TABLE_SIZE = 256 * 256
+READ_SPINS = 50  # attempts at a consistent copy before yielding the CPU
+READ_YIELDS = 3  # times to yield before giving up on the writer
+
+
+class SharedRecord:
+    """
+    A fixed layout record in a shared buffer, guarded by a sequence number.
+
+    Works like ControlState across a process boundary: the one writer
+    makes the sequence odd, packs the values and makes it even again; a
+    reader unpacks the values between two reads of the same even sequence
+    and retries otherwise. Neither side ever waits for the other.
+
+    A reader never waits for long either. If the writer is stopped in the
+    middle of a write (preempted by a real-time reader on the same core,
+    or killed), the reader gives up after READ_SPINS attempts and
+    READ_YIELDS yields, returns the last consistent copy it read and sets
+    stale, so it can treat the writer as gone.
+    """
+
+    def __init__(self, buf, offset, name, fields):
+        """
+        :param buf: Shared buffer (e.g. SharedMemory.buf)
+        :param offset: Where the record starts in buf
+        :param name: Name of the namedtuple read() returns
+        :param fields: List of (field name, struct code) pairs
+        """
+        self.buf = buf
+        self.offset = offset
+        self.tuple = namedtuple(name, [field for field, _ in fields])
+        self.struct = struct.Struct('<' + ''.join(code for _, code in fields))
+        self._seq = SEQ.unpack_from(buf, offset)[0]
+        self._last = (None, self.tuple(*self.struct.unpack_from(buf, offset + SEQ.size)))
+        self.stale = False  # the last read returned an old copy
+
+    @classmethod
+    def size(cls, fields):
+        return SEQ.size + struct.calcsize('<' + ''.join(code for _, code in fields))
+
+    def write(self, *values):
+        """Publish a new set of values (single writer only)."""
+        self._seq += 1
+        SEQ.pack_into(self.buf, self.offset, self._seq)
+        self.struct.pack_into(self.buf, self.offset + SEQ.size, *values)
+        self._seq += 1
+        SEQ.pack_into(self.buf, self.offset, self._seq)
+
+    def read_versioned(self):
+        """
+        Returns (sequence, values) from one consistent copy of the record, or
+        the last consistent copy with stale set if the writer is stuck.
+        """
+        for attempt in range(READ_SPINS * (READ_YIELDS + 1)):
+            if attempt and attempt % READ_SPINS == 0:
+                os.sched_yield()
+            seq = SEQ.unpack_from(self.buf, self.offset)[0]
+            if seq & 1:
+                continue
+            values = self.struct.unpack_from(self.buf, self.offset + SEQ.size)
+            if SEQ.unpack_from(self.buf, self.offset)[0] == seq:
+                self._last = (seq, self.tuple(*values))
+                self.stale = False
+                return self._last
+        self.stale = True
+        return self._last
+
+    def read(self):
+        return self.read_versioned()[1]
+
+
+CONTROL_FIELDS = [('forward', 'd'), ('turn', 'd'), ('head', 'd'),
+                  ('forward_raw', 'B'), ('turn_raw', 'B')]
+
+
+class SharedControlState(ControlState):
+    """
+    ControlState whose completed writes are also published to a SharedRecord.
+
+    The input process writes it exactly like a ControlState; another
+    process attached to the same record reads it with snapshot(). Only the
+    outermost write of a nested group publishes, so a gamepad frame still
+    reaches the reader as one version.
+    """
+
+    __slots__ = ('_record',)
+
+    def __init__(self, record, publish=True):
+        """
+        :param record: SharedRecord laid out with CONTROL_FIELDS
+        :param publish: Write the initial (neutral) state; False when attaching as a reader
+        """
+        super().__init__()
+        self._record = record
+        if publish:
+            self._publish()
+
+    def _publish(self):
+        self._record.write(self.forward, self.turn, self.head, self.forward_raw, self.turn_raw)
+
+    def end_write(self):
+        super().end_write()
+        if self._depth == 0:
+            self._publish()
+
+    @property
+    def stale(self):
+        """True if the last snapshot() is an old copy because the writer was stuck mid-write."""
+        return self._record.stale
+
+    def snapshot(self):
+        """Returns a consistent ControlSnapshot of the shared record."""
+        seq, values = self._record.read_versioned()
+        return ControlSnapshot(seq, *values)
+
+
+class SharedDriveTable:
+    """
+    Two banks of drive lookup tables in a shared buffer.
+
+    The writer fills the bank not in use and then switches banks, so the
+    reader always looks up a complete table.
+    """
+
+    def __init__(self, buf, offset):
+        self.banks = [(buf[start:start + TABLE_SIZE], buf[start + TABLE_SIZE:start + 2 * TABLE_SIZE])
+                      for start in (offset, offset + 2 * TABLE_SIZE)]
+
+    @staticmethod
+    def size():
+        return 4 * TABLE_SIZE
+
+    def store(self, bank, mixer):
+        """Copy a DriveMixer's tables into a bank."""
+        left, right = self.banks[bank]
+        left[:] = mixer.left
+        right[:] = mixer.right
+
+    def mix(self, bank, forward_raw, turn_raw):
+        """Returns (left, right) MD49 speeds from a bank, like DriveMixer.mix."""
+        left, right = self.banks[bank]
+        i = (forward_raw << 8) | turn_raw
+        return left[i], right[i]
+
+    def release(self):
+        """Drop the views so the shared memory can be closed."""
+        for left, right in self.banks:
+            left.release()
+            right.release()
+        self.banks = []
+
@@ -0,0 +1,135 @@
+"""Decoded sound effect cache that plays on a pool of pygame mixer channels."""
+
+import json
+import logging
+import mmap
+import os
+from collections import OrderedDict
+
+import pygame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of decoded PCM to keep
+DEFAULT_NUM_CHANNELS = 8
+
+
+class SoundBank:
+    """Keeps decoded pygame.mixer.Sound buffers in memory and plays them on a channel pool.
+
+    Clips are decoded once (at startup with preload(), or on first use)
+    and kept in least-recently-used order. When the decoded size goes
+    over the memory budget the oldest clips are dropped. Playing a clip
+    picks a free mixer channel, so several effects can overlap; when all
+    channels are busy the one that has been playing longest is reused.
+
+    pygame.mixer must be initialized before a SoundBank is created.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, num_channels=DEFAULT_NUM_CHANNELS):
+        """
+        :param memory_budget: Maximum bytes of decoded audio to cache
+        :param num_channels: Number of mixer channels to play on
+        """
+        self.memory_budget = memory_budget
+        pygame.mixer.set_num_channels(num_channels)
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._packed = {}
+        self._pack_maps = []
+
+    def _decoded_size(self, sound):
+        """Returns the size in bytes of a decoded Sound."""
+        frequency, size, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * (abs(size) // 8)
+
+    def add(self, path, sound):
+        """Caches an already decoded sound under the given path."""
+        if path in self._cache:
+            self.cache_bytes -= self._cache.pop(path)[1]
+        size = self._decoded_size(sound)
+        self._cache[path] = (sound, size)
+        self.cache_bytes += size
+        # Never evict the clip that was just added.
+        while self.cache_bytes > self.memory_budget and len(self._cache) > 1:
+            evicted, (_, evicted_size) = self._cache.popitem(last=False)
+            self.cache_bytes -= evicted_size
+            logger.info(f"Sound bank evicted {evicted}")
+        return sound
+
+    def get(self, path):
+        """Returns the decoded Sound for a file, decoding it if it is not cached.
+
+        :param path: Path to the audio file
+        :return: pygame.mixer.Sound
+        """
+        entry = self._cache.get(path)
+        if entry is not None:
+            self.hits += 1
+            self._cache.move_to_end(path)
+            return entry[0]
+        self.misses += 1
+        packed = self._packed.get(path)
+        if packed is not None:
+            # Raw PCM straight from the memory-mapped pack, no decoding.
+            return self.add(path, pygame.mixer.Sound(buffer=packed))
+        return self.add(path, pygame.mixer.Sound(path))
+
+    def load_pack(self, manifest_path, audio_root):
+        """Maps the PCM packs written by tools/pack_audio.py.
+
+        Clips in the packs are registered under audio_root/<category>/<name>,
+        so the same paths used to decode MP3 files are served from the packs
+        instead. Sounds are built from slices of the mapping on first use;
+        pygame copies the PCM into its own chunk, but nothing is decoded.
+
+        :param manifest_path: Path to the pack manifest.json
+        :param audio_root: Directory the original audio-files tree lives in
+        :return: Number of clips registered (0 if the packs do not match the mixer)
+        """
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        mixer_format = pygame.mixer.get_init()
+        pack_format = (manifest['frequency'], manifest['size'], manifest['channels'])
+        if tuple(mixer_format) != pack_format:
+            logger.warning(f"Ignoring audio packs: format {pack_format} does not match mixer {mixer_format}")
+            return 0
+
+        pack_dir = os.path.dirname(manifest_path)
+        views = {}
+        for relpath, clip in manifest['clips'].items():
+            pack = clip['pack']
+            if pack not in views:
+                with open(os.path.join(pack_dir, pack), 'rb') as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._pack_maps.append(mapping)
+                views[pack] = memoryview(mapping)
+            start = clip['offset']
+            self._packed[os.path.join(audio_root, relpath)] = views[pack][start:start + clip['length']]
+        logger.info(f"Mapped {len(manifest['clips'])} packed clips from {pack_dir}")
+        return len(manifest['clips'])
+
+    def preload(self, paths):
+        """Decodes a list of files into the cache ahead of time.
+
+        Files that fail to load are logged and skipped.
+        """
+        for path in paths:
+            try:
+                self.get(path)
+            except Exception as e:
+                logger.error(f"Failed to preload sound {path}: {e}")
+        logger.info(f"Sound bank holds {len(self._cache)} clips, {self.cache_bytes // 1024} KiB")
+
+    def play(self, path):
+        """Starts playing a clip on a free mixer channel.
+
+        :param path: Path to the audio file
+        :return: pygame.mixer.Channel the clip is playing on
+        """
+        sound = self.get(path)
+        channel = pygame.mixer.find_channel(True)
+        channel.play(sound)
+        return channel
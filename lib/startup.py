@@ -0,0 +1,130 @@
+"""Concurrent device bring-up with per-device timeouts and a startup timing report."""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_since_boot():
+    """Seconds since the kernel booted (Linux), or None where /proc/uptime is missing."""
+    try:
+        with open('/proc/uptime') as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupPhase:
+    """Timing and outcome of one bring-up step. Times are seconds since the start."""
+
+    def __init__(self, name, started):
+        self.name = name
+        self.started = started
+        self.finished = None
+        self.ok = False
+        self.error = None
+
+    @property
+    def duration(self):
+        return None if self.finished is None else self.finished - self.started
+
+    def summary(self):
+        if self.finished is None:
+            return f"{self.name}: running since {self.started:.2f}s"
+        outcome = "ok" if self.ok else f"FAILED ({self.error})"
+        return (f"{self.name}: {self.started:.2f}s -> {self.finished:.2f}s "
+                f"({self.duration:.2f}s) {outcome}")
+
+
+class Startup:
+    """
+    Runs bring-up steps concurrently and records when each one finished.
+
+    Each step is a coroutine started with run(), or a blocking function
+    started with run_blocking() (it runs on the default thread pool, so
+    serial port opens and I2C init sleeps overlap). A step that raises or
+    runs past its timeout is logged and yields None, so one missing device
+    never holds up the others. Milestones such as "drivable" are recorded
+    with mark().
+    """
+
+    def __init__(self, started_at=None, clock=time.monotonic):
+        """
+        :param started_at: clock() value to measure from (e.g. taken when the
+                           process started), defaults to now
+        :param clock: Monotonic clock returning seconds
+        """
+        self.clock = clock
+        self.started_at = clock() if started_at is None else started_at
+        self.phases = {}
+        self.milestones = {}
+        self._tasks = {}
+
+    def elapsed(self):
+        return self.clock() - self.started_at
+
+    def run(self, name, coro, timeout=None):
+        """
+        Start a bring-up coroutine as its own task.
+
+        :param name: Phase name for the timing report
+        :param coro: Coroutine doing the work; its result is the task's result
+        :param timeout: Seconds before the step is given up on (None to wait forever)
+        :return: Task resolving to the coroutine's result, or None if it failed
+        """
+        phase = StartupPhase(name, self.elapsed())
+        self.phases[name] = phase
+        task = asyncio.create_task(self._run(phase, coro, timeout))
+        self._tasks[name] = task
+        return task
+
+    def run_blocking(self, name, fn, timeout=None):
+        """
+        Start a blocking bring-up function on a worker thread.
+
+        A thread cannot be cancelled: after a timeout the function keeps
+        running in the background and its result is discarded.
+        """
+        loop = asyncio.get_running_loop()
+        return self.run(name, loop.run_in_executor(None, fn), timeout)
+
+    async def _run(self, phase, coro, timeout):
+        try:
+            result = await asyncio.wait_for(coro, timeout)
+            phase.ok = True
+            return result
+        except asyncio.TimeoutError:
+            phase.error = f"timed out after {timeout:.1f}s"
+        except Exception as e:
+            phase.error = str(e) or type(e).__name__
+        finally:
+            phase.finished = self.elapsed()
+            if phase.ok:
+                logger.info(f"Startup {phase.summary()}")
+            else:
+                logger.error(f"Startup {phase.summary()}")
+        return None
+
+    async def wait(self, *names):
+        """Waits for the named phases and returns their results in order."""
+        return await asyncio.gather(*(self._tasks[name] for name in names))
+
+    async def wait_all(self):
+        """Waits until every phase started so far has finished."""
+        await asyncio.gather(*self._tasks.values())
+
+    def mark(self, name):
+        """Records a milestone (e.g. "drivable") at the current time, once."""
+        if name not in self.milestones:
+            self.milestones[name] = self.elapsed()
+            logger.info(f"Startup milestone {name} at {self.milestones[name]:.2f}s")
+
+    def summary(self):
+        """Returns the timing breakdown as log lines, slowest phase first."""
+        phases = sorted(self.phases.values(),
+                        key=lambda p: -(p.duration if p.duration is not None else float('inf')))
+        lines = [phase.summary() for phase in phases]
+        lines += [f"{name} at {at:.2f}s" for name, at in sorted(self.milestones.items(), key=lambda m: m[1])]
+        return lines
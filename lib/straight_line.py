@@ -0,0 +1,112 @@
+"""Closed-loop straight-line correction for the differential drive using MD49 encoder counts."""
+
+from lib.MD49 import encoder_delta
+
+NEUTRAL_SPEED = 128
+MAX_OFFSET = 127  # furthest a mode 0 speed byte can be from neutral
+
+
+class StraightLineController:
+    """
+    PI controller that keeps both wheels turning at the same rate while the
+    operator is asking to drive straight.
+
+    The error is the normalized difference in wheel travel since the last
+    cycle, (|left| - |right|) / (|left| + |right|), so the gains do not
+    depend on speed. The correction is taken off the faster side and given
+    to the slower one. When that would push a motor past full speed, both
+    sides are scaled back together so the difference is kept; at full
+    forward the droid goes straight at the highest speed it can, rather
+    than having one side clipped.
+
+    Anti-windup: the integral is clamped to max_correction, and it stops
+    growing while the output is saturated in the direction of the error.
+    """
+
+    def __init__(self, kp=30.0, ki=200.0, max_correction=40.0, min_counts=4):
+        """
+        :param kp: Proportional gain, speed units per unit of normalized error
+        :param ki: Integral gain, speed units per unit of error per second
+        :param max_correction: Largest correction applied to each side, in speed units
+        :param min_counts: Combined encoder counts per cycle below which the
+                           error is too noisy to act on (starting or stalled)
+        """
+        self.kp = kp
+        self.ki = ki
+        self.max_correction = max_correction
+        self.min_counts = min_counts
+        self.integral = 0.0
+        self.correction = 0.0
+        self.error = 0.0
+        self.saturated = False
+        self._last_encoders = None
+        self._last_time = None
+
+    def reset(self, encoders=None, now=None):
+        """
+        Forget the accumulated correction, e.g. when the operator turns or stops.
+
+        :param encoders: Latest (encoder1, encoder2) reading to measure the next cycle from
+        :param now: Time of that reading, in seconds
+        """
+        self.integral = 0.0
+        self.correction = 0.0
+        self.error = 0.0
+        self.saturated = False
+        self._last_encoders = encoders
+        self._last_time = now
+
+    def update(self, left, right, encoders, now):
+        """
+        Correct one cycle of straight-line motor commands.
+
+        :param left: Left motor speed from the mixer (0-255, 128 stop)
+        :param right: Right motor speed from the mixer
+        :param encoders: Latest (encoder1, encoder2) reading
+        :param now: Time of the reading, in seconds
+        :return: Corrected (left, right) speeds
+        """
+        last_encoders, last_time = self._last_encoders, self._last_time
+        self._last_encoders, self._last_time = encoders, now
+        if last_encoders is not None and now > last_time:
+            self._step(encoder_delta(encoders[0], last_encoders[0]),
+                       encoder_delta(encoders[1], last_encoders[1]),
+                       now - last_time)
+        return self._apply(left, right)
+
+    def _step(self, left_counts, right_counts, dt):
+        total = abs(left_counts) + abs(right_counts)
+        if total < self.min_counts:
+            return  # Not moving enough to measure; hold the current correction
+        self.error = (abs(left_counts) - abs(right_counts)) / total
+
+        integral = self.integral + self.ki * self.error * dt
+        integral = max(-self.max_correction, min(self.max_correction, integral))
+        output = self.kp * self.error + integral
+        self.saturated = abs(output) > self.max_correction
+        # Conditional integration: only let the integral grow while it can
+        # still change the output, or when it is unwinding.
+        if not self.saturated or abs(integral) < abs(self.integral):
+            self.integral = integral
+        output = self.kp * self.error + self.integral
+        self.correction = max(-self.max_correction, min(self.max_correction, output))
+
+    def _apply(self, left, right):
+        left_offset = left - NEUTRAL_SPEED
+        right_offset = right - NEUTRAL_SPEED
+        direction = 1 if left_offset + right_offset >= 0 else -1
+
+        # Positive correction means the left wheel is running ahead
+        left_mag = direction * left_offset - self.correction
+        right_mag = direction * right_offset + self.correction
+
+        # Keep the difference when one side would go past full speed
+        excess = max(left_mag, right_mag) - MAX_OFFSET
+        if excess > 0:
+            left_mag -= excess
+            right_mag -= excess
+        left_mag = max(0.0, min(MAX_OFFSET, left_mag))
+        right_mag = max(0.0, min(MAX_OFFSET, right_mag))
+
+        return (NEUTRAL_SPEED + direction * int(round(left_mag)),
+                NEUTRAL_SPEED + direction * int(round(right_mag)))
@@ -0,0 +1,157 @@
+"""Heartbeat watchdog for input sources and control loops, with reconnect backoff."""
+
+import asyncio
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff:
+    """Exponentially growing delays between reconnect attempts."""
+
+    def __init__(self, initial=0.5, maximum=10.0, factor=2.0):
+        """
+        :param initial: Seconds to wait after the first failed attempt
+        :param maximum: Longest wait between attempts
+        :param factor: How much longer each wait is than the one before
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = 0
+
+    def next_delay(self):
+        """Counts a failed attempt and returns how long to wait before the next one."""
+        delay = min(self.maximum, self.initial * self.factor ** self.attempts)
+        self.attempts += 1
+        return delay
+
+    def reset(self):
+        self.attempts = 0
+
+
+async def reconnect(name, connect, backoff):
+    """
+    Call connect() until it succeeds, backing off between failed attempts.
+
+    :param name: Device name for the log
+    :param connect: Coroutine function that opens the device and returns it, or raises
+    :param backoff: Backoff giving the delays
+    :return: Whatever connect() returned
+    """
+    while True:
+        try:
+            device = await connect()
+        except Exception as e:
+            delay = backoff.next_delay()
+            logger.warning(f"{name} reconnect attempt {backoff.attempts} failed ({e}), "
+                           f"retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        logger.info(f"{name} reconnected after {backoff.attempts + 1} attempt(s)")
+        backoff.reset()
+        return device
+
+
+class Heartbeat:
+    """Time of the last sign of life from one input source or control loop."""
+
+    __slots__ = ('name', 'deadline', 'last', 'expired', 'trips', 'on_expire', 'on_recover')
+
+    def __init__(self, name, deadline, last, on_expire, on_recover):
+        self.name = name
+        self.deadline = deadline
+        self.last = last
+        self.expired = False
+        self.trips = 0  # times the deadline was missed
+        self.on_expire = on_expire
+        self.on_recover = on_recover
+
+    def beat(self, now=None):
+        """Record a sign of life."""
+        self.last = time.monotonic() if now is None else now
+
+
+class Supervisor:
+    """
+    Watches heartbeats and acts when one stops.
+
+    Each watched source calls beat() on its Heartbeat whenever it shows it
+    is alive. Every check_interval the supervisor compares each heartbeat
+    with its deadline; the first check past the deadline calls on_expire
+    once, and the first check after beats resume calls on_recover. A
+    missed deadline is therefore acted on within deadline + check_interval
+    of the last beat, no matter what the source itself is stuck on.
+    """
+
+    def __init__(self, check_interval=0.02, clock=time.monotonic):
+        """
+        :param check_interval: Seconds between checks
+        :param clock: Monotonic clock returning seconds (the one beat() uses)
+        """
+        self.check_interval = check_interval
+        self.clock = clock
+        self.heartbeats = {}
+        self._actions = set()
+
+    def watch(self, name, deadline, on_expire, on_recover=None):
+        """
+        Start watching a source. It counts as alive from now.
+
+        :param name: Name for the log
+        :param deadline: Seconds without a beat before on_expire is called
+        :param on_expire: Function or coroutine function taking the Heartbeat
+        :param on_recover: Same, called when beats resume (optional)
+        :return: The Heartbeat to beat
+        """
+        heartbeat = Heartbeat(name, deadline, self.clock(), on_expire, on_recover)
+        self.heartbeats[name] = heartbeat
+        return heartbeat
+
+    def healthy(self, name):
+        """True while the named source is being watched and has not missed its deadline."""
+        heartbeat = self.heartbeats.get(name)
+        return heartbeat is not None and not heartbeat.expired
+
+    def check(self):
+        """Compare every heartbeat with its deadline once."""
+        now = self.clock()
+        for heartbeat in list(self.heartbeats.values()):
+            late = now - heartbeat.last > heartbeat.deadline
+            if late and not heartbeat.expired:
+                heartbeat.expired = True
+                heartbeat.trips += 1
+                logger.warning(f"Heartbeat {heartbeat.name} missed: nothing for "
+                               f"{(now - heartbeat.last) * 1000:.0f} ms")
+                self._call(heartbeat.on_expire, heartbeat)
+            elif not late and heartbeat.expired:
+                heartbeat.expired = False
+                logger.info(f"Heartbeat {heartbeat.name} is back")
+                self._call(heartbeat.on_recover, heartbeat)
+
+    def _call(self, callback, heartbeat):
+        if callback is None:
+            return
+        try:
+            result = callback(heartbeat)
+            if inspect.isawaitable(result):
+                # Keep a reference: the loop only holds tasks weakly
+                task = asyncio.ensure_future(self._await(result, heartbeat))
+                self._actions.add(task)
+                task.add_done_callback(self._actions.discard)
+        except Exception as e:
+            logger.exception(f"Supervisor action for {heartbeat.name} failed: {e}")
+
+    async def _await(self, action, heartbeat):
+        try:
+            await action
+        except Exception as e:
+            logger.exception(f"Supervisor action for {heartbeat.name} failed: {e}")
+
+    async def run(self):
+        """Checks the heartbeats every check_interval until cancelled."""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self.check()
@@ -0,0 +1,170 @@
+"""Fixed-width telemetry recorder: an in-memory ring buffer flushed to rotating binary files."""
+
+import asyncio
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# One record per control cycle: (name, struct code). The layout is written
+# into every file header, so tools/read_telemetry.py can read old runs
+# after fields are added.
+FIELDS = (
+    ('timestamp', 'd'),   # time.time() of the sample
+    ('volts', 'B'),       # battery volts from the MD49
+    ('current1', 'B'),    # left motor current, 10ths of an amp
+    ('current2', 'B'),    # right motor current, 10ths of an amp
+    ('error', 'B'),       # MD49 error byte
+    ('encoder1', 'i'),    # left encoder count
+    ('encoder2', 'i'),    # right encoder count
+    ('speed1', 'B'),      # commanded left speed (128 stop)
+    ('speed2', 'B'),      # commanded right speed
+    ('jitter', 'f'),      # control loop start jitter, seconds
+)
+RECORD = struct.Struct('<' + ''.join(code for _, code in FIELDS))
+
+FILE_MAGIC = b'R2TL'
+FILE_VERSION = 1
+# Header: magic, version, length of the field spec, then the spec itself as
+# "name:code,name:code,..." in little-endian struct codes.
+HEADER = struct.Struct('<4sBH')
+
+
+def file_header():
+    spec = ','.join(f"{name}:{code}" for name, code in FIELDS).encode('ascii')
+    return HEADER.pack(FILE_MAGIC, FILE_VERSION, len(spec)) + spec
+
+
+class TelemetryRecorder:
+    """
+    Collects telemetry samples without touching the disk on the control path.
+
+    record() packs one fixed-width record into a preallocated ring buffer.
+    run() copies out the records since the last flush every flush_interval
+    seconds and appends them to the current file on a background thread.
+    Files rotate at max_file_bytes and only the newest max_files are kept,
+    so a long run cannot fill the SD card. If the disk falls behind by
+    more than the ring holds, the oldest unflushed records are dropped and
+    counted.
+    """
+
+    def __init__(self, directory, capacity=4096, flush_interval=10.0,
+                 max_file_bytes=8 * 1024 * 1024, max_files=10):
+        """
+        :param directory: Folder for telemetry-*.bin files (created if missing)
+        :param capacity: Records held in memory between flushes
+        :param flush_interval: Seconds between writes to disk
+        :param max_file_bytes: Size at which a new file is started
+        :param max_files: How many files to keep; older ones are deleted
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.files_written = 0
+        self._ring = bytearray(capacity * RECORD.size)
+        self._file = None
+        self._file_bytes = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def record(self, timestamp, volts, current1, current2, error,
+               encoder1, encoder2, speed1, speed2, jitter):
+        """Adds one sample to the ring buffer. Cheap enough to call every control cycle."""
+        offset = (self.recorded % self.capacity) * RECORD.size
+        RECORD.pack_into(self._ring, offset, timestamp, volts, current1, current2, error,
+                         encoder1, encoder2, speed1, speed2, jitter)
+        self.recorded += 1
+
+    def take_pending(self):
+        """Returns the records not yet flushed, oldest first, as bytes."""
+        pending = self.recorded - self.flushed
+        if pending > self.capacity:
+            self.dropped += pending - self.capacity
+            self.flushed = self.recorded - self.capacity
+            pending = self.capacity
+        if pending == 0:
+            return b''
+        start = self.flushed % self.capacity
+        end = start + pending
+        if end <= self.capacity:
+            data = bytes(self._ring[start * RECORD.size:end * RECORD.size])
+        else:
+            data = (bytes(self._ring[start * RECORD.size:])
+                    + bytes(self._ring[:(end - self.capacity) * RECORD.size]))
+        self.flushed = self.recorded
+        return data
+
+    def latest(self):
+        """Returns the newest record as a dict, or None if nothing was recorded."""
+        if not self.recorded:
+            return None
+        offset = ((self.recorded - 1) % self.capacity) * RECORD.size
+        values = RECORD.unpack_from(self._ring, offset)
+        return dict(zip((name for name, _ in FIELDS), values))
+
+    def _open_file(self):
+        os.makedirs(self.directory, exist_ok=True)
+        name = time.strftime('telemetry-%Y%m%d-%H%M%S') + f"-{self.files_written:03d}.bin"
+        self._file = open(os.path.join(self.directory, name), 'wb')
+        header = file_header()
+        self._file.write(header)
+        self._file_bytes = len(header)
+        self.files_written += 1
+        self._remove_old_files()
+
+    def _remove_old_files(self):
+        files = sorted(f for f in os.listdir(self.directory)
+                       if f.startswith('telemetry-') and f.endswith('.bin'))
+        for name in files[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logger.warning(f"Could not remove old telemetry file {name}: {e}")
+
+    def _write(self, data):
+        if self._file is None or self._file_bytes + len(data) > self.max_file_bytes:
+            if self._file is not None:
+                self._file.close()
+            self._open_file()
+        self._file.write(data)
+        self._file.flush()
+        self._file_bytes += len(data)
+
+    async def flush(self):
+        """Writes pending records to disk on the recorder's own thread."""
+        data = self.take_pending()
+        if data:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._write, data)
+
+    async def run(self):
+        """Flushes every flush_interval seconds until cancelled."""
+        logger.info(f"Recording telemetry to {self.directory}")
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Telemetry flush failed: {e}")
+        finally:
+            self.close()
+
+    def close(self):
+        """Writes anything left in the ring and closes the file."""
+        data = self.take_pending()
+        try:
+            if data:
+                self._executor.submit(self._write, data).result()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        except Exception as e:
+            logger.error(f"Telemetry close failed: {e}")
@@ -0,0 +1,302 @@
+"""
+Simulated peripherals for running the R2D2 control stack without hardware.
+
+Each device owns a pseudo-terminal: the control code opens `device.port`
+(e.g. /dev/pts/5) with pyserial exactly as it would open the real UART,
+and a background thread plays the part of the hardware on the other end.
+Replies are delayed by the time the bytes would take on the wire at the
+configured baud rate plus a fixed processing latency.
+
+time_scale > 1 makes the simulated hardware run faster than real time:
+wire and reply delays are divided by it and encoder counts advance that
+many times faster.
+"""
+
+import logging
+import os
+import pty
+import random
+import select
+import struct
+import threading
+import time
+import tty
+
+from lib.dome_link import FrameParser, encode_frame, OP_ACK, OP_SYNC
+from lib.lcd_api import LcdApi
+
+logger = logging.getLogger(__name__)
+
+
+class PtyDevice:
+    """Base class for a simulated device on the far end of a pseudo-terminal."""
+
+    def __init__(self, baudrate, reply_latency=0.0, time_scale=1.0):
+        """
+        :param baudrate: Simulated line speed, used for wire timing
+        :param reply_latency: Simulated processing time before a reply, in seconds
+        :param time_scale: How much faster than real time the device runs
+        """
+        self.baudrate = baudrate
+        self.reply_latency = reply_latency
+        self.time_scale = time_scale
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._master, self._slave = pty.openpty()
+        # Keep the line raw so nothing is echoed or translated before the
+        # control code opens the port and configures it.
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._start = time.monotonic()
+        self._running = False
+        self._thread = None
+
+    def sim_time(self):
+        """Seconds of simulated time since the device started."""
+        return (time.monotonic() - self._start) * self.time_scale
+
+    def wire_time(self, count):
+        """Real seconds that count bytes take on the simulated wire (8N1)."""
+        return count * 10.0 / self.baudrate / self.time_scale
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def send(self, data):
+        """Write a reply to the control code, with wire and processing delay."""
+        delay = self.reply_latency / self.time_scale + self.wire_time(len(data))
+        if delay > 0:
+            time.sleep(delay)
+        os.write(self._master, data)
+        self.bytes_out += len(data)
+
+    def _run(self):
+        while self._running:
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if readable:
+                try:
+                    data = os.read(self._master, 1024)
+                except OSError:
+                    continue
+                self.bytes_in += len(data)
+                self.on_data(data)
+            self.on_idle()
+
+    def on_data(self, data):
+        """Handle bytes written by the control code."""
+        raise NotImplementedError
+
+    def on_idle(self):
+        """Called at least every 50 ms; override for time-based behaviour."""
+        pass
+
+
+class FakeMD49(PtyDevice):
+    """Simulated MD49 motor controller (mode 0, unsigned speeds)."""
+
+    COUNTS_PER_SECOND = 2000.0  # encoder counts per second at full speed
+    COMMS_TIMEOUT = 2.0
+
+    def __init__(self, baudrate=38400, reply_latency=0.0005, time_scale=1.0,
+                 motor_gains=(1.0, 1.0)):
+        """
+        :param motor_gains: How fast each wheel turns relative to the other, to
+                            simulate a droid that pulls to one side
+        """
+        super().__init__(baudrate, reply_latency, time_scale)
+        self.motor_gains = motor_gains
+        self.speeds = [128, 128]
+        self.encoders = [0.0, 0.0]
+        self.acceleration = 5
+        self.mode = 0
+        self.timeout_enabled = False
+        self.regulator_enabled = False
+        self.volts = 24
+        self.error = 0
+        self.commands = []  # (sim time, command, data) for every command received
+        self._buf = bytearray()
+        self._last_update = 0.0
+        self._last_command = 0.0
+        self._lock = threading.Lock()
+
+    def _integrate(self):
+        now = self.sim_time()
+        dt = now - self._last_update
+        self._last_update = now
+        if self.timeout_enabled and now - self._last_command > self.COMMS_TIMEOUT:
+            self.speeds = [128, 128]
+        for i in range(2):
+            self.encoders[i] += ((self.speeds[i] - 128) / 127.0 * self.motor_gains[i]
+                                 * self.COUNTS_PER_SECOND * dt)
+
+    def encoder(self, motor):
+        """Current encoder count of motor 1 or 2, wrapped to a signed 32-bit value."""
+        with self._lock:
+            self._integrate()
+            count = int(self.encoders[motor - 1]) & 0xFFFFFFFF
+        return count - (1 << 32) if count & 0x80000000 else count
+
+    def current(self, motor):
+        return abs(self.speeds[motor - 1] - 128) // 4
+
+    def on_data(self, data):
+        self._buf += data
+        replies = bytearray()
+        while len(self._buf) >= 2:
+            if self._buf[0] != 0x00:
+                del self._buf[0]
+                continue
+            command = self._buf[1]
+            needs_data = 0x31 <= command <= 0x34
+            if needs_data and len(self._buf) < 3:
+                break
+            value = self._buf[2] if needs_data else None
+            del self._buf[:3 if needs_data else 2]
+            replies += self._execute(command, value)
+        if replies:
+            self.send(bytes(replies))
+
+    def on_idle(self):
+        with self._lock:
+            self._integrate()
+
+    def _execute(self, command, value):
+        with self._lock:
+            self._integrate()
+            self._last_command = self._last_update
+            self.commands.append((self._last_update, command, value))
+            if command in (0x21, 0x22):
+                return bytes([self.speeds[command - 0x21]])
+            if command in (0x31, 0x32):
+                self.speeds[command - 0x31] = value
+            elif command == 0x33:
+                self.acceleration = value
+            elif command == 0x34:
+                self.mode = value
+            elif command == 0x35:
+                self.encoders = [0.0, 0.0]
+            elif command in (0x36, 0x37):
+                self.regulator_enabled = command == 0x37
+            elif command in (0x38, 0x39):
+                self.timeout_enabled = command == 0x39
+        if command in (0x23, 0x24):
+            return struct.pack('>i', self.encoder(command - 0x22))
+        if command == 0x25:
+            return struct.pack('>ii', self.encoder(1), self.encoder(2))
+        if command == 0x26:
+            return bytes([self.volts])
+        if command in (0x27, 0x28):
+            return bytes([self.current(command - 0x26)])
+        if command == 0x2C:
+            return bytes([self.volts, self.current(1), self.current(2)])
+        if command == 0x2D:
+            return bytes([self.error])
+        return b''
+
+
+class FakeSabertooth(PtyDevice):
+    """Simulated Sabertooth in packetized serial mode."""
+
+    def __init__(self, baudrate=9600, address=128, time_scale=1.0):
+        super().__init__(baudrate, 0.0, time_scale)
+        self.address = address
+        self.motor_speeds = [0, 0]  # -127 to 127
+        self.packets = []  # (sim time, command, value) for every valid packet
+        self._buf = bytearray()
+
+    def on_data(self, data):
+        self._buf += data
+        while len(self._buf) >= 4:
+            address, command, value, checksum = self._buf[:4]
+            if address != self.address or checksum != (address + command + value) & 0x7F:
+                # Autobaud bytes (0xAA) and noise: resync one byte at a time.
+                del self._buf[0]
+                continue
+            del self._buf[:4]
+            self.packets.append((self.sim_time(), command, value))
+            if command in (0, 1, 4, 5):
+                motor = 0 if command < 4 else 1
+                self.motor_speeds[motor] = -value if command & 1 else value
+
+
+class FakeDome(PtyDevice):
+    """Simulated dome Arduino speaking the framed protocol from lib/dome_link.py."""
+
+    def __init__(self, baudrate=9600, reply_latency=0.002, time_scale=1.0,
+                 drop_rate=0.0, seed=None):
+        """
+        :param drop_rate: Fraction of incoming frames to lose, to exercise retransmits
+        """
+        super().__init__(baudrate, reply_latency, time_scale)
+        self.drop_rate = drop_rate
+        self.executed = []  # opcodes run, in order
+        self.frames = 0
+        self._random = random.Random(seed)
+        self._parser = FrameParser()
+        self._history = []
+        self._last_text = 0.0
+
+    def on_data(self, data):
+        frames, _ = self._parser.feed(data)
+        for seq, opcode, _payload in frames:
+            self.frames += 1
+            if self._random.random() < self.drop_rate:
+                continue
+            self.send(encode_frame(seq, OP_ACK, bytes([opcode])))
+            if opcode == OP_SYNC:
+                self._history = []
+                continue
+            if seq in self._history:
+                continue
+            self._history = (self._history + [seq])[-8:]
+            self.executed.append(opcode)
+
+    def on_idle(self):
+        now = self.sim_time()
+        if now - self._last_text > 2.0:
+            self._last_text = now
+            self.send(b"Waiting for serial command...\r\n")
+
+
+class SimLcd(LcdApi):
+    """In-memory HD44780 that records what would be on the glass."""
+
+    def __init__(self, num_lines=2, num_columns=16):
+        self.ddram = bytearray(b' ' * 0x80)
+        self.address = 0
+        self.commands = 0
+        self.data_writes = 0
+        LcdApi.__init__(self, num_lines, num_columns)
+
+    def hal_write_command(self, cmd):
+        self.commands += 1
+        if cmd & self.LCD_DDRAM:
+            self.address = cmd & 0x7f
+        elif cmd == self.LCD_CLR:
+            self.ddram[:] = b' ' * 0x80
+            self.address = 0
+        elif cmd == self.LCD_HOME:
+            self.address = 0
+
+    def hal_write_data(self, data):
+        self.data_writes += 1
+        self.ddram[self.address & 0x7f] = data
+        self.address += 1
+
+    def hal_sleep_us(self, usecs):
+        time.sleep(usecs / 1000000)
+
+    def lines(self):
+        """Returns the text currently shown, one string per line."""
+        return [bytes(self.ddram[self.ddram_addr(0, y):self.ddram_addr(0, y) + self.num_columns]).decode('ascii', 'replace')
+                for y in range(self.num_lines)]
@@ -0,0 +1,133 @@
+"""
+Scriptable synthetic gamepad for the simulator and benchmarks.
+
+A script is a list of steps, each a (delay, events) tuple: wait `delay`
+seconds, then deliver `events` as one evdev report (a SYN_REPORT is
+appended automatically). SyntheticGamepad implements the async_read()
+call that GamepadReader uses, and absinfo() for the idle-gamepad probe, so
+it can stand in for an evdev InputDevice. When the script runs out it
+behaves like a gamepad that was switched off.
+"""
+
+import asyncio
+import errno
+import math
+import time
+
+from evdev import AbsInfo, ecodes
+
+# Analog stick centre and range, as reported by the real controller
+AXIS_CENTRE = 127
+AXIS_MIN = 0
+AXIS_MAX = 255
+
+
+class SyntheticEvent:
+    """Minimal stand-in for evdev.InputEvent."""
+
+    __slots__ = ('type', 'code', 'value', 'timestamp_ns')
+
+    def __init__(self, type, code, value, timestamp_ns=None):
+        self.type = type
+        self.code = code
+        self.value = value
+        self.timestamp_ns = time.perf_counter_ns() if timestamp_ns is None else timestamp_ns
+
+    def __repr__(self):
+        return f"SyntheticEvent(type={self.type}, code={self.code}, value={self.value})"
+
+
+def axis(code, value):
+    """Event tuple that moves an analog axis to a raw value (0-255)."""
+    return (ecodes.EV_ABS, code, max(AXIS_MIN, min(AXIS_MAX, int(value))))
+
+
+def button(code, pressed=True):
+    """Event tuple that presses or releases a button."""
+    return (ecodes.EV_KEY, code, 1 if pressed else 0)
+
+
+def click(code, hold=0.05):
+    """Script steps that press and release a button."""
+    return [(0.0, [button(code, True)]), (hold, [button(code, False)])]
+
+
+def hat(code, value):
+    """Event tuple that moves a D-pad axis to -1, 0 or 1."""
+    return (ecodes.EV_ABS, code, value)
+
+
+def sweep(code, start, end, duration, rate_hz=250):
+    """Script steps that move an axis smoothly from start to end, like a thumb would."""
+    steps = max(1, int(duration * rate_hz))
+    return [(1.0 / rate_hz, [axis(code, start + (end - start) * (i + 1) / steps)])
+            for i in range(steps)]
+
+
+def wobble(code, amplitude, duration, frequency=1.0, rate_hz=250):
+    """Script steps that oscillate an axis around centre (a busy analog stick)."""
+    steps = int(duration * rate_hz)
+    return [(1.0 / rate_hz,
+             [axis(code, AXIS_CENTRE + amplitude * math.sin(2 * math.pi * frequency * i / rate_hz))])
+            for i in range(steps)]
+
+
+class SyntheticGamepad:
+    """Plays a script of input reports through an evdev-like async_read()."""
+
+    def __init__(self, script, time_scale=1.0, batch_window=0.0):
+        """
+        :param script: List of (delay, [(type, code, value), ...]) steps
+        :param time_scale: How much faster than real time to play the script
+        :param batch_window: Deliver all reports due within this many seconds
+                             in one read, like a busy event queue would
+        """
+        self.script = list(script)
+        self.time_scale = time_scale
+        self.batch_window = batch_window
+        self.reports = 0
+        self.delivered = []  # every SyntheticEvent handed out, in order
+        self.connected = True
+        self._index = 0
+        self._axes = {}
+
+    @property
+    def finished(self):
+        return self._index >= len(self.script)
+
+    def _report(self, events):
+        report = [SyntheticEvent(t, c, v) for t, c, v in events]
+        for t, c, v in events:
+            if t == ecodes.EV_ABS:
+                self._axes[c] = v
+        report.append(SyntheticEvent(ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+        self.reports += 1
+        self.delivered.extend(report)
+        return report
+
+    async def async_read(self):
+        """Waits for the next scripted report(s) and returns their events."""
+        if self.finished:
+            self.connected = False
+            raise OSError(errno.ENODEV, "Synthetic gamepad script finished")
+        delay, events = self.script[self._index]
+        self._index += 1
+        if delay > 0:
+            await asyncio.sleep(delay / self.time_scale)
+        batch = self._report(events)
+        waited = 0.0
+        while not self.finished and waited + self.script[self._index][0] <= self.batch_window:
+            delay, events = self.script[self._index]
+            self._index += 1
+            waited += delay
+            batch.extend(self._report(events))
+        return batch
+
+    def absinfo(self, code):
+        """Current state of an axis, like the EVIOCGABS ioctl; OSError once disconnected."""
+        if not self.connected:
+            raise OSError(errno.ENODEV, "No such device")
+        return AbsInfo(self._axes.get(code, AXIS_CENTRE), AXIS_MIN, AXIS_MAX, 0, 0, 0)
+
+    def close(self):
+        pass
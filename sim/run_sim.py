@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+"""
+Run the full R2D2 control stack against simulated hardware.
+
+Starts a fake MD49, Sabertooth and dome Arduino on pseudo-terminals, an
+in-memory LCD and a scripted gamepad, points R2D2_main at them and runs
+main() until the script finishes, the gamepad "disconnects" and the
+failsafe has stopped the droid. Needs the same Python packages as the
+droid (pygame, pyserial, evdev, pysabertooth) but no hardware; audio
+goes to SDL's dummy driver unless SDL_AUDIODRIVER is set.
+
+Usage (from the project folder):
+    python3 -m sim.run_sim [--time-scale 2] [--dome-drop-rate 0.1]
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import tempfile
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import R2D2_main
+from evdev import ecodes
+from sim.devices import FakeDome, FakeMD49, FakeSabertooth, SimLcd
+from sim.gamepad import AXIS_CENTRE, SyntheticGamepad, axis, click, hat, sweep
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def demo_script():
+    """A short drive: full stick, hold, turn, release, dome, D-pad and buttons."""
+    script = [(0.5, [axis(R2D2_main.lvaxis, AXIS_CENTRE)])]
+    script += sweep(R2D2_main.lvaxis, AXIS_CENTRE, 0, 0.5)
+    script += [(1.0, [axis(R2D2_main.lvaxis, 0)])]
+    script += sweep(R2D2_main.lhaxis, AXIS_CENTRE, 200, 0.3)
+    script += sweep(R2D2_main.lhaxis, 200, AXIS_CENTRE, 0.3)
+    script += sweep(R2D2_main.lvaxis, 0, AXIS_CENTRE, 0.5)
+    script += sweep(R2D2_main.rhaxis, AXIS_CENTRE, 255, 0.3)
+    script += sweep(R2D2_main.rhaxis, 255, AXIS_CENTRE, 0.3)
+    script += [(0.2, [hat(ecodes.ABS_HAT0Y, R2D2_main.padUp)]), (0.1, [hat(ecodes.ABS_HAT0Y, 0)])]
+    script += [(0.2, [hat(ecodes.ABS_HAT0X, R2D2_main.padLeft)]), (0.1, [hat(ecodes.ABS_HAT0X, 0)])]
+    script += click(R2D2_main.yBtn)
+    script += [(1.0, [])]
+    return script
+
+
+def use_repo_audio():
+    """Points the sound lists at this checkout's audio-files tree instead of the Pi's."""
+    R2D2_main.set_audio_root(os.path.join(PROJECT_DIR, 'audio-files'))
+    R2D2_main.AUDIO_PACK_MANIFEST = os.path.join(PROJECT_DIR, 'audio-packs', 'manifest.json')
+
+
+async def run(timeout, gamepad):
+    main = asyncio.create_task(R2D2_main.main())
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+    while not main.done():
+        if not gamepad.connected and R2D2_main.failsafe_active:
+            # Give the stop commands time to reach the devices
+            await asyncio.sleep(0.5)
+            logging.info("Simulation finished: gamepad script over, failsafe stopped the droid")
+            break
+        if loop.time() > end:
+            logging.info("Simulation timed out")
+            break
+        await asyncio.sleep(0.05)
+    estimate = R2D2_main.odometry_estimate()
+    logging.info(f"Odometry: x={estimate.x:.2f} m y={estimate.y:.2f} m "
+                 f"heading={math.degrees(estimate.heading):.0f} deg")
+    main.cancel()
+    try:
+        await main
+    except asyncio.CancelledError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run R2D2_main against simulated hardware.")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="Play the gamepad script and device timing this many times faster")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Stop after this many seconds")
+    parser.add_argument('--dome-drop-rate', type=float, default=0.0,
+                        help="Fraction of dome frames to lose, to exercise retransmission")
+    parser.add_argument('--left-wheel-gain', type=float, default=1.0,
+                        help="Speed of the left wheel relative to the right, to exercise straight-line correction")
+    parser.add_argument('--telemetry-dir', default=os.path.join(tempfile.gettempdir(), 'r2d2-sim-telemetry'),
+                        help="Where to write telemetry files (read them with tools/read_telemetry.py)")
+    parser.add_argument('--motor-process', action='store_true',
+                        help="Run the motor loops in the separate real-time process (without pinning or priority)")
+    parser.add_argument('--config', help="Config file to load and watch; its device ports and "
+                                         "file paths are replaced by the simulator's")
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    md49 = FakeMD49(time_scale=args.time_scale, motor_gains=(args.left_wheel_gain, 1.0)).start()
+    saber = FakeSabertooth(time_scale=args.time_scale).start()
+    dome = FakeDome(time_scale=args.time_scale, drop_rate=args.dome_drop_rate).start()
+    lcd = SimLcd(R2D2_main.I2C_NUM_ROWS, R2D2_main.I2C_NUM_COLS)
+    gamepad = SyntheticGamepad(demo_script(), time_scale=args.time_scale)
+
+    def open_sim_gamepad(path):
+        if not gamepad.connected:
+            raise FileNotFoundError(f"No such device: {path}")
+        return gamepad
+
+    # Load the config before pointing the devices at the simulator, so
+    # ports and paths from the file do not win
+    R2D2_main.CONFIG_FILE = args.config
+    config_error = R2D2_main.load_settings()
+    if config_error:
+        logging.error(f"Config file ignored, using defaults: {config_error}")
+    R2D2_main.MD49_PORT = md49.port
+    R2D2_main.SABER_PORT = saber.port
+    R2D2_main.ARDUINO_PORT = dome.port
+    R2D2_main.open_lcd = lambda: lcd
+    R2D2_main.open_gamepad = open_sim_gamepad
+    R2D2_main.TELEMETRY_DIR = args.telemetry_dir
+    if args.motor_process:
+        R2D2_main.MOTOR_PROCESS = True
+        R2D2_main.MOTOR_PROCESS_CPU = None
+        R2D2_main.MOTOR_PROCESS_PRIORITY = 0
+    use_repo_audio()
+
+    try:
+        asyncio.run(run(args.timeout, gamepad))
+    finally:
+        print("LCD:")
+        for line in lcd.lines():
+            print(f"  |{line}|")
+        print(f"MD49: speeds={md49.speeds} encoders={md49.encoder(1)},{md49.encoder(2)} "
+              f"commands={len(md49.commands)} bytes_in={md49.bytes_in} bytes_out={md49.bytes_out}")
+        print(f"Sabertooth: packets={len(saber.packets)} motor1={saber.motor_speeds[0]}")
+        print(f"Dome: frames={dome.frames} executed={dome.executed}")
+        for stats in R2D2_main.scheduler.stats.values():
+            print(f"Loop {stats.summary()}")
+        if R2D2_main.telemetry:
+            R2D2_main.telemetry.close()
+            print(f"Telemetry: {R2D2_main.telemetry.recorded} records in {args.telemetry_dir}")
+        # The device threads are daemons; the ptys stay open until exit so
+        # driver destructors (pysabertooth stops its motors) can still write.
+
+
+if __name__ == "__main__":
+    main()
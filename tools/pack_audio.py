@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+"""
+Audio packing tool for the R2D2 soundboard.
+
+Decodes every clip under audio-files/<category>/ once, at build time, into
+peak-normalized 16-bit PCM at the mixer's sample rate and packs each
+category into a single <category>.pcm file. A manifest.json next to the
+packs records the PCM format and the category, offset and length of every
+clip, so SoundBank.load_pack() can memory-map the packs and play clips
+without ever decoding MP3 on the Pi.
+
+Usage:
+    python3 tools/pack_audio.py [--source audio-files] [--output audio-packs]
+"""
+
+import argparse
+import json
+import os
+import sys
+from array import array
+
+import pygame
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg')
+
+
+def normalize(samples, peak_fraction):
+    """
+    Scale 16-bit samples in place so the loudest one reaches peak_fraction of full scale.
+
+    :param samples: array('h') of interleaved samples
+    :param peak_fraction: Target peak level between 0 and 1
+    """
+    peak = max((abs(s) for s in samples), default=0)
+    if peak == 0:
+        return
+    gain = peak_fraction * 32767 / peak
+    for i, s in enumerate(samples):
+        samples[i] = max(-32768, min(32767, int(s * gain)))
+
+
+def pack_category(source_dir, category, output_dir, frame_size, peak_fraction):
+    """
+    Decode and pack every clip of one category into <category>.pcm.
+
+    :return: Dict of manifest entries keyed by '<category>/<file name>'
+    """
+    clips = {}
+    names = sorted(n for n in os.listdir(os.path.join(source_dir, category))
+                   if n.lower().endswith(AUDIO_EXTENSIONS))
+    pack_name = f"{category}.pcm"
+    with open(os.path.join(output_dir, pack_name), 'wb') as pack:
+        offset = 0
+        for name in names:
+            path = os.path.join(source_dir, category, name)
+            samples = array('h')
+            samples.frombytes(pygame.mixer.Sound(path).get_raw())
+            if peak_fraction:
+                normalize(samples, peak_fraction)
+            data = samples.tobytes()
+            data = data[:len(data) - len(data) % frame_size]
+            pack.write(data)
+            clips[f"{category}/{name}"] = {
+                'category': category,
+                'pack': pack_name,
+                'offset': offset,
+                'length': len(data),
+            }
+            offset += len(data)
+    print(f"{category}: {len(names)} clips, {offset // 1024} KiB")
+    return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the audio-files tree into memory-mappable PCM archives.")
+    parser.add_argument('--source', default='audio-files', help="Directory with one subdirectory per category")
+    parser.add_argument('--output', default='audio-packs', help="Directory to write packs and manifest to")
+    parser.add_argument('--frequency', type=int, default=44100, help="Sample rate of the runtime mixer")
+    parser.add_argument('--channels', type=int, default=2, help="Channel count of the runtime mixer")
+    parser.add_argument('--peak', type=float, default=0.9, help="Normalized peak level (0 to disable)")
+    args = parser.parse_args()
+
+    if sys.byteorder != 'little':
+        parser.error("packs are written in the Pi's little-endian sample order")
+
+    # Decoding happens in the mixer's format, so the packs match it exactly.
+    pygame.mixer.init(frequency=args.frequency, size=-16, channels=args.channels)
+    frequency, size, channels = pygame.mixer.get_init()
+    os.makedirs(args.output, exist_ok=True)
+
+    clips = {}
+    for category in sorted(os.listdir(args.source)):
+        if os.path.isdir(os.path.join(args.source, category)):
+            clips.update(pack_category(args.source, category, args.output,
+                                       channels * abs(size) // 8, args.peak))
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'frequency': frequency,
+        'size': size,
+        'channels': channels,
+        'clips': clips,
+    }
+    with open(os.path.join(args.output, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {len(clips)} clips to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""
+Telemetry reader for the binary files written by lib/telemetry.py.
+
+Loads one telemetry-*.bin file, or every file in a folder in order, into
+a NumPy structured array (one field per column) for analysis, and prints
+a short summary of the run. Each file describes its own record layout in
+its header, so runs recorded with older field lists still load.
+
+Usage:
+    python3 tools/read_telemetry.py telemetry/ [--csv run.csv]
+
+In Python:
+    from tools.read_telemetry import load
+    data = load('telemetry/')
+    data['volts'], data['encoder1'], ...
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+import numpy as np
+
+FILE_MAGIC = b'R2TL'
+HEADER = struct.Struct('<4sBH')
+
+
+def read_file(path):
+    """
+    Load one telemetry file.
+
+    :param path: Path of a telemetry-*.bin file
+    :return: NumPy structured array of its records
+    """
+    with open(path, 'rb') as f:
+        magic, version, spec_length = HEADER.unpack(f.read(HEADER.size))
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a telemetry file")
+        spec = f.read(spec_length).decode('ascii')
+        dtype = np.dtype([(name, '<' + code) for name, code in
+                          (field.split(':') for field in spec.split(','))])
+        data = f.read()
+    # A file cut off mid-record (power loss) keeps its complete records
+    usable = len(data) - len(data) % dtype.itemsize
+    return np.frombuffer(data[:usable], dtype=dtype)
+
+
+def telemetry_files(path):
+    """Telemetry files at path (a file or a folder), oldest first."""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.startswith('telemetry-') and name.endswith('.bin')]
+    return [path]
+
+
+def load(path):
+    """
+    Load a whole run into one structured array.
+
+    :param path: A telemetry file, or a folder of them
+    :return: NumPy structured array, ordered by file then record
+    """
+    arrays = [read_file(p) for p in telemetry_files(path)]
+    if not arrays:
+        raise ValueError(f"No telemetry files in {path}")
+    first = arrays[0].dtype
+    if all(a.dtype == first for a in arrays):
+        return np.concatenate(arrays)
+    # Field lists changed between files: keep the columns they all share
+    dtype = np.dtype([(n, first[n]) for n in first.names
+                      if all(n in a.dtype.names for a in arrays)])
+    data = np.empty(sum(len(a) for a in arrays), dtype=dtype)
+    for name in dtype.names:
+        data[name] = np.concatenate([a[name] for a in arrays])
+    return data
+
+
+def summary(data):
+    """Returns a short human readable summary of a run."""
+    lines = [f"records: {len(data)}"]
+    if len(data) < 2:
+        return '\n'.join(lines)
+    duration = data['timestamp'][-1] - data['timestamp'][0]
+    lines.append(f"duration: {duration:.1f} s ({(len(data) - 1) / duration:.1f} Hz)" if duration > 0
+                 else "duration: 0 s")
+    if 'volts' in data.dtype.names:
+        lines.append(f"volts: min {data['volts'].min()} max {data['volts'].max()}")
+    if 'jitter' in data.dtype.names:
+        jitter_ms = data['jitter'] * 1000
+        lines.append(f"loop jitter: p50 {np.percentile(jitter_ms, 50):.2f} ms "
+                     f"p99 {np.percentile(jitter_ms, 99):.2f} ms max {jitter_ms.max():.2f} ms")
+    for field in ('current1', 'current2'):
+        if field in data.dtype.names:
+            lines.append(f"{field}: max {data[field].max() / 10:.1f} A")
+    if 'error' in data.dtype.names:
+        lines.append(f"records with MD49 errors: {int(np.count_nonzero(data['error']))}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load and summarize R2D2 telemetry files.")
+    parser.add_argument('path', help="A telemetry-*.bin file or the folder holding them")
+    parser.add_argument('--csv', help="Also write the records to this CSV file")
+    args = parser.parse_args()
+
+    try:
+        data = load(args.path)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(summary(data))
+    if args.csv:
+        np.savetxt(args.csv, data, delimiter=',', header=','.join(data.dtype.names),
+                   comments='', fmt='%s')
+        print(f"Wrote {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())